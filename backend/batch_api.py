@@ -0,0 +1,96 @@
+"""
+Batch analysis of many properties (/api/analyze/batch).
+
+Each property is analyzed as by /api/analyze, with at most BATCH_CONCURRENCY
+in flight. Results are streamed as NDJSON or SSE as they complete and saved
+in chunks of BATCH_INSERT_CHUNK.
+"""
+import asyncio
+import logging
+import os
+from typing import List, Literal
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+import server
+from server import PropertyInput
+
+# Batch size cap, analyses in flight and analyses per insert
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '500'))
+BATCH_INSERT_CHUNK = int(os.environ.get('BATCH_INSERT_CHUNK', '50'))
+
+router = APIRouter()
+
+class BatchAnalysisRequest(BaseModel):
+    properties: List[PropertyInput]
+    format: Literal['ndjson', 'sse'] = 'ndjson'
+
+@router.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Analyze many properties with bounded concurrency, streaming each result as it completes
+    """
+    if not request.properties:
+        raise HTTPException(status_code=400, detail="No properties provided")
+    if len(request.properties) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_BATCH_SIZE})")
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def analyze_one(index: int, property_input: PropertyInput):
+        async with semaphore:
+            try:
+                analysis, key, reused = await server.analyze_with_reuse(property_input)
+                return index, analysis, key, reused, None
+            except HTTPException as e:
+                return index, None, None, False, e.detail
+            except Exception as e:
+                logging.error(f"Error analyzing batch item {index}: {e}")
+                return index, None, None, False, str(e)
+    
+    async def flush(operations: List[UpdateOne]):
+        if not operations:
+            return
+        try:
+            with server.stage_timer('store_batch'):
+                await server.db.analyses.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logging.error(f"Error saving batch analyses: {e}")
+        operations.clear()
+    
+    async def stream():
+        tasks = [
+            asyncio.create_task(analyze_one(index, property_input))
+            for index, property_input in enumerate(request.properties)
+        ]
+        pending_writes: List[UpdateOne] = []
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, analysis, key, reused, error = await next_done
+                if analysis is not None:
+                    succeeded += 1
+                    if not reused:
+                        pending_writes.append(UpdateOne(*server.analysis_upsert(analysis, key), upsert=True))
+                    if len(pending_writes) >= BATCH_INSERT_CHUNK:
+                        await flush(pending_writes)
+                    payload = {'index': index, 'status': 'ok', 'reused': reused, 'result': analysis.model_dump(mode='json')}
+                else:
+                    payload = {'index': index, 'status': 'error', 'detail': error}
+                yield server.format_stream_event(payload, request.format)
+            
+            await flush(pending_writes)
+            summary = {'status': 'done', 'total': len(tasks), 'succeeded': succeeded, 'failed': len(tasks) - succeeded}
+            yield server.format_stream_event(summary, request.format, event='done')
+        finally:
+            # Client went away or the batch finished: stop outstanding work, keep what completed
+            for task in tasks:
+                task.cancel()
+            await flush(pending_writes)
+    
+    media_type = 'text/event-stream' if request.format == 'sse' else 'application/x-ndjson'
+    return StreamingResponse(stream(), media_type=media_type)
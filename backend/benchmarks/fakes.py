@@ -0,0 +1,123 @@
+"""
+Local stand-ins used by the load test: an LlmChat replacement with configurable
+latency, jitter and error rate, and an HTTP server that serves the saved
+listing fixtures.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+
+PRICE_RE = re.compile(r'Price: €([\d,]+)')
+INSIGHT_TEXT = (
+    "The asking price is in line with recent sales in the area and the rental demand from "
+    "students and young professionals keeps vacancy low. Financing at the current rate leaves "
+    "a thin monthly margin, so the return depends mostly on appreciation over the holding period. "
+    "A light renovation of kitchen and bathroom would support the optimistic rent estimate."
+)
+
+class FakeLlmConfig:
+    """Shared by every FakeLlmChat instance; adjust between benchmark phases"""
+    latency = 0.8        # seconds per call
+    jitter = 0.3         # +/- uniform seconds around latency
+    error_rate = 0.0     # share of calls failing with a transient (retried) error
+    calls = 0
+
+class FakeUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeLlmChat:
+    """Drop-in for emergentintegrations' LlmChat: answers estimates, combined and insight prompts"""
+
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        self.session_id = session_id
+        self.messages = [{'role': 'system', 'content': system_message}]
+
+    def with_model(self, provider: str, model: str) -> 'FakeLlmChat':
+        return self
+
+    async def send_message(self, message) -> str:
+        FakeLlmConfig.calls += 1
+        delay = FakeLlmConfig.latency + random.uniform(-FakeLlmConfig.jitter, FakeLlmConfig.jitter)
+        await asyncio.sleep(max(0.0, delay))
+        if random.random() < FakeLlmConfig.error_rate:
+            raise RuntimeError("503 Service Unavailable (fake)")
+
+        prompt = message.text
+        match = PRICE_RE.search(prompt)
+        price = float(match.group(1).replace(',', '')) if match else 250000.0
+        estimates = {
+            'monthly_rent_conservative': round(price * random.uniform(0.0032, 0.0038)),
+            'monthly_rent_optimistic': round(price * random.uniform(0.0042, 0.0048)),
+            'investment_score': random.randint(4, 8),
+            'yoy_appreciation': round(random.uniform(1.5, 4.5), 1),
+            'estimated_current_value': round(price * random.uniform(0.97, 1.06))
+        }
+        if '"insights"' in prompt:
+            return json.dumps({**estimates, 'insights': INSIGHT_TEXT})
+        if '"monthly_rent_conservative"' in prompt:
+            return json.dumps(estimates)
+        return INSIGHT_TEXT
+
+def install_fake_llm():
+    """Route every LlmGateway client through FakeLlmChat (emergentintegrations is never imported)"""
+    import llm_gateway
+
+    llm_gateway.LlmChat = FakeLlmChat
+    llm_gateway.UserMessage = FakeUserMessage
+
+class ListingServer:
+    """
+    Threaded HTTP server on 127.0.0.1 answering any path with one of the saved
+    listing pages (chosen by the digits in the path, so /annunci/<n>/ cycles
+    through them), after an optional artificial latency
+    """
+
+    def __init__(self, pages: List[str], latency: float = 0.0, port: int = 0):
+        self.pages = [page.encode() for page in pages]
+        self.latency = latency
+        self.requests = 0
+        listing_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                listing_server.requests += 1
+                if listing_server.latency:
+                    time.sleep(listing_server.latency)
+                digits = re.findall(r'\d+', self.path)
+                body = listing_server.pages[int(digits[-1]) % len(listing_server.pages) if digits else 0]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'ListingServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def load_listing_pages(fixtures_dir: Path) -> List[str]:
+    return [path.read_text() for path in sorted(fixtures_dir.glob('*.html'))]
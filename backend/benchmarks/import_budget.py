@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for backend/server.py.
+
+Imports server in fresh interpreters without MONGO_URL (as tests and tooling
+do) and fails when the median import time exceeds the budget, or when a
+dependency that should load on first use (during the lifespan warm-up) is
+imported with the module. The slowest direct imports are listed to show
+where a regression came from.
+
+    python backend/benchmarks/import_budget.py --budget-ms 900
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '900'))
+# Loaded by create_clients / warm_up / first use, never by `import server`
+DEFERRED_MODULES = ('motor', 'httpx', 'requests', 'emergentintegrations', 'bs4', 'pyarrow', 'uvicorn')
+CHILD_SCRIPT = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import server\n"
+    "elapsed = time.perf_counter() - started\n"
+    "print(json.dumps({'ms': elapsed * 1000, 'loaded': [m for m in %r if m in sys.modules]}))\n"
+) % (DEFERRED_MODULES,)
+
+def child_env() -> Dict[str, str]:
+    env = {key: value for key, value in os.environ.items() if key not in ('MONGO_URL', 'DB_NAME')}
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+def import_once(importtime: bool = False) -> Tuple[Dict, str]:
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD_SCRIPT]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+def slowest_imports(importtime_log: str, top: int) -> List[Dict]:
+    """Direct imports of server ordered by cumulative time, from -X importtime output"""
+    # Lines come in post-order: a module's direct imports (depth 1) precede its own line (depth 0)
+    entries: List[Dict] = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            entries.append({'module': name.strip(), 'ms': round(int(cumulative) / 1000, 1)})
+        elif depth == 0:
+            if name.strip() == 'server':
+                return sorted(entries, key=lambda entry: entry['ms'], reverse=True)[:top]
+            entries = []
+    return []
+
+def run(budget_ms: float, repeats: int = 5, top: int = 10) -> Dict:
+    runs = [import_once()[0] for _ in range(repeats)]
+    sample, importtime_log = import_once(importtime=True)
+    median_ms = float(np.median([result['ms'] for result in runs]))
+    loaded = sorted({module for result in runs + [sample] for module in result['loaded']})
+    return {
+        'budget_ms': budget_ms,
+        'median_ms': round(median_ms, 1),
+        'runs_ms': [round(result['ms'], 1) for result in runs],
+        'eagerly_loaded': loaded,
+        'slowest_imports': slowest_imports(importtime_log, top),
+        'ok': median_ms <= budget_ms and not loaded
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS, help='maximum median import time (ms)')
+    parser.add_argument('--repeats', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=10, help='slowest direct imports to list')
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON only')
+    args = parser.parse_args()
+
+    report = run(args.budget_ms, args.repeats, args.top)
+    if args.json:
+        print(json.dumps({'benchmark': 'import_budget', **report}, indent=2))
+    else:
+        print(f"import server: median {report['median_ms']} ms over {args.repeats} runs (budget {report['budget_ms']} ms)")
+        for entry in report['slowest_imports']:
+            print(f"{entry['module']:>32}: {entry['ms']:>8.1f} ms")
+        if report['eagerly_loaded']:
+            print(f"Loaded at import but should be deferred: {', '.join(report['eagerly_loaded'])}")
+        print('OK' if report['ok'] else 'FAILED')
+    sys.exit(0 if report['ok'] else 1)
+
+if __name__ == '__main__':
+    main()
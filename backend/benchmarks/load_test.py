@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the API.
+
+Starts the FastAPI app in-process under uvicorn with a fake LlmChat
+(configurable latency, jitter and error rate), a local HTTP server serving the
+saved listing fixtures and an in-memory Mongo (mongomock-motor) unless
+--mongo-url points at a real one. /api/analyze and /api/extract-property are
+then driven at each concurrency level by closed-loop clients running on their
+own event loop, and the report gives p50/p95/p99 latency, requests/sec and
+the server event loop's scheduling lag. The finance and parser
+microbenchmarks run afterwards.
+
+The JSON report (--output) is meant to be kept per release; --baseline
+prints the change against an earlier report.
+
+    python backend/benchmarks/load_test.py --concurrency 1,8,32 --duration 10 --output bench.json
+    python backend/benchmarks/load_test.py --baseline bench-previous.json
+
+Every request uses a new listing URL, so neither the listing cache nor
+analysis reuse short-circuits the pipeline, and comparables substitution is
+off (COMPARABLES_SUBSTITUTE_COUNT=0). The pages cycle through the fixtures,
+so the AI estimate cache still hits for repeated properties as it would in
+production; LLM_RATE and LLM_MAX_IN_FLIGHT apply as configured.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import fakes  # noqa: E402
+import microbench  # noqa: E402
+import parser_throughput  # noqa: E402
+
+ENDPOINTS = ('analyze', 'extract')
+
+class LoopLagMonitor:
+    """Samples how late a periodic sleep wakes up on the loop it runs on"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def reset(self):
+        self.samples = []
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        lag_ms = np.asarray(self.samples) * 1000
+        return {
+            'p50': round(float(np.percentile(lag_ms, 50)), 2),
+            'p99': round(float(np.percentile(lag_ms, 99)), 2),
+            'max': round(float(lag_ms.max()), 2)
+        }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def request_for(endpoint: str, listing_url: str, llm_mode: str) -> Dict:
+    if endpoint == 'analyze':
+        return {'path': '/api/analyze', 'json': {'url': listing_url, 'llm_mode': llm_mode}}
+    return {'path': '/api/extract-property', 'json': {'url': listing_url}}
+
+async def drive(api_url: str, listing_base: str, endpoint: str, concurrency: int, duration: float,
+                llm_mode: str, counter: itertools.count) -> Dict:
+    """Closed loop: `concurrency` clients each send their next request as soon as the previous one returns"""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            request = request_for(endpoint, f"{listing_base}/annunci/{next(counter)}/", llm_mode)
+            started = time.perf_counter()
+            try:
+                response = await http.post(request['path'], json=request['json'])
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=120) as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latency_ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'requests_per_second': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(float(latency_ms.mean()), 1),
+            'p50': round(float(np.percentile(latency_ms, 50)), 1),
+            'p95': round(float(np.percentile(latency_ms, 95)), 1),
+            'p99': round(float(np.percentile(latency_ms, 99)), 1),
+            'max': round(float(latency_ms.max()), 1)
+        }
+    }
+
+async def run_load(args) -> List[Dict]:
+    if args.mongo_url:
+        os.environ['MONGO_URL'] = args.mongo_url
+    else:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("mongomock-motor is not installed: pip install mongomock-motor, or pass --mongo-url")
+        import motor.motor_asyncio
+
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+        os.environ['MONGO_URL'] = 'mongodb://benchmark'
+    os.environ['DB_NAME'] = args.db_name
+    # Every listing is served by one local host: lift the per-host politeness limits
+    os.environ['SCRAPER_RATE_PER_HOST'] = '0'
+    os.environ['SCRAPER_MAX_PER_HOST'] = str(max(args.concurrency) * 2)
+    os.environ.setdefault('COMPARABLES_SUBSTITUTE_COUNT', '0')
+
+    import uvicorn
+    import server
+
+    # One INFO line per listing fetch would dominate the run
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    fakes.install_fake_llm()
+    fakes.FakeLlmConfig.latency = args.llm_latency
+    fakes.FakeLlmConfig.jitter = args.llm_jitter
+    fakes.FakeLlmConfig.error_rate = args.llm_error_rate
+
+    pages = [parser_throughput.pad(page, args.pad_kb) for page in fakes.load_listing_pages(parser_throughput.FIXTURES_DIR)]
+    listings = fakes.ListingServer(pages, latency=args.listing_latency).start()
+
+    api_server = uvicorn.Server(uvicorn.Config(server.app, host='127.0.0.1', port=free_port(), log_level='warning'))
+    serve_task = asyncio.create_task(api_server.serve())
+    while not api_server.started:
+        if serve_task.done():
+            serve_task.result()
+        await asyncio.sleep(0.05)
+    api_url = f"http://127.0.0.1:{api_server.config.port}"
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    counter = itertools.count(1)
+    results = []
+    try:
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                if args.warmup:
+                    await asyncio.to_thread(asyncio.run, drive(
+                        api_url, listings.base_url, endpoint, concurrency, args.warmup, args.llm_mode, counter
+                    ))
+                monitor.reset()
+                llm_calls = fakes.FakeLlmConfig.calls
+                fetches = listings.requests
+                result = await asyncio.to_thread(asyncio.run, drive(
+                    api_url, listings.base_url, endpoint, concurrency, args.duration, args.llm_mode, counter
+                ))
+                result = {
+                    'endpoint': endpoint,
+                    'concurrency': concurrency,
+                    **result,
+                    'loop_lag_ms': monitor.summary(),
+                    'llm_calls': fakes.FakeLlmConfig.calls - llm_calls,
+                    'listing_fetches': listings.requests - fetches
+                }
+                results.append(result)
+                if not args.json:
+                    print_load_result(result)
+    finally:
+        await monitor.stop()
+        api_server.should_exit = True
+        await serve_task
+        listings.stop()
+    return results
+
+def print_load_result(result: Dict):
+    latency = result['latency_ms']
+    print(
+        f"{result['endpoint']:>8} c={result['concurrency']:<4} {result['requests_per_second']:>8.2f} req/s  "
+        f"p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}  p99 {latency['p99']:>8.1f} ms  "
+        f"loop lag p99 {result['loop_lag_ms']['p99']:>6.2f} ms  errors {result['errors']}"
+    )
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def percent_change(new: float, old: float) -> Optional[float]:
+    return round((new - old) / old * 100, 1) if old else None
+
+def compare(report: Dict, baseline: Dict) -> List[Dict]:
+    """Per-benchmark change against a previous report (positive = more throughput / more latency)"""
+    rows = []
+    old_load = {(item['endpoint'], item['concurrency']): item for item in baseline.get('load', [])}
+    for item in report.get('load', []):
+        old = old_load.get((item['endpoint'], item['concurrency']))
+        if old:
+            rows.append({
+                'benchmark': f"{item['endpoint']} c={item['concurrency']}",
+                'requests_per_second_pct': percent_change(item['requests_per_second'], old['requests_per_second']),
+                'p95_latency_pct': percent_change(item['latency_ms']['p95'], old['latency_ms']['p95'])
+            })
+    old_micro = baseline.get('micro', {})
+    for name, item in report.get('micro', {}).items():
+        if name in old_micro:
+            rows.append({'benchmark': name, 'ops_per_second_pct': percent_change(item['ops_per_second'], old_micro[name]['ops_per_second'])})
+    return rows
+
+def parse_list(value: str, cast=str) -> List:
+    return [cast(part) for part in value.split(',') if part]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=lambda value: parse_list(value), default=list(ENDPOINTS), help='comma-separated: analyze,extract')
+    parser.add_argument('--concurrency', type=lambda value: parse_list(value, int), default=[1, 8, 32], help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before each level')
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='fake LLM seconds per call')
+    parser.add_argument('--llm-jitter', type=float, default=0.3, help='fake LLM +/- uniform jitter (seconds)')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='share of fake LLM calls failing with a transient error')
+    parser.add_argument('--llm-mode', choices=('two_call', 'single_shot'), default='two_call')
+    parser.add_argument('--listing-latency', type=float, default=0.05, help='local listing server delay (seconds)')
+    parser.add_argument('--pad-kb', type=int, default=128, help='filler markup added to each listing page (KB)')
+    parser.add_argument('--mongo-url', help='use a real MongoDB instead of mongomock-motor')
+    parser.add_argument('--db-name', default='propinvest_benchmark')
+    parser.add_argument('--micro-seconds', type=float, default=1.0, help='time spent on each microbenchmark')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='earlier JSON report to compare against')
+    parser.add_argument('--json', action='store_true', help='print the JSON report only')
+    args = parser.parse_args()
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    report = {
+        'benchmark': 'load_test',
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {name: value for name, value in vars(args).items() if name not in ('output', 'baseline', 'json')}
+    }
+    if not args.skip_load:
+        report['load'] = asyncio.run(run_load(args))
+    if not args.skip_micro:
+        report['micro'] = microbench.run(args.micro_seconds, args.pad_kb)
+        if not args.json:
+            for name, result in report['micro'].items():
+                print(f"{name:>40}: {result['us_per_op']:>12.2f} us/op  {result['ops_per_second']:>12.1f} ops/s")
+    if args.baseline:
+        report['comparison'] = compare(report, json.loads(Path(args.baseline).read_text()))
+        if not args.json:
+            for row in report['comparison']:
+                print('  '.join(f"{key}={value}" for key, value in row.items()))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
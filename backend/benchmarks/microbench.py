@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the deterministic parts of an analysis: the finance.py
+metrics math (single property, batches, scenario grids, amortization and
+projections) and listing parsing through the portal registry.
+
+    python backend/benchmarks/microbench.py --json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import finance  # noqa: E402
+import parser_throughput  # noqa: E402
+import portals  # noqa: E402
+
+BASE_PARAMS = {
+    'price': 250000.0,
+    'mortgage_percentage': 80.0,
+    'mortgage_rate': 3.5,
+    'mortgage_years': 25.0,
+    'purchase_tax_rate': 2.0,
+    'notary_fees': 2000.0,
+    'agency_fees_percentage': 3.0,
+    'annual_property_tax': 1000.0,
+    'maintenance_percentage': 1.0,
+    'monthly_rent': 1050.0,
+    'yoy_appreciation': 3.0
+}
+
+def measure(func: Callable[[], object], min_seconds: float, repeats: int = 5) -> Dict[str, float]:
+    """Median time per call over `repeats` rounds of at least min_seconds / repeats each"""
+    func()
+    round_seconds = min_seconds / repeats
+    per_call = []
+    for _ in range(repeats):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= round_seconds:
+                break
+        per_call.append(elapsed / calls)
+    median = float(np.median(per_call))
+    return {
+        'us_per_op': round(median * 1e6, 2),
+        'ops_per_second': round(1 / median, 1),
+        'spread_pct': round((max(per_call) - min(per_call)) / median * 100, 1)
+    }
+
+def finance_benchmarks(min_seconds: float) -> Dict[str, Dict]:
+    rng = np.random.default_rng(7)
+    n = 10_000
+    prices = rng.uniform(80_000, 900_000, n).round(-3)
+    costs = finance.financing(prices, 80, 3.5, 25, 2, 2000, 3, 1000, 1)
+    rents = prices * rng.uniform(0.003, 0.005, n)
+    loans = (prices[:1000] * 0.8, rng.choice([2.5, 3.0, 3.5, 4.0], 1000), rng.choice([20, 25, 30], 1000))
+    single = finance.financing(250000.0, 80, 3.5, 25, 2, 2000, 3, 1000, 1)
+
+    def metrics(price, financing, rent):
+        return lambda: finance.investment_metrics(
+            price, financing['down_payment'], financing['total_upfront'], financing['annual_costs'],
+            rent * 0.9, rent * 1.1, 6, 3.0, price
+        )
+
+    def cold_amortization():
+        finance.amortization_cache.clear()
+        finance.cached_amortization(*loans, months=480)
+
+    return {
+        'investment_metrics_single': measure(metrics(250000.0, single, 1050.0), min_seconds),
+        'investment_metrics_batch_10k': measure(metrics(prices, costs, rents), min_seconds),
+        'scenario_grid_100k': measure(lambda: finance.scenario_grid(BASE_PARAMS, {
+            'mortgage_rate': np.linspace(2, 6, 40).tolist(),
+            'mortgage_percentage': np.linspace(50, 90, 25).tolist(),
+            'monthly_rent': np.linspace(800, 1400, 100).tolist()
+        }), min_seconds),
+        'amortization_1000x480': measure(lambda: finance.amortization(*loans, months=480), min_seconds),
+        'cached_amortization_1000x480_cold': measure(cold_amortization, min_seconds),
+        'cached_amortization_1000x480_warm': measure(lambda: finance.cached_amortization(*loans, months=480), min_seconds),
+        'cashflow_projection_1000x40y': measure(lambda: finance.cashflow_projection(
+            loans[0] / 0.8, loans[0] / 0.8 * 0.3, loans[0], loans[1], loans[2], 3000.0, loans[0] / 0.8 * 0.004, 3.0, 40
+        ), min_seconds),
+        'break_even_and_tornado': measure(lambda: (finance.break_even(BASE_PARAMS), finance.tornado(BASE_PARAMS)), min_seconds)
+    }
+
+def parser_benchmarks(min_seconds: float, pad_kb: int) -> Dict[str, Dict]:
+    registry = portals.default_registry(default_rate=0, default_concurrency=1)
+    results = {}
+    for name, html, url, _ in parser_throughput.load_fixtures():
+        page = parser_throughput.pad(html, pad_kb)
+        results[f"parse_{Path(name).stem}"] = {
+            **measure(lambda: registry.parse(page, url), min_seconds),
+            'page_kb': round(len(page) / 1024, 1)
+        }
+    return results
+
+def run(min_seconds: float = 1.0, pad_kb: int = 128) -> Dict[str, Dict]:
+    return {**finance_benchmarks(min_seconds), **parser_benchmarks(min_seconds, pad_kb)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-seconds', type=float, default=1.0, help='time spent on each benchmark')
+    parser.add_argument('--pad-kb', type=int, default=128, help='filler markup added to each listing page (KB)')
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON only')
+    args = parser.parse_args()
+
+    results = run(args.min_seconds, args.pad_kb)
+    if args.json:
+        print(json.dumps({'benchmark': 'microbench', 'results': results}, indent=2))
+        return
+    for name, result in results.items():
+        print(f"{name:>40}: {result['us_per_op']:>12.2f} us/op  {result['ops_per_second']:>12.1f} ops/s  ±{result['spread_pct']}%")
+
+if __name__ == '__main__':
+    main()
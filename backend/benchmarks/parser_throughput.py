@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Listing parser throughput benchmark.
+
+Checks every fixture in backend/fixtures/listings against its .expected.json
+(parsed with the portal registry, at the expected source_url when one is
+given), then times that parse against the previous approach (full
+html.parser tree plus a text-node regex scan). Fixtures can be padded with
+filler markup to approximate real portal pages, which run to hundreds of KB.
+
+    python backend/benchmarks/parser_throughput.py --pad-kb 256 --json
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import parsers  # noqa: E402
+import portals  # noqa: E402
+
+FIXTURES_DIR = BACKEND_DIR / 'fixtures' / 'listings'
+FIXTURE_URL = 'https://www.example-portal.it/annunci/1/'
+FILLER_BLOCK = (
+    '<div class="nd-card"><a href="/annunci/{n}/" class="nd-link">Annuncio correlato {n}</a>'
+    '<span class="nd-badge">Nuovo</span><p>Descrizione breve dell\'annuncio numero {n} con testo di riempimento.</p></div>\n'
+)
+
+def legacy_parse(html: str, url: str) -> dict:
+    """The pre-parsers.py extraction: BeautifulSoup html.parser tree and a scan of every text node"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.find('h1')
+    price_elem = soup.find(string=re.compile(r'€|EUR', re.I))
+    img_tag = soup.find('img', {'class': re.compile(r'property|listing|image', re.I)})
+    return {
+        'title': title.get_text(strip=True) if title else None,
+        'price': re.search(r'[\d.,]+', price_elem).group() if price_elem and re.search(r'[\d.,]+', price_elem) else None,
+        'image_url': img_tag.get('src') if img_tag else None
+    }
+
+def pad(html: str, kilobytes: int) -> str:
+    """Insert filler markup before </body> until the page is roughly `kilobytes` larger"""
+    if kilobytes <= 0:
+        return html
+    blocks = []
+    size = 0
+    n = 0
+    while size < kilobytes * 1024:
+        block = FILLER_BLOCK.format(n=n)
+        blocks.append(block)
+        size += len(block)
+        n += 1
+    return html.replace('</body>', ''.join(blocks) + '</body>')
+
+def load_fixtures() -> list:
+    """(name, html, url, expected) for every fixture"""
+    fixtures = []
+    for path in sorted(FIXTURES_DIR.glob('*.html')):
+        expected = json.loads(path.with_suffix('.expected.json').read_text())
+        fixtures.append((path.name, path.read_text(), expected.get('source_url', FIXTURE_URL), expected))
+    return fixtures
+
+def check_fixtures(registry, fixtures) -> list:
+    failures = []
+    for name, html, url, expected in fixtures:
+        result = registry.parse(html, url)
+        for key, value in expected.items():
+            if result.get(key) != value:
+                failures.append({'fixture': name, 'field': key, 'expected': value, 'actual': result.get(key)})
+    return failures
+
+def time_parser(func, pages, min_seconds: float) -> dict:
+    iterations = 0
+    total_bytes = 0
+    started = time.perf_counter()
+    while True:
+        for html, url in pages:
+            func(html, url)
+            total_bytes += len(html)
+        iterations += len(pages)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            break
+    return {
+        'pages': iterations,
+        'seconds': round(elapsed, 4),
+        'pages_per_second': round(iterations / elapsed, 1),
+        'mb_per_second': round(total_bytes / elapsed / 1024 / 1024, 2),
+        'ms_per_page': round(elapsed / iterations * 1000, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pad-kb', type=int, default=256, help='filler markup added to each fixture (KB)')
+    parser.add_argument('--min-seconds', type=float, default=2.0, help='minimum run time per parser')
+    parser.add_argument('--skip-legacy', action='store_true', help='do not time the legacy BeautifulSoup path')
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON only')
+    args = parser.parse_args()
+
+    registry = portals.default_registry(default_rate=0, default_concurrency=1)
+    fixtures = load_fixtures()
+    failures = check_fixtures(registry, fixtures)
+    pages = [(pad(html, args.pad_kb), url) for _, html, url, _ in fixtures]
+
+    report = {
+        'benchmark': 'parser_throughput',
+        'lxml': parsers.HAVE_LXML,
+        'fixtures': len(pages),
+        'avg_page_kb': round(sum(len(html) for html, _ in pages) / len(pages) / 1024, 1),
+        'fixture_failures': failures,
+        'results': {'parse_listing': time_parser(registry.parse, pages, args.min_seconds)}
+    }
+    if not args.skip_legacy:
+        report['results']['legacy_bs4'] = time_parser(legacy_parse, pages, args.min_seconds)
+        report['speedup'] = round(
+            report['results']['parse_listing']['pages_per_second'] / report['results']['legacy_bs4']['pages_per_second'], 2
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Fixtures: {report['fixtures']} (avg {report['avg_page_kb']} KB), lxml: {report['lxml']}")
+        print(f"Fixture check: {'OK' if not failures else f'{len(failures)} mismatches'}")
+        for name, result in report['results'].items():
+            print(f"{name:>14}: {result['pages_per_second']:>9} pages/s  {result['mb_per_second']:>7} MB/s  {result['ms_per_page']} ms/page")
+        if 'speedup' in report:
+            print(f"Speedup vs legacy: {report['speedup']}x")
+        for failure in failures:
+            print(f"  MISMATCH {failure['fixture']}.{failure['field']}: expected {failure['expected']!r}, got {failure['actual']!r}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
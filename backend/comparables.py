@@ -0,0 +1,228 @@
+"""
+In-memory comparables index over stored analyses.
+
+Every analysis is filed under a few buckets: each of its location keys (the
+full normalized location and every comma-separated part, so "Sempione,
+Chinatown, Milano" also lands in "milano"), crossed with its normalized
+property type and either its size band or any size. A bucket keeps sorted
+price/sqm, rent/sqm and appreciation values, so a lookup is a handful of dict
+probes plus indexing into sorted lists.
+
+The index is refreshed incrementally from Mongo: each pass only reads
+analyses created after the newest one already seen. Older documents store
+created_at as an ISO string, newer ones as a BSON date; strings sort before
+dates, so a string watermark also matches every dated document.
+"""
+import asyncio
+import bisect
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+ANY_SIZE = '*'
+SIZE_BANDS = (40, 60, 80, 100, 130, 170, 250)
+GENERIC_LOCATIONS = {'', 'italy', 'italia'}
+PROPERTY_TYPE_ALIASES = {
+    'apartment': 'apartment',
+    'appartamento': 'apartment',
+    'appartamenti': 'apartment',
+    'flat': 'apartment',
+    'attico': 'apartment',
+    'loft': 'apartment',
+    'monolocale': 'apartment',
+    'bilocale': 'apartment',
+    'trilocale': 'apartment',
+    'quadrilocale': 'apartment',
+    'house': 'house',
+    'casa indipendente': 'house',
+    'casa semindipendente': 'house',
+    'terratetto': 'house',
+    'rustico': 'house',
+    'villa': 'villa',
+    'villetta a schiera': 'villa',
+    'villa a schiera': 'villa',
+    'villette a schiera': 'villa'
+}
+PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'created_at': 1,
+    'estimates_source': 1,
+    'property_data.location': 1,
+    'property_data.property_type': 1,
+    'property_data.price': 1,
+    'property_data.size_sqm': 1,
+    'property_data.source_url': 1,
+    'metrics.long_term_rental_yield': 1,
+    'metrics.yoy_appreciation': 1
+}
+
+def location_keys(location: Optional[str]) -> List[str]:
+    """Most specific first: the full location, then each comma-separated part"""
+    normalized = ' '.join((location or '').casefold().split())
+    parts = [part.strip() for part in normalized.split(',')]
+    keys = []
+    for key in [', '.join(part for part in parts if part)] + parts:
+        if key not in GENERIC_LOCATIONS and key not in keys:
+            keys.append(key)
+    return keys
+
+def normalize_property_type(property_type: Optional[str]) -> str:
+    normalized = ' '.join((property_type or '').casefold().split())
+    return PROPERTY_TYPE_ALIASES.get(normalized, normalized or 'apartment')
+
+def size_band(size_sqm: float) -> str:
+    index = bisect.bisect_right(SIZE_BANDS, size_sqm)
+    low = SIZE_BANDS[index - 1] if index else 0
+    return f"{low}-{SIZE_BANDS[index]}" if index < len(SIZE_BANDS) else f"{low}+"
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        'p25': round(percentile(values, 0.25), 2),
+        'median': round(percentile(values, 0.5), 2),
+        'p75': round(percentile(values, 0.75), 2)
+    }
+
+class Bucket:
+    __slots__ = ('price_sqm', 'rent_sqm', 'appreciation')
+
+    def __init__(self):
+        self.price_sqm: List[float] = []
+        self.rent_sqm: List[float] = []
+        self.appreciation: List[float] = []
+
+class ComparablesIndex:
+    def __init__(self, collection, min_count: int = 5, refresh_interval: float = 60.0):
+        self.collection = collection
+        self.min_count = min_count
+        self.refresh_interval = refresh_interval
+        self._buckets: Dict[Tuple[str, str, str], Bucket] = {}
+        # One entry per property (source URL, or analysis id for manual input)
+        self._entries: Dict[str, Tuple[List[Tuple[str, str, str]], float, Optional[float], Optional[float]]] = {}
+        self._watermark: Any = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, document: Dict):
+        """File a stored analysis document (replacing an older analysis of the same property)"""
+        property_data = document.get('property_data') or {}
+        metrics = document.get('metrics') or {}
+        price = property_data.get('price') or 0
+        size = property_data.get('size_sqm') or 0
+        locations = location_keys(property_data.get('location'))
+        if price <= 0 or size <= 0 or not locations:
+            return
+
+        # Only LLM-derived rents count; fallback and comparables-based rents would feed back into the index
+        rent_sqm = None
+        rental_yield = metrics.get('long_term_rental_yield')
+        if rental_yield and document.get('estimates_source') == 'ai':
+            rent_sqm = price * rental_yield / 100 / 12 / size
+        appreciation = metrics.get('yoy_appreciation') if document.get('estimates_source') == 'ai' else None
+
+        entry_id = property_data.get('source_url') or document.get('id')
+        self._remove(entry_id)
+        property_type = normalize_property_type(property_data.get('property_type'))
+        band = size_band(size)
+        keys = [(location, property_type, size_key) for location in locations for size_key in (band, ANY_SIZE)]
+        price_sqm = price / size
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = Bucket()
+            bisect.insort(bucket.price_sqm, price_sqm)
+            if rent_sqm is not None:
+                bisect.insort(bucket.rent_sqm, rent_sqm)
+            if appreciation is not None:
+                bisect.insort(bucket.appreciation, appreciation)
+        self._entries[entry_id] = (keys, price_sqm, rent_sqm, appreciation)
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        keys, price_sqm, rent_sqm, appreciation = entry
+        for key in keys:
+            bucket = self._buckets[key]
+            for values, value in ((bucket.price_sqm, price_sqm), (bucket.rent_sqm, rent_sqm), (bucket.appreciation, appreciation)):
+                if value is not None:
+                    del values[bisect.bisect_left(values, value)]
+            if not bucket.price_sqm:
+                del self._buckets[key]
+
+    def lookup(self, location: str, property_type: str, size_sqm: float) -> Optional[Dict]:
+        """
+        Price and rent per sqm of the most specific bucket with at least
+        min_count rent observations, or None when there is no such bucket.
+        """
+        normalized_type = normalize_property_type(property_type)
+        band = size_band(size_sqm) if size_sqm and size_sqm > 0 else ANY_SIZE
+        for location_key in location_keys(location):
+            for size_key in (band, ANY_SIZE):
+                bucket = self._buckets.get((location_key, normalized_type, size_key))
+                if bucket is None or len(bucket.rent_sqm) < self.min_count:
+                    continue
+                return {
+                    'location': location_key,
+                    'property_type': normalized_type,
+                    'size_band': size_key,
+                    'count': len(bucket.price_sqm),
+                    'rent_count': len(bucket.rent_sqm),
+                    'price_per_sqm': _summary(bucket.price_sqm),
+                    'rent_per_sqm': _summary(bucket.rent_sqm),
+                    'yoy_appreciation': round(percentile(bucket.appreciation, 0.5), 2) if bucket.appreciation else None
+                }
+        return None
+
+    async def refresh(self) -> int:
+        """Load analyses stored since the last refresh; returns how many were read"""
+        loaded = 0
+        if self._watermark is None:
+            query = {}
+        elif isinstance(self._watermark, str):
+            query = {'$or': [{'created_at': {'$gt': self._watermark}}, {'created_at': {'$type': 'date'}}]}
+        else:
+            query = {'created_at': {'$gt': self._watermark}}
+        async for document in self.collection.find(query, PROJECTION).sort('created_at', 1).batch_size(1000):
+            self.add(document)
+            self._watermark = document['created_at']
+            loaded += 1
+        return loaded
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                loaded = await self.refresh()
+                if loaded:
+                    logging.info(f"Comparables index: {loaded} analyses loaded, {len(self)} properties indexed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Comparables index refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            'properties': len(self._entries),
+            'buckets': len(self._buckets),
+            'with_rent': sum(1 for entry in self._entries.values() if entry[2] is not None),
+            'min_count': self.min_count
+        }
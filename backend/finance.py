@@ -0,0 +1,555 @@
+"""
+Vectorized financing math shared by the analysis endpoints.
+
+Every function accepts scalars or NumPy arrays that broadcast against each
+other, so the same formulas serve a single /api/analyze request and a sweep
+over tens of thousands of scenarios.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+
+ArrayLike = np.ndarray
+
+AMORTIZATION_FIELDS = ('payment', 'interest', 'principal', 'balance')
+# Full-term schedules keyed by (principal, annual rate %, term years)
+amortization_cache: LRUCache = LRUCache(maxsize=4096)
+
+def mortgage_payment(principal, annual_rate_pct, years) -> ArrayLike:
+    """Monthly annuity payment; 0% rates amortize linearly, zero principal pays nothing"""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate_pct, dtype=float) / 100 / 12
+    num_payments = np.asarray(years, dtype=float) * 12
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = (1 + monthly_rate) ** num_payments
+        annuity = principal * (monthly_rate * growth) / (growth - 1)
+        linear = principal / num_payments
+    payment = np.where(monthly_rate > 0, annuity, linear)
+    return np.where((principal > 0) & (num_payments > 0), payment, 0.0)
+
+def financing(
+    price,
+    mortgage_percentage,
+    mortgage_rate,
+    mortgage_years,
+    purchase_tax_rate,
+    notary_fees,
+    agency_fees_percentage,
+    annual_property_tax,
+    maintenance_percentage
+) -> Dict[str, ArrayLike]:
+    """Purchase costs, mortgage payment and yearly running costs"""
+    price = np.asarray(price, dtype=float)
+    mortgage_amount = price * (np.asarray(mortgage_percentage, dtype=float) / 100)
+    down_payment = price - mortgage_amount
+    purchase_tax = price * (np.asarray(purchase_tax_rate, dtype=float) / 100)
+    agency_fees = price * (np.asarray(agency_fees_percentage, dtype=float) / 100)
+    total_upfront = down_payment + purchase_tax + notary_fees + agency_fees
+
+    monthly_mortgage = mortgage_payment(mortgage_amount, mortgage_rate, mortgage_years)
+    annual_maintenance = price * (np.asarray(maintenance_percentage, dtype=float) / 100)
+    annual_costs = monthly_mortgage * 12 + annual_property_tax + annual_maintenance
+
+    return {
+        'mortgage_amount': mortgage_amount,
+        'down_payment': down_payment,
+        'total_upfront': total_upfront,
+        'monthly_mortgage': monthly_mortgage,
+        'annual_maintenance': annual_maintenance,
+        'annual_costs': annual_costs
+    }
+
+def returns(
+    price,
+    down_payment,
+    total_upfront,
+    annual_costs,
+    monthly_rent,
+    yoy_appreciation,
+    horizon_years: int = 5
+) -> Dict[str, ArrayLike]:
+    """Cash flow, ROI over the horizon (cash flow + appreciation), ROE and projected value"""
+    price = np.asarray(price, dtype=float)
+    down_payment = np.asarray(down_payment, dtype=float)
+
+    annual_net_cashflow = np.asarray(monthly_rent, dtype=float) * 12 - annual_costs
+    projected_value = price * (1 + np.asarray(yoy_appreciation, dtype=float) / 100) ** horizon_years
+    capital_appreciation = projected_value - price
+
+    total_gain = annual_net_cashflow * horizon_years + capital_appreciation
+    roi = total_gain / total_upfront * 100
+
+    # For a cash purchase the equity is the full price
+    equity = np.where(down_payment > 0, down_payment, price)
+    roe = annual_net_cashflow / equity * 100
+
+    return {
+        'annual_net_cashflow': annual_net_cashflow,
+        'capital_appreciation': capital_appreciation,
+        'projected_value': projected_value,
+        'roi': roi,
+        'roe': roe
+    }
+
+# Fixed-ratio estimates used when neither the LLM nor comparables are available
+FALLBACK_RENT_RATIOS = (0.003, 0.004)  # monthly rent as a share of price (conservative, optimistic)
+FALLBACK_SCORE = 6
+FALLBACK_APPRECIATION = 3.5
+FALLBACK_VALUE_RATIO = 1.02
+
+# Decimal places of each InvestmentMetrics field
+METRIC_DECIMALS = {
+    'roi_range_min': 1,
+    'roi_range_max': 1,
+    'roe_range_min': 1,
+    'roe_range_max': 1,
+    'annual_net_cashflow': 0,
+    'estimated_value': 2,
+    'yoy_appreciation': 2,
+    'projected_5yr_value': 2,
+    'roi': 2,
+    'roe': 2,
+    'long_term_rental_yield': 2,
+    'cash_on_cash_return': 2,
+    'monthly_cash_flow': 2,
+    'monthly_rent_conservative': 2,
+    'monthly_rent_optimistic': 2
+}
+
+def adjust_score(score, annual_net_cashflow, avg_roi, avg_roe) -> ArrayLike:
+    """Cap the estimated investment score when cash flow, ROI or ROE are negative"""
+    score = np.asarray(score, dtype=float)
+    cashflow_negative = np.asarray(annual_net_cashflow) < 0
+    roi_negative = np.asarray(avg_roi) < 0
+    roe_negative = np.asarray(avg_roe) < 0
+
+    score = np.where(cashflow_negative, np.minimum(score, 3), score)
+    score = np.where(np.asarray(annual_net_cashflow) < -5000, np.minimum(score, 2), score)
+    score = np.where(roi_negative, np.minimum(score, 3), score)
+    score = np.where(np.asarray(avg_roi) < -10, np.minimum(score, 2), score)
+    score = np.where(roe_negative, np.minimum(score, 3), score)
+    score = np.where(np.asarray(avg_roe) < -5, np.minimum(score, 2), score)
+
+    # Multiple negative metrics = very low score
+    negative_count = cashflow_negative.astype(int) + roi_negative + roe_negative
+    score = np.where(negative_count >= 2, np.minimum(score, 2), score)
+    return np.where(negative_count == 3, 1, score)
+
+def investment_metrics(
+    price,
+    down_payment,
+    total_upfront,
+    annual_costs,
+    rent_conservative,
+    rent_optimistic,
+    investment_score,
+    yoy_appreciation,
+    estimated_value,
+    horizon_years: int = 5
+) -> Dict[str, ArrayLike]:
+    """
+    Unrounded InvestmentMetrics fields for one property (scalars) or a batch
+    (arrays of equal length). Returns are averaged over the conservative and
+    optimistic rent estimates.
+    """
+    rent_conservative = np.asarray(rent_conservative, dtype=float)
+    rent_optimistic = np.asarray(rent_optimistic, dtype=float)
+    gains = returns(
+        price,
+        down_payment,
+        total_upfront,
+        annual_costs,
+        np.stack([rent_conservative, rent_optimistic]),
+        yoy_appreciation,
+        horizon_years
+    )
+    roi_conservative, roi_optimistic = gains['roi']
+    roe_conservative, roe_optimistic = gains['roe']
+    annual_net_cashflow = gains['annual_net_cashflow'].mean(axis=0)
+    avg_roi = (roi_conservative + roi_optimistic) / 2
+    avg_roe = (roe_conservative + roe_optimistic) / 2
+
+    return {
+        'investment_score': adjust_score(investment_score, annual_net_cashflow, avg_roi, avg_roe),
+        'roi_range_min': roi_conservative,
+        'roi_range_max': roi_optimistic,
+        'roe_range_min': roe_conservative,
+        'roe_range_max': roe_optimistic,
+        'annual_net_cashflow': annual_net_cashflow,
+        'estimated_value': np.asarray(estimated_value, dtype=float),
+        'yoy_appreciation': np.asarray(yoy_appreciation, dtype=float),
+        'projected_5yr_value': gains['projected_value'],
+        'roi': avg_roi,
+        'roe': avg_roe,
+        'long_term_rental_yield': (rent_conservative + rent_optimistic) / 2 * 12 / np.asarray(price, dtype=float) * 100,
+        'cash_on_cash_return': roe_conservative,
+        'monthly_cash_flow': annual_net_cashflow / 12,
+        'monthly_rent_conservative': rent_conservative,
+        'monthly_rent_optimistic': rent_optimistic
+    }
+
+def remaining_balance(principal, annual_rate_pct, years, months_elapsed) -> ArrayLike:
+    """Outstanding annuity principal after `months_elapsed` payments (0 once the loan is repaid)"""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate_pct, dtype=float) / 100 / 12
+    num_payments = np.asarray(years, dtype=float) * 12
+    paid = np.minimum(np.asarray(months_elapsed, dtype=float), num_payments)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = (1 + monthly_rate) ** num_payments
+        annuity = principal * (growth - (1 + monthly_rate) ** paid) / (growth - 1)
+        linear = principal * (1 - paid / num_payments)
+    balance = np.where(monthly_rate > 0, annuity, linear)
+    return np.where((principal > 0) & (num_payments > 0), balance, 0.0)
+
+def yearly_projection(
+    price,
+    mortgage_amount,
+    mortgage_rate,
+    mortgage_years,
+    monthly_mortgage,
+    operating_costs,
+    monthly_rent,
+    yoy_appreciation,
+    horizon_years: int
+) -> Dict[str, ArrayLike]:
+    """
+    Year-by-year value, debt and cash flow of one or many properties, shape
+    (horizon_years, n). Rent and running costs stay flat as in `returns`, and
+    debt service stops once the mortgage is repaid, so within the mortgage term
+    the cash flow equals returns()['annual_net_cashflow'].
+    """
+    years = np.arange(1, horizon_years + 1, dtype=float).reshape(-1, 1)
+    price = np.asarray(price, dtype=float)
+    mortgage_years = np.asarray(mortgage_years, dtype=float)
+
+    months_paid = np.clip(mortgage_years * 12 - (years - 1) * 12, 0, 12)
+    debt_service = np.asarray(monthly_mortgage, dtype=float) * months_paid
+    net_cashflow = np.asarray(monthly_rent, dtype=float) * 12 - operating_costs - debt_service
+
+    return {
+        'property_value': price * (1 + np.asarray(yoy_appreciation, dtype=float) / 100) ** years,
+        'mortgage_balance': remaining_balance(mortgage_amount, mortgage_rate, mortgage_years, years * 12),
+        'debt_service': debt_service,
+        'net_cashflow': net_cashflow,
+        'cumulative_cashflow': np.cumsum(net_cashflow, axis=0)
+    }
+
+def amortization(principal, annual_rate_pct, years, months: int) -> Dict[str, ArrayLike]:
+    """
+    Closed-form month-by-month schedule for one or many loans: payment,
+    interest, principal repaid and closing balance, each of shape (n, months).
+    Months after the term are zero.
+    """
+    principal = np.asarray(principal, dtype=float).reshape(-1, 1)
+    annual_rate_pct = np.asarray(annual_rate_pct, dtype=float).reshape(-1, 1)
+    years = np.asarray(years, dtype=float).reshape(-1, 1)
+    month = np.arange(1, months + 1, dtype=float)
+
+    opening = remaining_balance(principal, annual_rate_pct, years, month - 1)
+    balance = remaining_balance(principal, annual_rate_pct, years, month)
+    interest = opening * annual_rate_pct / 100 / 12
+    payment = np.where(month <= years * 12, mortgage_payment(principal, annual_rate_pct, years), 0.0)
+    return {
+        'payment': payment,
+        'interest': interest,
+        'principal': opening - balance,
+        'balance': balance
+    }
+
+def cached_amortization(principal, annual_rate_pct, years, months: int) -> Dict[str, ArrayLike]:
+    """
+    amortization() memoized per (principal, rate, term): loans already in
+    amortization_cache are copied out, the others are computed together in
+    one pass and cached for their full term.
+    """
+    loans = list(zip(
+        np.atleast_1d(np.asarray(principal, dtype=float)).tolist(),
+        np.atleast_1d(np.asarray(annual_rate_pct, dtype=float)).tolist(),
+        np.atleast_1d(np.asarray(years, dtype=float)).tolist()
+    ))
+    missing = [loan for loan in dict.fromkeys(loans) if loan not in amortization_cache]
+    if missing:
+        columns = np.array(missing).T
+        computed = amortization(*columns, months=int(columns[2].max() * 12))
+        for index, loan in enumerate(missing):
+            schedule = np.stack([computed[field][index, :int(loan[2] * 12)] for field in AMORTIZATION_FIELDS])
+            schedule.setflags(write=False)
+            amortization_cache[loan] = schedule
+
+    result = np.zeros((len(AMORTIZATION_FIELDS), len(loans), months))
+    for index, loan in enumerate(loans):
+        schedule = amortization_cache.get(loan)
+        if schedule is None:
+            # Evicted by another caller in between; recompute just this loan
+            schedule = np.stack([amortization(*loan, months=int(loan[2] * 12))[field][0] for field in AMORTIZATION_FIELDS])
+        span = min(months, schedule.shape[1])
+        result[:, index, :span] = schedule[:, :span]
+    return dict(zip(AMORTIZATION_FIELDS, result))
+
+def bisect(func, low, high, iterations: int = 60) -> ArrayLike:
+    """
+    Root of a monotonic `func` between `low` and `high`, element-wise over
+    arrays of brackets. NaN where func(low) and func(high) share a sign.
+    """
+    low = np.array(low, dtype=float)
+    high = np.array(high, dtype=float)
+    value_low = func(low)
+    solvable = np.sign(value_low) != np.sign(func(high))
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        value_mid = func(mid)
+        same_side = np.sign(value_mid) == np.sign(value_low)
+        low = np.where(same_side, mid, low)
+        value_low = np.where(same_side, value_mid, value_low)
+        high = np.where(same_side, high, mid)
+    return np.where(solvable, (low + high) / 2, np.nan)
+
+def irr(cashflows: ArrayLike, low: float = -0.99, high: float = 10.0) -> ArrayLike:
+    """
+    Annual internal rate of return (%) of each row of yearly cash flows
+    (year 0 first). NaN where NPV does not change sign within [low, high].
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    periods = np.arange(cashflows.shape[1], dtype=float)
+    rows = cashflows.shape[0]
+    return bisect(
+        lambda rate: (cashflows / (1 + rate[:, None]) ** periods).sum(axis=1),
+        np.full(rows, low),
+        np.full(rows, high)
+    ) * 100
+
+def npv(cashflows: ArrayLike, discount_rate_pct) -> ArrayLike:
+    """Net present value of each row of yearly cash flows (year 0 first)"""
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    periods = np.arange(cashflows.shape[1], dtype=float)
+    return (cashflows / (1 + np.asarray(discount_rate_pct, dtype=float) / 100) ** periods).sum(axis=1)
+
+def cashflow_projection(
+    price,
+    total_upfront,
+    mortgage_amount,
+    mortgage_rate,
+    mortgage_years,
+    operating_costs,
+    monthly_rent,
+    yoy_appreciation,
+    horizon_years: int,
+    rent_growth: float = 0.0,
+    cost_growth: float = 0.0,
+    discount_rate: float = 5.0,
+    selling_costs_percentage: float = 0.0,
+    refinance_year: Optional[int] = None,
+    refinance_rate: Optional[float] = None,
+    refinance_years: Optional[float] = None,
+    refinance_costs: float = 0.0
+) -> Dict[str, Dict[str, ArrayLike]]:
+    """
+    Monthly amortization and yearly cash flow projection for n properties.
+
+    Rent and running costs grow yearly by rent_growth / cost_growth (%). An
+    optional refinance replaces the loan at the end of refinance_year with the
+    outstanding balance at refinance_rate over refinance_years (default: the
+    remaining term). Each year is also valued as a sale at the appreciated
+    price less selling costs and the outstanding balance; IRR, NPV and the
+    break-even year (first year a sale recovers the upfront capital) follow
+    from those flows. Unlike the flat ROI of `returns`, total_return counts the
+    principal paid down and nets out purchase taxes and fees.
+
+    Returns {'schedule': (n, months) arrays, 'yearly': (n, years) arrays,
+    'summary': (n,) arrays}.
+    """
+    price = np.atleast_1d(np.asarray(price, dtype=float))
+    total_upfront = np.atleast_1d(np.asarray(total_upfront, dtype=float))
+    mortgage_years = np.broadcast_to(np.asarray(mortgage_years, dtype=float), price.shape)
+    months = horizon_years * 12
+
+    schedule = cached_amortization(
+        np.broadcast_to(mortgage_amount, price.shape),
+        np.broadcast_to(mortgage_rate, price.shape),
+        mortgage_years,
+        months
+    )
+    refinance_month = refinance_year * 12 if refinance_year is not None and refinance_rate is not None else None
+    if refinance_month is not None and refinance_month < months:
+        remaining_years = np.maximum(mortgage_years - refinance_year, 0)
+        new_years = np.broadcast_to(float(refinance_years), price.shape) if refinance_years else remaining_years
+        refinanced = cached_amortization(
+            np.round(schedule['balance'][:, refinance_month - 1], 2),
+            np.broadcast_to(refinance_rate, price.shape),
+            new_years,
+            months - refinance_month
+        )
+        for field in AMORTIZATION_FIELDS:
+            schedule[field] = np.concatenate([schedule[field][:, :refinance_month], refinanced[field]], axis=1)
+
+    def by_year(values):
+        return values.reshape(price.size, horizon_years, 12)
+
+    growth_years = np.arange(horizon_years, dtype=float)
+    rent = np.asarray(monthly_rent, dtype=float).reshape(-1, 1) * 12 * (1 + rent_growth / 100) ** growth_years
+    costs = np.asarray(operating_costs, dtype=float).reshape(-1, 1) * (1 + cost_growth / 100) ** growth_years
+    debt_service = by_year(schedule['payment']).sum(axis=2)
+    net_cashflow = rent - costs - debt_service
+    if refinance_month is not None and refinance_month < months:
+        net_cashflow[:, refinance_year - 1] -= refinance_costs
+
+    balance = by_year(schedule['balance'])[:, :, -1]
+    property_value = price.reshape(-1, 1) * (1 + np.asarray(yoy_appreciation, dtype=float).reshape(-1, 1) / 100) ** (growth_years + 1)
+    sale_proceeds = property_value * (1 - selling_costs_percentage / 100) - balance
+    cumulative_cashflow = np.cumsum(net_cashflow, axis=1)
+    total_return = cumulative_cashflow + sale_proceeds - total_upfront.reshape(-1, 1)
+
+    flows = np.concatenate([-total_upfront.reshape(-1, 1), net_cashflow], axis=1)
+    flows[:, -1] += sale_proceeds[:, -1]
+    recovered = total_return >= 0
+    return {
+        'schedule': schedule,
+        'yearly': {
+            'rent': rent,
+            'operating_costs': costs,
+            'debt_service': debt_service,
+            'interest': by_year(schedule['interest']).sum(axis=2),
+            'principal': by_year(schedule['principal']).sum(axis=2),
+            'mortgage_balance': balance,
+            'property_value': property_value,
+            'equity': property_value - balance,
+            'net_cashflow': net_cashflow,
+            'cumulative_cashflow': cumulative_cashflow,
+            'total_return': total_return
+        },
+        'summary': {
+            'irr': irr(flows),
+            'npv': npv(flows, discount_rate),
+            'break_even_year': np.where(recovered.any(axis=1), recovered.argmax(axis=1) + 1, 0),
+            'total_interest': schedule['interest'].sum(axis=1)
+        }
+    }
+
+def evaluate(params: Dict[str, ArrayLike], horizon_years: int = 5) -> Dict[str, ArrayLike]:
+    """
+    financing() followed by returns() for a dict of every PurchaseDetails field
+    plus price, monthly_rent and yoy_appreciation (scalars or broadcastable arrays)
+    """
+    costs = financing(
+        params['price'],
+        params['mortgage_percentage'],
+        params['mortgage_rate'],
+        params['mortgage_years'],
+        params['purchase_tax_rate'],
+        params['notary_fees'],
+        params['agency_fees_percentage'],
+        params['annual_property_tax'],
+        params['maintenance_percentage']
+    )
+    gains = returns(
+        params['price'],
+        costs['down_payment'],
+        costs['total_upfront'],
+        costs['annual_costs'],
+        params['monthly_rent'],
+        params['yoy_appreciation'],
+        horizon_years
+    )
+    return {**costs, **gains}
+
+def break_even(base: Dict[str, float], horizon_years: int = 5, max_mortgage_percentage: float = 95.0) -> Dict[str, float]:
+    """
+    Break-even purchase parameters for the `evaluate` inputs in `base`: the
+    highest price and mortgage rate that keep the annual cash flow
+    non-negative (NaN when no such value exists in range), the lowest monthly
+    rent that does, and the mortgage percentage that maximizes ROE.
+    """
+    def cashflow_with(**overrides):
+        # The price bracket starts at 0, where ROE divides by zero equity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return evaluate({**base, **overrides}, horizon_years)['annual_net_cashflow']
+
+    current = evaluate(base, horizon_years)
+    mortgage_percentages = np.linspace(0, max_mortgage_percentage, int(max_mortgage_percentage * 2) + 1)
+    leverage = evaluate({**base, 'mortgage_percentage': mortgage_percentages}, horizon_years)
+    best = int(np.argmax(leverage['roe']))
+    return {
+        'max_price': float(bisect(lambda price: cashflow_with(price=price), 0.0, base['price'] * 10)),
+        'max_mortgage_rate': float(bisect(lambda rate: cashflow_with(mortgage_rate=rate), 0.0, 30.0)),
+        'min_monthly_rent': float(current['annual_costs'] / 12),
+        'optimal_mortgage_percentage': float(mortgage_percentages[best]),
+        'optimal_roe': float(leverage['roe'][best]),
+        'optimal_roi': float(leverage['roi'][best])
+    }
+
+TORNADO_INPUTS = (
+    'price',
+    'monthly_rent',
+    'yoy_appreciation',
+    'mortgage_rate',
+    'mortgage_percentage',
+    'mortgage_years',
+    'maintenance_percentage',
+    'annual_property_tax'
+)
+
+def tornado(base: Dict[str, float], horizon_years: int = 5, change_pct: float = 10.0) -> List[Dict[str, float]]:
+    """
+    ROI, ROE and cash flow with each of TORNADO_INPUTS moved `change_pct`
+    percent down and up (one at a time, all in one evaluate() pass), sorted by
+    the ROI swing, largest first
+    """
+    rows = 2 * len(TORNADO_INPUTS)
+    params = {name: np.full(rows, float(value)) for name, value in base.items()}
+    for index, name in enumerate(TORNADO_INPUTS):
+        params[name][2 * index] *= 1 - change_pct / 100
+        params[name][2 * index + 1] *= 1 + change_pct / 100
+    params['mortgage_percentage'] = np.minimum(params['mortgage_percentage'], 100)
+    results = evaluate(params, horizon_years)
+
+    bars = []
+    for index, name in enumerate(TORNADO_INPUTS):
+        low, high = 2 * index, 2 * index + 1
+        bars.append({
+            'input': name,
+            'low_value': float(params[name][low]),
+            'high_value': float(params[name][high]),
+            **{f"{metric}_{side}": float(results[metric][row]) for metric in ('roi', 'roe', 'annual_net_cashflow') for side, row in (('low', low), ('high', high))},
+            'roi_swing': float(abs(results['roi'][high] - results['roi'][low]))
+        })
+    return sorted(bars, key=lambda bar: bar['roi_swing'], reverse=True)
+
+SCENARIO_AXES = (
+    'mortgage_rate',
+    'mortgage_percentage',
+    'mortgage_years',
+    'monthly_rent',
+    'yoy_appreciation'
+)
+
+def scenario_grid(
+    base: Dict[str, float],
+    axes: Dict[str, List[float]],
+    horizon_years: int = 5
+) -> Tuple[Tuple[int, ...], Dict[str, ArrayLike]]:
+    """
+    Evaluate the cartesian product of the swept parameters in one pass.
+
+    `base` holds every PurchaseDetails field plus price, monthly_rent and
+    yoy_appreciation; `axes` overrides any of SCENARIO_AXES with a list of
+    values. Returns the grid shape (one dimension per SCENARIO_AXES entry) and
+    flat C-ordered metric arrays.
+    """
+    shape = tuple(len(axes.get(name, [base[name]])) for name in SCENARIO_AXES)
+    params = dict(base)
+    for dim, name in enumerate(SCENARIO_AXES):
+        values = np.asarray(axes.get(name, [base[name]]), dtype=float)
+        view = [1] * len(SCENARIO_AXES)
+        view[dim] = values.size
+        params[name] = values.reshape(view)
+
+    results = evaluate(params, horizon_years)
+
+    metrics = {
+        name: results[name]
+        for name in ('total_upfront', 'monthly_mortgage', 'annual_costs', 'annual_net_cashflow', 'roi', 'roe', 'projected_value')
+    }
+    return shape, {name: np.broadcast_to(values, shape).ravel() for name, values in metrics.items()}
@@ -0,0 +1,282 @@
+"""
+Bulk listing imports from CSV/Parquet feeds (/api/imports).
+
+ingest.py reads a feed in row chunks. Each chunk becomes deterministic
+analyses written with one bulk upsert; LLM enrichment is queued on
+server.enrichment_queue and runs in the background.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import finance
+import ingest
+import server
+import telemetry
+from server import AnalysisResult, DEFAULT_IMAGE_URL, InvestmentMetrics, PropertyData, PropertyInput, PurchaseDetails
+
+# Bulk listing imports (CSV/Parquet)
+IMPORT_CHUNK_ROWS = int(os.environ.get('IMPORT_CHUNK_ROWS', '1000'))
+IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', str(2 * 1024 ** 3)))
+IMPORT_MAX_REJECTIONS = 50  # rejected rows kept on the import record
+IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR') or None
+
+router = APIRouter()
+
+def build_import_operations(
+    rows: List[Dict],
+    purchase_details: PurchaseDetails,
+    import_id: str,
+    enrich: bool
+) -> Tuple[List[UpdateOne], List[str]]:
+    """
+    Deterministic analyses for one chunk of imported rows (CPU-bound, run in a worker thread).
+    Financing and metrics are computed for the whole chunk at once; estimates come from
+    comparables or the fixed ratios. Listings already stored under the same reuse key are
+    left untouched ($setOnInsert), so re-importing a nightly dump only adds new listings.
+    """
+    properties: List[PropertyData] = []
+    keys: List[str] = []
+    seen = set()
+    for fields in rows:
+        fields.setdefault('property_type', 'Apartment')
+        fields.setdefault('size_sqm', 80.0)
+        fields.setdefault('title', f"{fields['property_type']} in {fields['location']}")
+        key = server.analysis_reuse_key(PropertyInput(**fields, url=fields.get('source_url'), purchase_details=purchase_details))
+        if key in seen:
+            continue
+        seen.add(key)
+        keys.append(key)
+        properties.append(PropertyData(**{'image_url': DEFAULT_IMAGE_URL, **fields}))
+    if not properties:
+        return [], []
+    
+    prices = np.array([property_data.price for property_data in properties])
+    costs = server.financing_arrays(prices, purchase_details)
+    
+    # Fixed-ratio estimates for every row, overridden where the comparables index has enough data
+    estimates = {
+        'monthly_rent_conservative': prices * finance.FALLBACK_RENT_RATIOS[0],
+        'monthly_rent_optimistic': prices * finance.FALLBACK_RENT_RATIOS[1],
+        'investment_score': np.full(prices.size, float(finance.FALLBACK_SCORE)),
+        'yoy_appreciation': np.full(prices.size, finance.FALLBACK_APPRECIATION),
+        'estimated_current_value': prices * finance.FALLBACK_VALUE_RATIO
+    }
+    sources = ['fallback'] * prices.size
+    for index, property_data in enumerate(properties):
+        comps = server.lookup_comparables(property_data)
+        if comps is not None:
+            for name, value in server.estimates_from_comparables(property_data, comps).items():
+                if name in estimates:
+                    estimates[name][index] = value
+            sources[index] = 'comparables'
+    
+    values = finance.investment_metrics(
+        prices,
+        costs['down_payment'],
+        costs['total_upfront'],
+        costs['annual_costs'],
+        estimates['monthly_rent_conservative'],
+        estimates['monthly_rent_optimistic'],
+        estimates['investment_score'],
+        estimates['yoy_appreciation'],
+        estimates['estimated_current_value']
+    )
+    # Python's round rather than np.round: it rounds the same halves as build_investment_metrics
+    columns = {
+        name: [round(value, decimals) for value in values[name].tolist()]
+        for name, decimals in finance.METRIC_DECIMALS.items()
+    }
+    scores = values['investment_score'].astype(int).tolist()
+    
+    operations = []
+    analysis_ids = []
+    for index, property_data in enumerate(properties):
+        metrics = InvestmentMetrics(investment_score=scores[index], **{name: column[index] for name, column in columns.items()})
+        analysis = AnalysisResult(
+            property_data=property_data,
+            metrics=metrics,
+            strategies=server.build_strategies(property_data, metrics),
+            ai_insights=server.fallback_ai_insights(property_data, metrics),
+            llm_mode='deferred' if enrich else 'none',
+            estimates_source=sources[index],
+            insights_source='fallback',
+            purchase_details=purchase_details
+        )
+        document = server.analysis_to_document(analysis)
+        document.update({'analysis_key': keys[index], 'import_id': import_id})
+        if enrich:
+            document['enrichment'] = 'pending'
+        operations.append(UpdateOne({'analysis_key': keys[index]}, {'$setOnInsert': document}, upsert=True))
+        analysis_ids.append(analysis.id)
+    return operations, analysis_ids
+
+async def create_import(
+    path: str,
+    file_format: str,
+    purchase_details: PurchaseDetails,
+    enrich: bool = True,
+    source: Optional[str] = None,
+    delete_file: bool = False
+) -> Dict:
+    """Register an import run for a file on local disk"""
+    now = datetime.now(timezone.utc)
+    job = {
+        '_id': str(uuid.uuid4()),
+        'status': 'queued',
+        'source': source,
+        'path': path,
+        'format': file_format,
+        'purchase_details': purchase_details.model_dump(),
+        'enrich': enrich,
+        'delete_file': delete_file,
+        'counts': {'rows': 0, 'inserted': 0, 'existing': 0, 'duplicates': 0, 'rejected': 0, 'failed': 0, 'enrichment_queued': 0},
+        'rejections': [],
+        'created_at': now,
+        'updated_at': now
+    }
+    await server.db.imports.insert_one(job)
+    return job
+
+async def run_import(import_id: str) -> Dict:
+    """
+    Stream a registered import file into db.analyses chunk by chunk: parse and
+    compute off the event loop, write each chunk with one unordered bulk upsert,
+    then queue LLM enrichment for the listings that were actually inserted
+    """
+    job = await server.db.imports.find_one({'_id': import_id})
+    if job is None:
+        # Deleted, or never registered through create_import
+        logging.error(f"Import {import_id} not found")
+        return {'_id': import_id, 'status': 'failed', 'error': 'Import not found'}
+    purchase_details = PurchaseDetails(**job['purchase_details'])
+    counts = job['counts']
+    rejections: List[Dict] = []
+    await server.db.imports.update_one({'_id': import_id}, {'$set': {'status': 'running', 'updated_at': datetime.now(timezone.utc)}})
+    
+    chunks = ingest.iter_chunks(job['path'], job['format'], IMPORT_CHUNK_ROWS)
+    row_offset = 0
+    try:
+        while True:
+            rows = await asyncio.to_thread(next, chunks, None)
+            if rows is None:
+                break
+            accepted, rejected = await asyncio.to_thread(ingest.rows_to_fields, rows)
+            counts['rows'] += len(rows)
+            counts['rejected'] += len(rejected)
+            rejections += [{'row': row_offset + offset + 1, 'reason': reason} for offset, reason in rejected][:IMPORT_MAX_REJECTIONS - len(rejections)]
+            row_offset += len(rows)
+            
+            operations, analysis_ids = await asyncio.to_thread(
+                build_import_operations, accepted, purchase_details, import_id, job['enrich']
+            )
+            counts['duplicates'] += len(accepted) - len(operations)
+            if operations:
+                try:
+                    result = (await server.db.analyses.bulk_write(operations, ordered=False)).bulk_api_result
+                except BulkWriteError as e:
+                    result = e.details
+                    counts['failed'] += len(result.get('writeErrors', []))
+                inserted = [analysis_ids[upsert['index']] for upsert in result.get('upserted', [])]
+                counts['inserted'] += len(inserted)
+                counts['existing'] += result.get('nMatched', 0)
+                if job['enrich'] and inserted:
+                    traceparent = telemetry.current_traceparent()
+                    counts['enrichment_queued'] += await server.enrichment_queue.submit_many([
+                        {'analysis_id': analysis_id, 'purchase_details': job['purchase_details'], 'traceparent': traceparent}
+                        for analysis_id in inserted
+                    ])
+            
+            await server.db.imports.update_one(
+                {'_id': import_id},
+                {'$set': {'counts': counts, 'rejections': rejections, 'updated_at': datetime.now(timezone.utc)}}
+            )
+        status, error = 'done', None
+    except Exception as e:
+        logging.error(f"Import {import_id} failed: {e}")
+        status, error = 'failed', str(e)
+    finally:
+        chunks.close()
+        if job.get('delete_file'):
+            Path(job['path']).unlink(missing_ok=True)
+    
+    update = {'status': status, 'error': error, 'counts': counts, 'rejections': rejections, 'completed_at': datetime.now(timezone.utc)}
+    await server.db.imports.update_one({'_id': import_id}, {'$set': update})
+    return {**job, **update}
+
+_import_tasks: set = set()
+
+def import_to_response(job: Dict) -> Dict:
+    return {
+        'import_id': job['_id'],
+        'status': job['status'],
+        'source': job.get('source'),
+        'format': job.get('format'),
+        'enrich': job.get('enrich'),
+        'purchase_details': job.get('purchase_details'),
+        'counts': job.get('counts'),
+        'rejections': job.get('rejections', []),
+        'error': job.get('error'),
+        'created_at': job.get('created_at'),
+        'completed_at': job.get('completed_at')
+    }
+
+@router.post("/imports", status_code=202)
+async def upload_import(
+    request: Request,
+    filename: Optional[str] = None,
+    file_format: Optional[Literal['csv', 'parquet']] = Query(default=None, alias='format'),
+    enrich: bool = True,
+    purchase_details: Optional[str] = Query(default=None, description="PurchaseDetails as JSON, applied to every row")
+):
+    """
+    Upload a CSV or Parquet listing feed as the raw request body (chunked transfer is fine).
+    The body is spooled to disk, then imported in the background; poll GET /imports/{id}.
+    Every row is analyzed with the same financing terms: the purchase_details query
+    parameter, or the PurchaseDetails defaults when it is omitted.
+    """
+    try:
+        financing_terms = PurchaseDetails.model_validate_json(purchase_details) if purchase_details else PurchaseDetails()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid purchase_details: {e}")
+    file_format = file_format or ingest.detect_format(filename, request.headers.get('content-type'))
+    upload = tempfile.NamedTemporaryFile(prefix='import-', suffix=f'.{file_format}', dir=IMPORT_UPLOAD_DIR, delete=False)
+    size = 0
+    try:
+        with upload:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > IMPORT_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload too large (max {IMPORT_MAX_BYTES} bytes)")
+                upload.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+    except BaseException:
+        Path(upload.name).unlink(missing_ok=True)
+        raise
+    
+    job = await create_import(upload.name, file_format, financing_terms, enrich=enrich, source=filename, delete_file=True)
+    task = asyncio.create_task(run_import(job['_id']))
+    _import_tasks.add(task)
+    task.add_done_callback(_import_tasks.discard)
+    return import_to_response(job)
+
+@router.get("/imports/{import_id}")
+async def get_import(import_id: str):
+    """
+    Progress counters and the first rejected rows of an import
+    """
+    job = await server.db.imports.find_one({'_id': import_id})
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return import_to_response(job)
@@ -0,0 +1,158 @@
+"""
+Streaming reader for bulk listing feeds (CSV or Parquet).
+
+Files are read in fixed-size chunks of rows, so memory stays flat whatever
+the file size. Column names are matched against a table of aliases (English
+and Italian portal exports), and each row is coerced into PropertyData fields
+or rejected with a reason. imports_api.run_import turns the chunks into analyses.
+
+Parquet support needs pyarrow.
+
+Command line (enrichment jobs are picked up by the running API server):
+
+    python backend/ingest.py listings.csv --purchase-details '{"mortgage_rate": 3.2}'
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import parsers
+
+FORMATS = ('csv', 'parquet')
+COLUMN_ALIASES = {
+    'title': ('title', 'titolo', 'name', 'headline'),
+    'location': ('location', 'address', 'indirizzo', 'city', 'comune', 'citta', 'città'),
+    'price': ('price', 'prezzo', 'asking_price'),
+    'property_type': ('property_type', 'type', 'typology', 'tipologia', 'category'),
+    'size_sqm': ('size_sqm', 'size', 'surface', 'superficie', 'mq', 'sqm', 'm2'),
+    'rooms': ('rooms', 'locali', 'vani'),
+    'bathrooms': ('bathrooms', 'bagni'),
+    'floor': ('floor', 'piano'),
+    'condition': ('condition', 'stato', 'condizioni'),
+    'year_built': ('year_built', 'anno', 'anno_costruzione'),
+    'source_url': ('source_url', 'url', 'link', 'listing_url'),
+    'image_url': ('image_url', 'image', 'foto', 'photo')
+}
+NUMERIC_FIELDS = ('price', 'size_sqm')
+INTEGER_FIELDS = ('rooms', 'bathrooms', 'year_built')
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """csv or parquet from a file extension or content type"""
+    name = (filename or '').lower()
+    if name.endswith(('.parquet', '.pq')) or 'parquet' in (content_type or ''):
+        return 'parquet'
+    return 'csv'
+
+def iter_chunks(path: str, file_format: str, chunk_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of up to `chunk_rows` raw row dicts without loading the whole file"""
+    if file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Parquet import needs pyarrow (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        chunk: List[Dict[str, Any]] = []
+        for row in csv.DictReader(f, dialect=dialect):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def resolve_columns(names) -> Dict[str, str]:
+    """Map PropertyData field -> column name present in the file"""
+    lookup = {str(name).strip().casefold(): name for name in names}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lookup:
+                columns[field] = lookup[alias]
+                break
+    return columns
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+def row_to_fields(row: Dict[str, Any], columns: Dict[str, str]) -> Dict[str, Any]:
+    """Coerce one row into PropertyData fields; raises ValueError with the rejection reason"""
+    fields = {field: _clean(row.get(column)) for field, column in columns.items()}
+    for field in NUMERIC_FIELDS:
+        fields[field] = parsers.parse_number(fields.get(field))
+    for field in INTEGER_FIELDS:
+        number = parsers.parse_number(fields.get(field))
+        fields[field] = int(number) if number is not None else None
+    if fields.get('floor') is not None:
+        fields['floor'] = str(fields['floor'])
+
+    if not fields.get('price') or fields['price'] <= 0:
+        raise ValueError("missing or invalid price")
+    if not fields.get('location'):
+        raise ValueError("missing location")
+    if fields.get('size_sqm') is not None and fields['size_sqm'] <= 0:
+        fields['size_sqm'] = None
+    return {field: value for field, value in fields.items() if value is not None}
+
+def rows_to_fields(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+    """Coerced rows and (row offset in chunk, reason) for the rejected ones"""
+    if not rows:
+        return [], []
+    columns = resolve_columns(rows[0].keys())
+    accepted, rejected = [], []
+    for offset, row in enumerate(rows):
+        try:
+            accepted.append(row_to_fields(row, columns))
+        except ValueError as e:
+            rejected.append((offset, str(e)))
+    return accepted, rejected
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a CSV/Parquet listing feed into db.analyses")
+    parser.add_argument('path', help='CSV or Parquet file')
+    parser.add_argument('--format', choices=FORMATS, help='defaults to the file extension')
+    parser.add_argument('--purchase-details', default='{}', help='PurchaseDetails overrides as JSON')
+    parser.add_argument('--no-enrich', action='store_true', help='skip the background LLM enrichment')
+    args = parser.parse_args()
+
+    # Imported lazily: server loads .env and the Mongo client
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import server
+    import imports_api
+
+    async def run():
+        # Enrichment jobs are only queued here; a running server's workers pick them up
+        server.create_clients()
+        try:
+            await server.comparables_index.refresh()
+            job = await imports_api.create_import(
+                args.path,
+                args.format or detect_format(args.path),
+                server.PurchaseDetails(**json.loads(args.purchase_details)),
+                enrich=not args.no_enrich,
+                source=Path(args.path).name
+            )
+            return await imports_api.run_import(job['_id'])
+        finally:
+            await server.stop_services()
+
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+MongoDB-backed job queue with a local pool of asyncio workers.
+
+Jobs are claimed atomically with find_one_and_update. A claimed job stays
+invisible to other workers until its visibility timeout expires; a crashed
+worker's job is picked up again once that happens. Failed jobs are retried
+with a linear backoff up to max_attempts.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+TERMINAL_STATUSES = ('done', 'failed')
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot help"""
+
+class JobQueue:
+    def __init__(
+        self,
+        collection,
+        handler: Callable[[Dict], Awaitable[Dict]],
+        workers: int = 4,
+        visibility_timeout: float = 120.0,
+        max_attempts: int = 3,
+        poll_interval: float = 0.5,
+        retry_backoff: float = 5.0
+    ):
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([('status', 1), ('visible_at', 1)])
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{uuid.uuid4().hex[:8]}-{n}"))
+            for n in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _new_job(self, payload: Dict, now: datetime) -> Dict:
+        return {
+            '_id': str(uuid.uuid4()),
+            'status': 'queued',
+            'payload': payload,
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'visible_at': now,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    async def submit(self, payload: Dict) -> Dict:
+        job = self._new_job(payload, datetime.now(timezone.utc))
+        await self.collection.insert_one(job)
+        self._wakeup.set()
+        return job
+
+    async def submit_many(self, payloads: List[Dict]) -> int:
+        """Queue many jobs with a single unordered insert; returns how many were queued"""
+        if not payloads:
+            return 0
+        now = datetime.now(timezone.utc)
+        await self.collection.insert_many([self._new_job(payload, now) for payload in payloads], ordered=False)
+        self._wakeup.set()
+        return len(payloads)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self.collection.find_one({'_id': job_id})
+
+    async def claim(self, worker_id: str) -> Optional[Dict]:
+        """Atomically take the oldest visible job (queued, or running with an expired lease)"""
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {'status': {'$in': ['queued', 'running']}, 'visible_at': {'$lte': now}},
+            {
+                '$set': {
+                    'status': 'running',
+                    'locked_by': worker_id,
+                    'visible_at': now + timedelta(seconds=self.visibility_timeout),
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('visible_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _update(self, job: Dict, fields: Dict) -> Optional[Dict]:
+        """Update a job only while this worker still holds its lease"""
+        fields['updated_at'] = datetime.now(timezone.utc)
+        updated = await self.collection.find_one_and_update(
+            {'_id': job['_id'], 'locked_by': job['locked_by']},
+            {'$set': fields},
+            return_document=ReturnDocument.AFTER
+        )
+        if updated:
+            self._publish(updated)
+        return updated
+
+    async def _heartbeat(self, job: Dict):
+        """Extend the lease while the handler is still running"""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            visible_at = datetime.now(timezone.utc) + timedelta(seconds=self.visibility_timeout)
+            await self.collection.update_one(
+                {'_id': job['_id'], 'locked_by': job['locked_by']},
+                {'$set': {'visible_at': visible_at}}
+            )
+
+    async def _process(self, job: Dict):
+        if job['attempts'] > job.get('max_attempts', self.max_attempts):
+            await self._update(job, {'status': 'failed', 'error': 'Maximum attempts exceeded'})
+            return
+
+        self._publish(job)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            result = await self.handler(job['payload'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            retry = not isinstance(e, PermanentJobError) and job['attempts'] < job.get('max_attempts', self.max_attempts)
+            logging.error(f"Job {job['_id']} attempt {job['attempts']} failed: {e}")
+            if retry:
+                visible_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_backoff * job['attempts'])
+                await self._update(job, {'status': 'queued', 'error': str(e), 'visible_at': visible_at})
+            else:
+                await self._update(job, {'status': 'failed', 'error': str(e), 'completed_at': datetime.now(timezone.utc)})
+            return
+        finally:
+            heartbeat.cancel()
+
+        await self._update(job, {'status': 'done', 'result': result, 'error': None, 'completed_at': datetime.now(timezone.utc)})
+
+    async def _worker(self, worker_id: str):
+        while True:
+            # Cleared before claiming so an enqueue during the claim is not lost
+            self._wakeup.clear()
+            try:
+                job = await self.claim(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Job worker {worker_id} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Job worker {worker_id} crashed on job {job['_id']}: {e}")
+
+    def _publish(self, job: Dict):
+        for queue in self._subscribers.get(job['_id'], []):
+            queue.put_nowait(job)
+
+    async def events(self, job_id: str, poll_interval: float = 1.0) -> AsyncIterator[Dict]:
+        """
+        Yield the job document each time its status changes, until it finishes.
+        Local workers push updates directly; Mongo is polled for jobs run elsewhere.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        last_status = None
+        try:
+            job = await self.get(job_id)
+            while job is not None:
+                if job['status'] != last_status:
+                    last_status = job['status']
+                    yield job
+                if job['status'] in TERMINAL_STATUSES:
+                    return
+                try:
+                    job = await asyncio.wait_for(queue.get(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    job = await self.get(job_id)
+        finally:
+            self._subscribers[job_id].remove(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
@@ -0,0 +1,66 @@
+"""
+Background analysis jobs (/api/jobs).
+
+Jobs are queued on server.job_queue, a jobs.JobQueue over Mongo whose workers
+run server.process_analysis_job; these routes submit jobs and report their
+status, also as server-sent events.
+"""
+from typing import Dict
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+import server
+import telemetry
+from server import ANALYSIS_PUBLIC_PROJECTION, PropertyInput
+
+router = APIRouter()
+
+def job_to_response(job: Dict) -> Dict:
+    return {
+        'job_id': job['_id'],
+        'status': job['status'],
+        'attempts': job.get('attempts', 0),
+        'error': job.get('error'),
+        'result': job.get('result'),
+        'created_at': job.get('created_at'),
+        'updated_at': job.get('updated_at'),
+        'completed_at': job.get('completed_at')
+    }
+
+@router.post("/jobs", status_code=202)
+async def submit_analysis_job(property_input: PropertyInput):
+    """
+    Queue an analysis and return its job ID immediately
+    """
+    job = await server.job_queue.submit({**property_input.model_dump(), 'traceparent': telemetry.current_traceparent()})
+    return job_to_response(job)
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """
+    Job status, with the stored analysis once it is done
+    """
+    job = await server.job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    response = job_to_response(job)
+    if job['status'] == 'done' and job.get('result'):
+        document = await server.db.analyses.find_one({'id': job['result']['analysis_id']}, ANALYSIS_PUBLIC_PROJECTION)
+        response['analysis'] = server.expand_analysis_document(document) if document else None
+    return response
+
+@router.get("/jobs/{job_id}/events")
+async def analysis_job_events(job_id: str):
+    """
+    Server-sent events for each status change of a job, ending when it completes
+    """
+    if await server.job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def stream():
+        async for job in server.job_queue.events(job_id):
+            yield server.format_stream_event(job_to_response(job), 'sse', event=job['status'])
+    
+    return StreamingResponse(stream(), media_type='text/event-stream')
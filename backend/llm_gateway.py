@@ -0,0 +1,401 @@
+"""
+Shared gateway for every LLM call made by the backend.
+
+It keeps a pool of reusable chat clients per (provider, model, system message),
+caps the number of in-flight requests, rate limits each model with a token
+bucket, retries transient failures with exponential backoff, and records
+latency and (estimated) token counters per call site.
+
+A circuit breaker per model fails calls immediately (CircuitOpenError) while
+the provider is erroring or slow, so callers serve their deterministic
+fallback instead of waiting for a deadline; after a cool-down one probe call
+decides whether it closes again. Optionally, a call still running after the
+call site's p95 latency is hedged with a duplicate and the first answer wins.
+The client has no streaming API; complete_chunked only splits a finished
+response into word chunks for incremental rendering.
+
+The client library pulls in the provider SDKs, so it is imported on the first
+call (or by load_client during startup warm-up) rather than with this module.
+"""
+import asyncio
+import logging
+import random
+import re
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ratelimit import TokenBucket
+
+# Set by load_client(); tests and benchmarks may assign stand-ins beforehand
+LlmChat = None
+UserMessage = None
+
+WORD_CHUNK_RE = re.compile(r'\S+\s*')
+TRANSIENT_ERROR_MARKERS = ('429', 'rate limit', 'rate_limit', 'overloaded', '502', '503', '504', 'timeout', 'connection')
+
+def load_client():
+    """Import the LLM client classes unless they are already set (idempotent)"""
+    global LlmChat, UserMessage
+    if LlmChat is not None and UserMessage is not None:
+        return
+    from emergentintegrations.llm.chat import LlmChat as chat_class, UserMessage as message_class
+
+    LlmChat = LlmChat or chat_class
+    UserMessage = UserMessage or message_class
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while the model's circuit is open"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); the client does not report usage"""
+    return max(1, len(text) // 4)
+
+class CallSiteStats:
+    __slots__ = (
+        'calls', 'errors', 'retries', 'short_circuited', 'hedges', 'hedge_wins',
+        'latency_ms_total', 'latency_ms_max', 'prompt_tokens', 'completion_tokens', 'recent_latencies'
+    )
+
+    def __init__(self, latency_window: int = 200):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.recent_latencies: deque = deque(maxlen=latency_window)
+
+    def record_latency(self, seconds: float):
+        elapsed_ms = seconds * 1000
+        self.latency_ms_total += elapsed_ms
+        self.latency_ms_max = max(self.latency_ms_max, elapsed_ms)
+        self.recent_latencies.append(seconds)
+
+    def latency_quantile(self, quantile: float) -> float:
+        ordered = sorted(self.recent_latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def as_dict(self) -> Dict:
+        completed = self.calls - self.errors - self.short_circuited
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'short_circuited': self.short_circuited,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'latency_ms_avg': round(self.latency_ms_total / completed, 1) if completed else 0.0,
+            'latency_ms_max': round(self.latency_ms_max, 1),
+            'prompt_tokens_est': self.prompt_tokens,
+            'completion_tokens_est': self.completion_tokens
+        }
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and the last `window` outcomes are kept. It opens
+    once at least min_calls are recorded and the share of errors or of calls
+    slower than slow_call_seconds reaches its threshold. Open: calls are
+    rejected for open_seconds. Half-open: one probe call; success closes the
+    circuit, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_rate: float = 0.5,
+        open_seconds: float = 30.0
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probing = False
+        self._outcomes: deque = deque(maxlen=window)  # (failed, slow)
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+        return True
+
+    def record(self, ok: bool, seconds: float, probe: bool = False):
+        """Outcome of a call let through by allow(); `probe` if it was the half-open probe"""
+        slow = seconds >= self.slow_call_seconds
+        if probe:
+            self._probing = False
+            if self.state != self.HALF_OPEN:
+                return
+            if ok and not slow:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                logging.info(f"LLM circuit for {self.name} closed after a successful probe")
+            else:
+                self._trip('probe failed')
+            return
+        if self.state != self.CLOSED:
+            # Started before the circuit opened; the probe decides what happens next
+            return
+        self._outcomes.append((not ok, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failed = sum(outcome[0] for outcome in self._outcomes) / len(self._outcomes)
+        slowed = sum(outcome[1] for outcome in self._outcomes) / len(self._outcomes)
+        if failed >= self.error_rate:
+            self._trip(f"{failed:.0%} of the last {len(self._outcomes)} calls failed")
+        elif slowed >= self.slow_rate:
+            self._trip(f"{slowed:.0%} of the last {len(self._outcomes)} calls took over {self.slow_call_seconds}s")
+
+    def release_probe(self):
+        """Let another call probe when this one ended without reaching the provider"""
+        self._probing = False
+
+    def _trip(self, reason: str):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._outcomes.clear()
+        logging.warning(f"LLM circuit for {self.name} opened ({reason}), failing fast for {self.open_seconds}s")
+
+    def stats(self) -> Dict:
+        return {'state': self.state, 'trips': self.trips, 'rejected': self.rejected}
+
+class LlmGateway:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_in_flight: int = 16,
+        requests_per_second: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        pool_size: int = 8,
+        breaker_options: Optional[Dict[str, Any]] = None,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20
+    ):
+        self.api_key = api_key
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.pool_size = pool_size
+        self.breaker_options = breaker_options or {}
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._limiters: Dict[str, TokenBucket] = {}
+        self._pools: Dict[Tuple[str, str, str], List['LlmChat']] = {}
+        self._stats: Dict[str, CallSiteStats] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._unpooled: set = set()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(model, **self.breaker_options)
+        return breaker
+
+    def _limiter(self, model: str) -> TokenBucket:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = TokenBucket(self.requests_per_second)
+            self._limiters[model] = limiter
+        return limiter
+
+    def _checkout(self, provider: str, model: str, system_message: str) -> 'LlmChat':
+        pool = self._pools.setdefault((provider, model, system_message), [])
+        if pool:
+            return pool.pop()
+        load_client()
+        return LlmChat(
+            api_key=self.api_key,
+            session_id=f"gateway_{model}_{uuid.uuid4().hex}",
+            system_message=system_message
+        ).with_model(provider, model)
+
+    def _checkin(self, provider: str, model: str, system_message: str, chat: 'LlmChat'):
+        """
+        Return a client to the pool with its conversation cleared. LlmChat has no
+        reset API; it keeps the conversation in a `messages` list (system message
+        first), so everything after the system message is dropped. A client
+        without that list can't be reused safely and is discarded instead.
+        """
+        history = getattr(chat, 'messages', None)
+        if not isinstance(history, list):
+            if model not in self._unpooled:
+                self._unpooled.add(model)
+                logging.warning(f"LLM client for {model} has no messages list; clients will not be pooled")
+            return
+        keep = 1 if history and isinstance(history[0], dict) and history[0].get('role') == 'system' else 0
+        del history[keep:]
+        pool = self._pools.setdefault((provider, model, system_message), [])
+        if len(pool) < self.pool_size:
+            pool.append(chat)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        message = str(error).lower()
+        return any(marker in message for marker in TRANSIENT_ERROR_MARKERS)
+
+    async def _attempt(self, system_message: str, prompt: str, provider: str, model: str) -> str:
+        chat = self._checkout(provider, model, system_message)
+        response = await chat.send_message(UserMessage(text=prompt))
+        self._checkin(provider, model, system_message, chat)
+        return response
+
+    async def _hedge_attempt(self, system_message: str, prompt: str, provider: str, model: str) -> str:
+        async with self._in_flight:
+            return await self._attempt(system_message, prompt, provider, model)
+
+    def _hedge_delay(self, stats: CallSiteStats, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or there is too little history"""
+        if not self.hedge or len(stats.recent_latencies) < self.hedge_min_samples:
+            return None
+        if self.breaker(model).state != CircuitBreaker.CLOSED:
+            return None
+        return stats.latency_quantile(self.hedge_quantile)
+
+    async def _hedged(self, stats: CallSiteStats, delay: float, system_message: str, prompt: str, provider: str, model: str) -> str:
+        """
+        Send the prompt; if no answer arrives within `delay`, send a duplicate
+        (when an in-flight slot and a rate-limit token are free right away)
+        and return whichever succeeds first
+        """
+        tasks = [asyncio.create_task(self._attempt(system_message, prompt, provider, model))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and not self._in_flight.locked() and self._limiter(model).try_acquire():
+                stats.hedges += 1
+                tasks.append(asyncio.create_task(self._hedge_attempt(system_message, prompt, provider, model)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            stats.hedge_wins += 1
+                        return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(self, stats: CallSiteStats, probe: bool, system_message: str, prompt: str, provider: str, model: str) -> str:
+        """One attempt (hedged when enabled), reported to the model's circuit breaker"""
+        breaker = self.breaker(model)
+        delay = None if probe else self._hedge_delay(stats, model)
+        started = time.perf_counter()
+        try:
+            if delay is None:
+                response = await self._attempt(system_message, prompt, provider, model)
+            else:
+                response = await self._hedged(stats, delay, system_message, prompt, provider, model)
+        except (Exception, asyncio.CancelledError):
+            # Cancellation here means the caller's deadline expired: a slow call
+            breaker.record(False, time.perf_counter() - started, probe)
+            raise
+        elapsed = time.perf_counter() - started
+        breaker.record(True, elapsed, probe)
+        stats.record_latency(elapsed)
+        return response
+
+    async def complete(self, call_site: str, system_message: str, prompt: str, provider: str, model: str) -> str:
+        """
+        Send one prompt and return the model's text, retrying transient failures.
+        Raises CircuitOpenError at once while the model's circuit is open.
+        """
+        stats = self._stats.setdefault(call_site, CallSiteStats())
+        stats.calls += 1
+        breaker = self.breaker(model)
+        if not breaker.allow():
+            stats.short_circuited += 1
+            raise CircuitOpenError(f"LLM circuit for {model} is open")
+        probe = breaker.state == CircuitBreaker.HALF_OPEN
+        stats.prompt_tokens += estimate_tokens(system_message) + estimate_tokens(prompt)
+
+        attempt = 0
+        try:
+            async with self._in_flight:
+                while True:
+                    await self._limiter(model).acquire()
+                    try:
+                        response = await self._send(stats, probe, system_message, prompt, provider, model)
+                    except Exception as e:
+                        if attempt < self.max_retries and self._is_transient(e) and breaker.state == CircuitBreaker.CLOSED:
+                            attempt += 1
+                            stats.retries += 1
+                            delay = self.backoff_base * (2 ** (attempt - 1)) * (1 + random.random())
+                            logging.warning(f"LLM call '{call_site}' failed ({e}), retrying in {delay:.2f}s")
+                            await asyncio.sleep(delay)
+                            continue
+                        stats.errors += 1
+                        raise
+
+                    stats.completion_tokens += estimate_tokens(response)
+                    return response
+        finally:
+            if probe:
+                breaker.release_probe()
+
+    async def complete_chunked(
+        self,
+        call_site: str,
+        system_message: str,
+        prompt: str,
+        provider: str,
+        model: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yield the completion in word-sized chunks. This is not token streaming: the
+        chat client only returns whole responses, so the first chunk arrives when
+        complete() would have returned and the text is split afterwards.
+        """
+        response = await asyncio.wait_for(
+            self.complete(call_site, system_message, prompt, provider, model), timeout=timeout
+        )
+        for chunk in WORD_CHUNK_RE.finditer(response):
+            yield chunk.group()
+
+    def stats(self) -> Dict:
+        return {
+            'max_in_flight': self.max_in_flight,
+            'requests_per_second': self.requests_per_second,
+            'pooled_clients': sum(len(pool) for pool in self._pools.values()),
+            'unpooled_models': sorted(self._unpooled),
+            'hedging': self.hedge,
+            'circuits': {model: breaker.stats() for model, breaker in self._breakers.items()},
+            'call_sites': {name: site.as_dict() for name, site in self._stats.items()}
+        }
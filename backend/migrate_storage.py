@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Rewrite stored analyses in the compact storage format.
+
+The API reads legacy and compact documents alike, so this can run while the
+server is up, be interrupted, and be re-run: only documents without a
+storage_version are touched.
+
+    python backend/migrate_storage.py --dry-run
+    python backend/migrate_storage.py --batch-size 1000
+"""
+import argparse
+import asyncio
+import json
+
+import bson
+
+import server
+import storage
+
+async def run(batch_size: int, limit: int, dry_run: bool) -> dict:
+    server.create_clients()
+    try:
+        return await storage.migrate(
+            server.db.analyses,
+            server.migrate_analysis_document,
+            batch_size=batch_size,
+            limit=limit,
+            dry_run=dry_run,
+            size_of=lambda document: len(bson.encode(document))
+        )
+    finally:
+        await server.stop_services()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500, help='documents read and written per round trip')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many documents')
+    parser.add_argument('--dry-run', action='store_true', help='convert and measure without writing')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.batch_size, args.limit, args.dry_run))
+    if report['bytes_before']:
+        report['size_ratio'] = round(report['bytes_after'] / report['bytes_before'], 3)
+    print(json.dumps({'dry_run': args.dry_run, **report}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""
+Listing page parser.
+
+Structured data embedded in the page (JSON-LD, Next.js __NEXT_DATA__ and
+window.__INITIAL_STATE__ payloads) is tried first. Whatever is still missing
+comes from a single lxml parse with targeted XPath selectors, and finally from
+regexes over the page text. All patterns are compiled at import time.
+Portal-specific extractors (portals.py) plug in ahead of the generic ones.
+"""
+import json
+import re
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+from urllib.parse import urljoin
+
+try:
+    import lxml.etree
+    import lxml.html
+    HAVE_LXML = True
+except ImportError:  # pragma: no cover - lxml is in requirements, bs4 keeps tooling working without it
+    from bs4 import BeautifulSoup
+    HAVE_LXML = False
+
+DEFAULT_IMAGE_URL = 'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=800&q=80'
+DEFAULT_PRICE = 250000.0
+DEFAULT_SIZE_SQM = 85.0
+DEFAULT_LOCATION = 'Italy'
+DEFAULT_PROPERTY_TYPE = 'Apartment'
+
+JSON_LD_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I | re.S)
+NEXT_DATA_RE = re.compile(r'<script[^>]+id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.I | re.S)
+INITIAL_STATE_RE = re.compile(r'window\.__INITIAL_STATE__\s*=\s*(\{.*?\})\s*;?\s*</script>', re.S)
+NUMBER_RE = re.compile(r'\d[\d.,]*')
+THOUSANDS_RE = re.compile(r'\d{1,3}(?:\.\d{3})+')
+PRICE_RE = re.compile(r'€\s*(\d[\d.,]*)|(\d[\d.,]*)\s*(?:€|EUR)\b', re.I)
+SIZE_RE = re.compile(r'(\d[\d.,]*)\s*(?:m²|m2|mq|sqm)\b', re.I)
+ROOMS_RE = re.compile(r'(\d+)\s*(?:\+\s*)?(?:locali|locale|vani|rooms?)\b', re.I)
+BATHROOMS_RE = re.compile(r'(\d+)\s*(?:bagni|bagno|bathrooms?)\b', re.I)
+FLOOR_RE = re.compile(r'\bpiano\s*:?\s*(terra|rialzato|seminterrato|attico|\d+)|\b(\d+)\s*[°º]\s*piano\b', re.I)
+IMAGE_CLASS_RE = re.compile(r'property|listing|image', re.I)
+
+# Key aliases used when walking embedded JSON payloads
+PRICE_KEYS = ('price', 'priceValue', 'formattedPrice')
+SIZE_KEYS = ('surface', 'surfaceValue', 'floorSize', 'size')
+ROOMS_KEYS = ('rooms', 'roomsNumber', 'numberOfRooms')
+BATHROOMS_KEYS = ('bathrooms', 'bathroomsNumber', 'numberOfBathroomsTotal', 'numberOfBathrooms')
+FLOOR_KEYS = ('floor', 'floorNumber')
+CITY_KEYS = ('city', 'municipality', 'addressLocality')
+ZONE_KEYS = ('macrozone', 'microzone', 'addressRegion', 'province')
+TYPE_KEYS = ('typology', 'propertyType', 'category')
+IMAGE_KEYS = ('image', 'mainImage', 'photo', 'thumbnail')
+
+JSON_LD_PROPERTY_TYPES = {
+    'Apartment', 'House', 'SingleFamilyResidence', 'Residence', 'Accommodation',
+    'Product', 'Offer', 'RealEstateListing', 'Place'
+}
+MAX_JSON_NODES = 50_000
+
+Extractor = Callable[[str], Dict[str, Any]]
+
+def parse_number(text: Any) -> Optional[float]:
+    """Parse 250.000 / 250.000,50 / 85,5 / 85 style numbers (Italian separators)"""
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return float(text)
+    if not isinstance(text, str):
+        return None
+    match = NUMBER_RE.search(text)
+    if not match:
+        return None
+    number = match.group().rstrip('.,')
+    if ',' in number:
+        number = number.replace('.', '').replace(',', '.')
+    elif THOUSANDS_RE.fullmatch(number):
+        number = number.replace('.', '')
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+def as_number(value: Any) -> Optional[float]:
+    if isinstance(value, dict):
+        for key in ('value', 'amount', 'price', 'raw'):
+            if key in value:
+                return as_number(value[key])
+        return None
+    if isinstance(value, list):
+        return as_number(value[0]) if value else None
+    return parse_number(value)
+
+def as_text(value: Any, keys=('name', 'value', 'abbreviation', 'label')) -> Optional[str]:
+    if isinstance(value, dict):
+        for key in keys:
+            if isinstance(value.get(key), (str, int, float)):
+                return str(value[key]).strip() or None
+        return None
+    if isinstance(value, list):
+        return as_text(value[0], keys) if value else None
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value).strip() or None
+    return None
+
+def as_image(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value if value.startswith(('http', '/')) else None
+    if isinstance(value, list):
+        for item in value:
+            image = as_image(item)
+            if image:
+                return image
+        return None
+    if isinstance(value, dict):
+        for key in ('url', 'contentUrl', 'large', 'medium', 'small', 'urls'):
+            if key in value:
+                image = as_image(value[key])
+                if image:
+                    return image
+    return None
+
+def find_key(data: Any, keys) -> Any:
+    """Breadth-first search for the first non-empty value under any of `keys`"""
+    queue = deque([data])
+    visited = 0
+    while queue and visited < MAX_JSON_NODES:
+        node = queue.popleft()
+        visited += 1
+        if isinstance(node, dict):
+            for key in keys:
+                value = node.get(key)
+                if value not in (None, '', [], {}):
+                    return value
+            queue.extend(value for value in node.values() if isinstance(value, (dict, list)))
+        elif isinstance(node, list):
+            queue.extend(value for value in node if isinstance(value, (dict, list)))
+    return None
+
+def fields_from_json(data: Any) -> Dict[str, Any]:
+    city = as_text(find_key(data, CITY_KEYS))
+    zone = as_text(find_key(data, ZONE_KEYS))
+    location = f"{zone}, {city}" if city and zone and zone != city else city or zone
+    rooms = as_number(find_key(data, ROOMS_KEYS))
+    bathrooms = as_number(find_key(data, BATHROOMS_KEYS))
+    return {
+        'title': as_text(find_key(data, ('title', 'name', 'headline'))),
+        'price': as_number(find_key(data, PRICE_KEYS)),
+        'size_sqm': as_number(find_key(data, SIZE_KEYS)),
+        'rooms': int(rooms) if rooms else None,
+        'bathrooms': int(bathrooms) if bathrooms else None,
+        'floor': as_text(find_key(data, FLOOR_KEYS), keys=('abbreviation', 'value', 'name')),
+        'location': location,
+        'property_type': as_text(find_key(data, TYPE_KEYS)),
+        'image_url': as_image(find_key(data, IMAGE_KEYS))
+    }
+
+def _iter_json_ld(html: str) -> Iterator[Dict]:
+    for match in JSON_LD_RE.finditer(html):
+        try:
+            data = json.loads(match.group(1))
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+        for item in items:
+            if isinstance(item, dict):
+                yield item
+
+def from_json_ld(html: str) -> Dict[str, Any]:
+    """Fields from schema.org JSON-LD blocks describing the listing"""
+    for item in _iter_json_ld(html):
+        types = item.get('@type')
+        types = set(types) if isinstance(types, list) else {types}
+        if types & JSON_LD_PROPERTY_TYPES:
+            return fields_from_json(item)
+    return {}
+
+def load_next_data(html: str) -> Any:
+    """The pageProps of a Next.js __NEXT_DATA__ payload, or None"""
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(1))
+    except ValueError:
+        return None
+    return data.get('props', {}).get('pageProps', data) if isinstance(data, dict) else data
+
+def from_next_data(html: str) -> Dict[str, Any]:
+    """Fields from a Next.js __NEXT_DATA__ page payload"""
+    page_props = load_next_data(html)
+    return fields_from_json(page_props) if page_props is not None else {}
+
+def load_initial_state(html: str) -> Any:
+    """A `window.__INITIAL_STATE__ = {...}` server-rendered store, or None"""
+    match = INITIAL_STATE_RE.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+def from_initial_state(html: str) -> Dict[str, Any]:
+    """Fields from a server-rendered window.__INITIAL_STATE__ store"""
+    state = load_initial_state(html)
+    return fields_from_json(state) if state is not None else {}
+
+def node_text(node) -> str:
+    """Whitespace-normalized text of an lxml node, with a space between child elements"""
+    return ' '.join(' '.join(node.itertext()).split())
+
+def first_text(nodes) -> Optional[str]:
+    for node in nodes:
+        text = ' '.join(node.split()) if isinstance(node, str) else node_text(node)
+        if text:
+            return text
+    return None
+
+def parse_document(html: str):
+    """lxml document for `html`, or None when it cannot be parsed (or lxml is missing)"""
+    if not HAVE_LXML:
+        return None
+    try:
+        return lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return None
+
+def from_html(html: str) -> Dict[str, Any]:
+    """Targeted selectors over one lxml parse, regexes over the visible text as a last resort"""
+    if HAVE_LXML:
+        doc = parse_document(html)
+        if doc is None:
+            return {}
+        title = first_text(doc.xpath('//h1')) or first_text(doc.xpath('//meta[@property="og:title"]/@content'))
+        price_text = first_text(doc.xpath('//*[contains(@class, "price")]'))
+        features_text = ' '.join(
+            node_text(node)
+            for node in doc.xpath('//*[contains(@class, "feature") or contains(@class, "overview")]')
+        )
+        location = first_text(doc.xpath('//*[contains(@class, "location") or contains(@class, "address")]'))
+        image = first_text(doc.xpath('//meta[@property="og:image"]/@content'))
+        if not image:
+            images = [img for img in doc.xpath('//img[@src]') if IMAGE_CLASS_RE.search(img.get('class', ''))]
+            image = images[0].get('src') if images else None
+        body = doc.find('body')
+        text = node_text(body if body is not None else doc)
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+        heading = soup.find('h1')
+        og_title = soup.find('meta', property='og:title')
+        title = heading.get_text(' ', strip=True) if heading else (og_title.get('content') if og_title else None)
+        price_node = soup.select_one('[class*=price]')
+        price_text = price_node.get_text(' ', strip=True) if price_node else None
+        features_text = ' '.join(node.get_text(' ', strip=True) for node in soup.select('[class*=feature], [class*=overview]'))
+        location_node = soup.select_one('[class*=location], [class*=address]')
+        location = location_node.get_text(' ', strip=True) if location_node else None
+        og_image = soup.find('meta', property='og:image')
+        image = og_image.get('content') if og_image else None
+        if not image:
+            img = soup.find('img', {'class': IMAGE_CLASS_RE})
+            image = img.get('src') if img else None
+        text = soup.get_text(' ')
+
+    price_match = PRICE_RE.search(price_text or '') or PRICE_RE.search(text)
+    search_text = features_text or text
+    size_match = SIZE_RE.search(search_text) or SIZE_RE.search(text)
+    rooms_match = ROOMS_RE.search(search_text) or ROOMS_RE.search(text)
+    bathrooms_match = BATHROOMS_RE.search(search_text) or BATHROOMS_RE.search(text)
+    floor_match = FLOOR_RE.search(search_text) or FLOOR_RE.search(text)
+
+    return {
+        'title': title,
+        'price': parse_number(next(group for group in price_match.groups() if group)) if price_match else None,
+        'size_sqm': parse_number(size_match.group(1)) if size_match else None,
+        'rooms': int(rooms_match.group(1)) if rooms_match else None,
+        'bathrooms': int(bathrooms_match.group(1)) if bathrooms_match else None,
+        'floor': floor_match.group(1) or floor_match.group(2) if floor_match else None,
+        'location': location,
+        'property_type': None,
+        'image_url': image
+    }
+
+REQUIRED_FIELDS = ('title', 'price', 'size_sqm', 'location')
+STRUCTURED_EXTRACTORS = (from_next_data, from_initial_state, from_json_ld)
+
+def parse_listing(html: str, url: str, extractors: Sequence[Extractor] = STRUCTURED_EXTRACTORS) -> Dict[str, Any]:
+    """
+    Parse listing HTML into the dict shape returned by extract_property_from_url.
+    `extractors` run in order and earlier ones win; the generic DOM pass fills any gaps.
+    """
+    fields: Dict[str, Any] = {}
+    for extractor in extractors:
+        for key, value in extractor(html).items():
+            if fields.get(key) is None and value is not None:
+                fields[key] = value
+
+    # Only pay for a DOM parse when structured data left gaps
+    if any(fields.get(key) is None for key in REQUIRED_FIELDS + ('rooms', 'bathrooms', 'floor', 'image_url')):
+        for key, value in from_html(html).items():
+            if fields.get(key) is None and value is not None:
+                fields[key] = value
+
+    price = fields.get('price') or DEFAULT_PRICE
+    image_url = fields.get('image_url')
+    image_url = urljoin(url, image_url) if image_url else DEFAULT_IMAGE_URL
+
+    return {
+        'title': fields.get('title') or 'Property from URL',
+        'location': fields.get('location') or DEFAULT_LOCATION,
+        'price': price,
+        'property_type': fields.get('property_type') or DEFAULT_PROPERTY_TYPE,
+        'size_sqm': fields.get('size_sqm') or DEFAULT_SIZE_SQM,
+        'rooms': fields.get('rooms'),
+        'bathrooms': fields.get('bathrooms'),
+        'floor': fields.get('floor'),
+        'source_url': url,
+        'image_url': image_url,
+        'monthly_expenses': price * 0.002
+    }
@@ -0,0 +1,223 @@
+"""
+Listing portals supported by the scraper.
+
+Each portal is a PortalParser subclass that knows its domains, how to find the
+listing ID in a URL and which extractors understand its pages; the generic
+parsers.py pipeline fills whatever they leave out. The registry maps every
+domain to its parser in a dict, so dispatch costs at most two hash lookups per
+URL, and owns the per-portal politeness limits used by the shared fetch layer
+in server.py.
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import urlparse
+
+import parsers
+from ratelimit import TokenBucket
+
+SUBITO_FEATURES = {
+    '/price': 'price',
+    '/size': 'size_sqm',
+    '/room': 'rooms',
+    '/bathrooms': 'bathrooms',
+    '/floor': 'floor'
+}
+
+def _merge(primary: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+    """`primary` with its None values filled from `fallback`"""
+    return {**fallback, **{key: value for key, value in primary.items() if value is not None}}
+
+def _feature_fields(text: str) -> Dict[str, Any]:
+    """Size, rooms, bathrooms and floor from a block of feature labels"""
+    size = parsers.SIZE_RE.search(text)
+    rooms = parsers.ROOMS_RE.search(text)
+    bathrooms = parsers.BATHROOMS_RE.search(text)
+    floor = parsers.FLOOR_RE.search(text)
+    return {
+        'size_sqm': parsers.parse_number(size.group(1)) if size else None,
+        'rooms': int(rooms.group(1)) if rooms else None,
+        'bathrooms': int(bathrooms.group(1)) if bathrooms else None,
+        'floor': floor.group(1) or floor.group(2) if floor else None
+    }
+
+def idealista_fields(html: str) -> Dict[str, Any]:
+    """idealista.it renders listings server-side: main-info header, info-data price, info-features badges"""
+    if parsers.HAVE_LXML:
+        doc = parsers.parse_document(html)
+        if doc is None:
+            return {}
+
+        def select(css_class: str) -> List[str]:
+            return [parsers.node_text(node) for node in doc.xpath(f'//*[contains(@class, "{css_class}")]')]
+    else:
+        soup = parsers.BeautifulSoup(html, 'html.parser')
+
+        def select(css_class: str) -> List[str]:
+            return [node.get_text(' ', strip=True) for node in soup.select(f'[class*="{css_class}"]')]
+
+    features = ' '.join(select('info-features') + select('details-property_features'))
+    return {
+        'title': parsers.first_text(select('main-info__title-main')),
+        'location': parsers.first_text(select('main-info__title-minor')),
+        'price': parsers.parse_number(parsers.first_text(select('info-data-price'))),
+        **_feature_fields(features)
+    }
+
+def casa_fields(html: str) -> Dict[str, Any]:
+    """casa.it ships the listing in window.__INITIAL_STATE__ (features.mq, geoInfos.district_name)"""
+    state = parsers.load_initial_state(html)
+    listing = parsers.find_key(state, ('listing',)) if state is not None else None
+    if not isinstance(listing, dict):
+        return {}
+    features = listing.get('features') or {}
+    geo = listing.get('geoInfos') or {}
+    city = parsers.as_text(geo.get('city'))
+    district = parsers.as_text(geo.get('district_name'))
+    rooms = parsers.as_number(features.get('rooms'))
+    bathrooms = parsers.as_number(features.get('bathrooms'))
+    return _merge({
+        'size_sqm': parsers.as_number(features.get('mq')),
+        'rooms': int(rooms) if rooms else None,
+        'bathrooms': int(bathrooms) if bathrooms else None,
+        'floor': parsers.as_text(features.get('floor')),
+        'location': f"{district}, {city}" if district and city else city or district,
+        'image_url': parsers.as_image(parsers.find_key(listing.get('media') or {}, ('uri', 'url')))
+    }, parsers.fields_from_json(listing))
+
+def subito_fields(html: str) -> Dict[str, Any]:
+    """subito.it ads in __NEXT_DATA__: subject, geo and a list of {uri, values} features"""
+    page_props = parsers.load_next_data(html)
+    ad = parsers.find_key(page_props, ('ad', 'item')) if page_props is not None else None
+    if not isinstance(ad, dict) or not isinstance(ad.get('features'), list):
+        return {}
+
+    fields: Dict[str, Any] = {}
+    for feature in ad['features']:
+        name = SUBITO_FEATURES.get(feature.get('uri')) if isinstance(feature, dict) else None
+        if name:
+            fields[name] = feature.get('values')
+    rooms = parsers.as_number(fields.get('rooms'))
+    bathrooms = parsers.as_number(fields.get('bathrooms'))
+
+    geo = ad.get('geo') or {}
+    city = parsers.as_text(geo.get('town') or geo.get('city'), keys=('value',))
+    zone = parsers.as_text(geo.get('zone'), keys=('value',))
+    images = ad.get('images') or []
+    image = images[0].get('cdnBaseUrl') if images and isinstance(images[0], dict) else None
+
+    return {
+        'title': parsers.as_text(ad.get('subject')),
+        'price': parsers.as_number(fields.get('price')),
+        'size_sqm': parsers.as_number(fields.get('size_sqm')),
+        'rooms': int(rooms) if rooms else None,
+        'bathrooms': int(bathrooms) if bathrooms else None,
+        'floor': parsers.as_text(fields.get('floor'), keys=('key', 'value')),
+        'location': f"{zone}, {city}" if zone and city else city or zone,
+        'property_type': parsers.as_text(ad.get('category'), keys=('friendlyName', 'name')),
+        'image_url': image or parsers.as_image(images)
+    }
+
+class PortalParser:
+    """Any site: structured data first, then the generic DOM pass"""
+    name = 'generic'
+    domains: Tuple[str, ...] = ()
+    listing_id_patterns: Tuple[Pattern, ...] = (
+        re.compile(r'/annunci/(\d+)'),
+        re.compile(r'/(\d{6,})(?:\.htm[l]?)?/?$')
+    )
+    extractors: Tuple[parsers.Extractor, ...] = parsers.STRUCTURED_EXTRACTORS
+    # Politeness overrides; None uses the registry defaults
+    rate_per_second: Optional[float] = None
+    max_concurrency: Optional[int] = None
+
+    def listing_id(self, path: str) -> Optional[str]:
+        for pattern in self.listing_id_patterns:
+            match = pattern.search(path)
+            if match:
+                return match.group(1)
+        return None
+
+    def parse(self, html: str, url: str) -> Dict[str, Any]:
+        """Parse listing HTML into the dict shape returned by extract_property_from_url"""
+        return parsers.parse_listing(html, url, self.extractors)
+
+class ImmobiliareParser(PortalParser):
+    name = 'immobiliare.it'
+    domains = ('immobiliare.it',)
+    listing_id_patterns = (re.compile(r'/annunci/(\d+)'),)
+    extractors = (parsers.from_next_data, parsers.from_json_ld)
+
+class IdealistaParser(PortalParser):
+    name = 'idealista.it'
+    domains = ('idealista.it',)
+    listing_id_patterns = (re.compile(r'/immobile/(\d+)'),)
+    extractors = (idealista_fields, parsers.from_json_ld)
+    # idealista throttles aggressive clients, stay well under the default
+    rate_per_second = 1.0
+    max_concurrency = 2
+
+class CasaParser(PortalParser):
+    name = 'casa.it'
+    domains = ('casa.it',)
+    listing_id_patterns = (re.compile(r'/immobili/(\d+)'),)
+    extractors = (casa_fields, parsers.from_json_ld)
+
+class SubitoParser(PortalParser):
+    name = 'subito.it'
+    domains = ('subito.it',)
+    listing_id_patterns = (re.compile(r'-(\d+)\.htm'),)
+    extractors = (subito_fields, parsers.from_json_ld)
+
+PORTALS = (ImmobiliareParser, IdealistaParser, CasaParser, SubitoParser)
+
+class PortalRegistry:
+    """Domain -> parser dispatch plus per-portal rate and concurrency limits"""
+
+    def __init__(self, default_rate: float, default_concurrency: int, limits: Optional[Dict[str, Dict]] = None):
+        self.default_rate = default_rate
+        self.default_concurrency = default_concurrency
+        self.limits = limits or {}
+        self.generic = PortalParser()
+        self._by_domain: Dict[str, PortalParser] = {}
+        self._limiters: Dict[str, Tuple[TokenBucket, asyncio.Semaphore]] = {}
+
+    def register(self, parser: PortalParser) -> PortalParser:
+        for domain in parser.domains:
+            self._by_domain[domain] = parser
+            self._by_domain[f"www.{domain}"] = parser
+        return parser
+
+    def for_url(self, url: str) -> PortalParser:
+        host = urlparse(url).hostname or ''
+        parser = self._by_domain.get(host)
+        if parser is None:
+            # Other subdomains (m.casa.it, ...) resolve through the registrable domain
+            parser = self._by_domain.get('.'.join(host.rsplit('.', 2)[-2:]), self.generic)
+        return parser
+
+    def parse(self, html: str, url: str) -> Dict[str, Any]:
+        return self.for_url(url).parse(html, url)
+
+    def limiters(self, url: str) -> Tuple[TokenBucket, asyncio.Semaphore]:
+        """
+        Rate limiter and connection semaphore for the portal serving `url`.
+        Known portals share one pair across their hosts; unknown sites get one per host.
+        """
+        parser = self.for_url(url)
+        key = parser.name if parser is not self.generic else (urlparse(url).hostname or '')
+        pair = self._limiters.get(key)
+        if pair is None:
+            config = self.limits.get(key, {})
+            rate = config.get('rate', parser.rate_per_second if parser.rate_per_second is not None else self.default_rate)
+            concurrency = config.get('concurrency', parser.max_concurrency or self.default_concurrency)
+            pair = (TokenBucket(rate), asyncio.Semaphore(concurrency))
+            self._limiters[key] = pair
+        return pair
+
+def default_registry(default_rate: float, default_concurrency: int, limits: Optional[Dict[str, Dict]] = None) -> PortalRegistry:
+    """Registry with every portal in PORTALS"""
+    registry = PortalRegistry(default_rate, default_concurrency, limits)
+    for portal in PORTALS:
+        registry.register(portal())
+    return registry
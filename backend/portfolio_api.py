@@ -0,0 +1,276 @@
+"""
+Portfolios of stored analyses (/api/portfolios).
+
+A portfolio stores only analysis ids and default financing; its summary is
+recomputed on every read by one aggregation that collapses the analyses into
+parallel arrays, valued together with the finance.py formulas.
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+
+import finance
+import server
+from server import PurchaseDetails
+
+# Upper bound on the number of analyses in one portfolio
+PORTFOLIO_MAX_PROPERTIES = int(os.environ.get('PORTFOLIO_MAX_PROPERTIES', '5000'))
+
+router = APIRouter()
+
+class PortfolioInput(BaseModel):
+    name: str = 'Portfolio'
+    analysis_ids: List[str] = Field(min_length=1)
+    # Financing for analyses stored without their own purchase details
+    purchase_details: Optional[PurchaseDetails] = None
+    horizon_years: int = Field(default=5, ge=1, le=40)
+
+PORTFOLIO_FINANCING_FIELDS = (
+    'mortgage_percentage', 'mortgage_rate', 'mortgage_years', 'purchase_tax_rate', 'notary_fees',
+    'agency_fees_percentage', 'annual_property_tax', 'maintenance_percentage'
+)
+
+def portfolio_pipeline(analysis_ids: List[str], purchase_details: PurchaseDetails) -> List[Dict]:
+    """
+    Collapse the portfolio's analyses into one document of parallel arrays
+    (one entry per analysis), ready to be turned into NumPy columns
+    """
+    defaults = purchase_details.model_dump()
+    return [
+        {'$match': {'id': {'$in': analysis_ids}, 'property_data.price': {'$gt': 0}}},
+        {'$group': {
+            '_id': None,
+            'id': {'$push': '$id'},
+            'title': {'$push': '$property_data.title'},
+            'location': {'$push': '$property_data.location'},
+            'price': {'$push': '$property_data.price'},
+            # null where missing, so every array keeps one entry per analysis
+            'monthly_rent_conservative': {'$push': {'$ifNull': ['$metrics.monthly_rent_conservative', None]}},
+            'monthly_rent_optimistic': {'$push': {'$ifNull': ['$metrics.monthly_rent_optimistic', None]}},
+            'long_term_rental_yield': {'$push': {'$ifNull': ['$metrics.long_term_rental_yield', None]}},
+            'yoy_appreciation': {'$push': '$metrics.yoy_appreciation'},
+            **{field: {'$push': {'$ifNull': [f'$purchase_details.{field}', defaults[field]]}} for field in PORTFOLIO_FINANCING_FIELDS}
+        }}
+    ]
+
+def portfolio_rents(columns: Dict[str, List]) -> Tuple[List[Optional[float]], List[str]]:
+    """
+    Average monthly rent per holding from its stored estimates. Analyses stored
+    before those were recorded fall back to the rent implied by the (rounded)
+    rental yield; with neither the rent is None and the holding can't be valued.
+    Also returns the ids that used the fallback.
+    """
+    rents, from_yield = [], []
+    for analysis_id, price, conservative, optimistic, rental_yield in zip(
+        columns['id'], columns['price'], columns['monthly_rent_conservative'],
+        columns['monthly_rent_optimistic'], columns['long_term_rental_yield']
+    ):
+        if conservative is not None and optimistic is not None:
+            rents.append((conservative + optimistic) / 2)
+        elif rental_yield:
+            rents.append(price * rental_yield / 100 / 12)
+            from_yield.append(analysis_id)
+        else:
+            rents.append(None)
+    return rents, from_yield
+
+def portfolio_summary(columns: Dict[str, List], horizon_years: int) -> Dict:
+    """
+    Combined capital, debt, cash flow and returns of a portfolio, computed for all
+    properties at once with the same finance formulas as calculate_metrics_with_ai.
+    ROI is blended by upfront capital and ROE by equity; within every mortgage term
+    a holding's ROI equals the one on its stored analysis.
+    """
+    price = np.asarray(columns['price'], dtype=float)
+    params = {field: np.asarray(columns[field], dtype=float) for field in PORTFOLIO_FINANCING_FIELDS}
+    costs = finance.financing(price, **params)
+    monthly_rent = np.asarray(columns['monthly_rent'], dtype=float)
+    operating_costs = costs['annual_costs'] - costs['monthly_mortgage'] * 12
+    yearly = finance.yearly_projection(
+        price,
+        costs['mortgage_amount'],
+        params['mortgage_rate'],
+        params['mortgage_years'],
+        costs['monthly_mortgage'],
+        operating_costs,
+        monthly_rent,
+        np.asarray(columns['yoy_appreciation'], dtype=float),
+        horizon_years
+    )
+    
+    # Per holding: first-year cash flow and ROE as in returns(), ROI over the horizon
+    equity = np.where(costs['down_payment'] > 0, costs['down_payment'], price)
+    annual_net_cashflow = yearly['net_cashflow'][0]
+    total_gain = yearly['cumulative_cashflow'] + yearly['property_value'] - price
+    roi = total_gain[-1] / costs['total_upfront'] * 100
+    roe = annual_net_cashflow / equity * 100
+    
+    totals = {name: values.sum(axis=1) for name, values in yearly.items()}
+    total_price = price.sum()
+    total_upfront = costs['total_upfront'].sum()
+    total_debt = costs['mortgage_amount'].sum()
+    annual_debt_service = costs['monthly_mortgage'].sum() * 12
+    annual_rent = monthly_rent.sum() * 12
+    net_operating_income = annual_rent - operating_costs.sum()
+    
+    return {
+        'properties': int(price.size),
+        'horizon_years': horizon_years,
+        'total_price': round(float(total_price), 2),
+        'total_upfront': round(float(total_upfront), 2),
+        'total_debt': round(float(total_debt), 2),
+        'loan_to_value': round(float(total_debt / total_price * 100), 2),
+        'annual_rent': round(float(annual_rent), 2),
+        'annual_operating_costs': round(float(operating_costs.sum()), 2),
+        'annual_debt_service': round(float(annual_debt_service), 2),
+        'debt_service_coverage': round(float(net_operating_income / annual_debt_service), 2) if annual_debt_service > 0 else None,
+        'annual_net_cashflow': round(float(annual_net_cashflow.sum())),
+        'monthly_cash_flow': round(float(annual_net_cashflow.sum() / 12), 2),
+        'gross_rental_yield': round(float(annual_rent / total_price * 100), 2),
+        'roi': round(float(total_gain[-1].sum() / total_upfront * 100), 2),
+        'roe': round(float(annual_net_cashflow.sum() / equity.sum() * 100), 2),
+        'projected_value': round(float(totals['property_value'][-1]), 2),
+        'projections': [
+            {
+                'year': year + 1,
+                'property_value': round(float(totals['property_value'][year]), 2),
+                'mortgage_balance': round(float(totals['mortgage_balance'][year]), 2),
+                'equity': round(float(totals['property_value'][year] - totals['mortgage_balance'][year]), 2),
+                'debt_service': round(float(totals['debt_service'][year]), 2),
+                'net_cashflow': round(float(totals['net_cashflow'][year])),
+                'cumulative_cashflow': round(float(totals['cumulative_cashflow'][year])),
+                'total_return_pct': round(float(total_gain[year].sum() / total_upfront * 100), 2)
+            }
+            for year in range(horizon_years)
+        ],
+        'holdings': [
+            {
+                'id': analysis_id,
+                'title': title,
+                'location': location,
+                'price': holding_price,
+                'total_upfront': upfront,
+                'annual_net_cashflow': cashflow,
+                'roi': holding_roi,
+                'roe': holding_roe
+            }
+            for analysis_id, title, location, holding_price, upfront, cashflow, holding_roi, holding_roe in zip(
+                columns['id'],
+                columns['title'],
+                columns['location'],
+                price.tolist(),
+                np.round(costs['total_upfront'], 2).tolist(),
+                np.round(annual_net_cashflow).tolist(),
+                np.round(roi, 2).tolist(),
+                np.round(roe, 2).tolist()
+            )
+        ]
+    }
+
+async def compute_portfolio(portfolio: Dict, horizon_years: Optional[int] = None) -> Optional[Dict]:
+    """Run the portfolio aggregation over whichever of its analyses still exist and have a rent (None if none do)"""
+    started = time.perf_counter()
+    analysis_ids = portfolio['analysis_ids']
+    purchase_details = PurchaseDetails(**(portfolio.get('purchase_details') or {}))
+    results = await server.db.analyses.aggregate(portfolio_pipeline(analysis_ids, purchase_details)).to_list(1)
+    if not results or not results[0]['id']:
+        return None
+    
+    columns = results[0]
+    found = set(columns['id'])
+    rents, from_yield = portfolio_rents(columns)
+    keep = [index for index, rent in enumerate(rents) if rent is not None]
+    if not keep:
+        return None
+    columns = {name: [values[index] for index in keep] for name, values in columns.items() if name != '_id'}
+    columns['monthly_rent'] = [rents[index] for index in keep]
+    
+    summary = portfolio_summary(columns, horizon_years or portfolio['horizon_years'])
+    summary['missing_ids'] = [analysis_id for analysis_id in analysis_ids if analysis_id not in found]
+    # Stored without rent estimates or rental yield: left out of every figure above
+    summary['excluded_ids'] = [analysis_id for analysis_id, rent in zip(results[0]['id'], rents) if rent is None]
+    # Valued with the rent implied by the rounded rental yield (stored before rent estimates were)
+    summary['rent_from_yield_ids'] = from_yield
+    summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return summary
+
+async def validated_portfolio(portfolio_input: PortfolioInput) -> Tuple[Dict, Dict]:
+    """Portfolio fields to store and their summary; rejects portfolios with no existing analysis"""
+    analysis_ids = list(dict.fromkeys(portfolio_input.analysis_ids))
+    if len(analysis_ids) > PORTFOLIO_MAX_PROPERTIES:
+        raise HTTPException(status_code=400, detail=f"Too many analyses: {len(analysis_ids)} (max {PORTFOLIO_MAX_PROPERTIES})")
+    portfolio = {
+        'name': portfolio_input.name,
+        'analysis_ids': analysis_ids,
+        'purchase_details': portfolio_input.purchase_details.model_dump() if portfolio_input.purchase_details else None,
+        'horizon_years': portfolio_input.horizon_years,
+        'updated_at': datetime.now(timezone.utc)
+    }
+    summary = await compute_portfolio(portfolio)
+    if summary is None:
+        raise HTTPException(status_code=400, detail="None of the analyses exist with rent estimates")
+    return portfolio, summary
+
+def portfolio_to_response(portfolio: Dict, summary: Optional[Dict]) -> Dict:
+    return {
+        'id': portfolio['_id'],
+        'name': portfolio['name'],
+        'analysis_ids': portfolio['analysis_ids'],
+        'purchase_details': portfolio.get('purchase_details'),
+        'horizon_years': portfolio['horizon_years'],
+        'created_at': portfolio['created_at'],
+        'updated_at': portfolio['updated_at'],
+        'summary': summary  # None once every analysis has been deleted
+    }
+
+@router.post("/portfolios")
+async def create_portfolio(portfolio_input: PortfolioInput):
+    """
+    Group stored analyses into a portfolio and return its combined metrics
+    """
+    portfolio, summary = await validated_portfolio(portfolio_input)
+    portfolio.update({'_id': str(uuid.uuid4()), 'created_at': portfolio['updated_at']})
+    await server.db.portfolios.insert_one(portfolio)
+    return portfolio_to_response(portfolio, summary)
+
+@router.get("/portfolios/{portfolio_id}")
+async def get_portfolio(portfolio_id: str, horizon_years: Optional[int] = Query(default=None, ge=1, le=40)):
+    """
+    Portfolio with aggregate capital, cash flow, leverage and year-by-year projections
+    recomputed from its analyses
+    """
+    portfolio = await server.db.portfolios.find_one({'_id': portfolio_id})
+    if portfolio is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    return portfolio_to_response(portfolio, await compute_portfolio(portfolio, horizon_years))
+
+@router.put("/portfolios/{portfolio_id}")
+async def update_portfolio(portfolio_id: str, portfolio_input: PortfolioInput):
+    """
+    Replace a portfolio's name, analyses, default financing and horizon
+    """
+    fields, summary = await validated_portfolio(portfolio_input)
+    portfolio = await server.db.portfolios.find_one_and_update(
+        {'_id': portfolio_id},
+        {'$set': fields},
+        return_document=ReturnDocument.AFTER
+    )
+    if portfolio is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    return portfolio_to_response(portfolio, summary)
+
+@router.delete("/portfolios/{portfolio_id}", status_code=204)
+async def delete_portfolio(portfolio_id: str):
+    """
+    Delete a portfolio (its analyses are kept)
+    """
+    result = await server.db.portfolios.delete_one({'_id': portfolio_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
@@ -0,0 +1,195 @@
+"""
+Deterministic projections of one property (/api/projection) and break-even /
+sensitivity solving for stored analyses (/api/analyses/{id}/solve).
+
+Stored analyses are re-evaluated from their recorded rent estimates, so neither
+endpoint scrapes or calls the LLM when given an analysis id.
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+import finance
+import server
+from server import PropertyData, PropertyInput, PurchaseDetails
+
+router = APIRouter()
+
+class RefinanceSpec(BaseModel):
+    year: int = Field(ge=1, le=39)  # refinance at the end of this year
+    rate: float = Field(ge=0, le=30)
+    years: Optional[int] = Field(default=None, ge=1, le=40)  # defaults to the remaining term
+    costs: float = 0.0
+
+class ProjectionRequest(BaseModel):
+    property: Optional[PropertyInput] = None
+    analysis_id: Optional[str] = None  # project a stored analysis instead (no scraping or LLM call)
+    horizon_years: int = Field(default=30, ge=1, le=40)
+    # Omitted rent/appreciation come from the AI (or stored) estimates
+    monthly_rent: Optional[float] = Field(default=None, ge=0)
+    yoy_appreciation: Optional[float] = None
+    rent_growth: float = 0.0  # % per year
+    cost_growth: float = 0.0  # % per year, property tax and maintenance
+    discount_rate: float = 5.0  # % per year, for NPV
+    selling_costs_percentage: float = Field(default=0.0, ge=0, le=100)
+    refinance: Optional[RefinanceSpec] = None
+    include_schedule: bool = True  # month-by-month amortization rows
+
+class SolverRequest(BaseModel):
+    purchase_details: Optional[PurchaseDetails] = None  # defaults to the ones stored with the analysis
+    monthly_rent: Optional[float] = Field(default=None, ge=0)
+    yoy_appreciation: Optional[float] = None
+    horizon_years: int = Field(default=5, ge=1, le=40)
+    change_pct: float = Field(default=10.0, gt=0, le=50)  # tornado: +/- change applied to each input
+    max_mortgage_percentage: float = Field(default=95.0, ge=0, lt=100)
+
+async def stored_analysis_inputs(
+    analysis_id: str,
+    purchase_details: Optional[PurchaseDetails] = None
+) -> Tuple[PropertyData, PurchaseDetails, Dict[str, float]]:
+    """
+    Property, financing and estimates of a stored analysis. Analyses stored before
+    the rent estimates were recorded fall back to the average rent implied by the
+    (rounded) rental yield, with source 'rental_yield'; with neither it's a 409.
+    """
+    document = await server.db.analyses.find_one({'id': analysis_id}, {'_id': 0, 'property_data': 1, 'metrics': 1, 'purchase_details': 1, 'estimates_source': 1})
+    if document is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    property_data = PropertyData(**document['property_data'])
+    metrics = document['metrics']
+    source = document.get('estimates_source') or 'stored'
+    rents = (metrics.get('monthly_rent_conservative'), metrics.get('monthly_rent_optimistic'))
+    if None in rents:
+        if not metrics.get('long_term_rental_yield'):
+            raise HTTPException(
+                status_code=409,
+                detail="Analysis was stored without rent estimates; run it again through /api/analyze"
+            )
+        monthly_rent = property_data.price * metrics['long_term_rental_yield'] / 100 / 12
+        rents, source = (monthly_rent, monthly_rent), 'rental_yield'
+    return property_data, purchase_details or PurchaseDetails(**(document.get('purchase_details') or {})), {
+        'monthly_rent_conservative': rents[0],
+        'monthly_rent_optimistic': rents[1],
+        'investment_score': metrics['investment_score'],
+        'yoy_appreciation': metrics['yoy_appreciation'],
+        'estimated_current_value': metrics['estimated_value'],
+        'source': source
+    }
+
+async def resolve_projection_inputs(
+    property_input: Optional[PropertyInput],
+    analysis_id: Optional[str]
+) -> Tuple[PropertyData, PurchaseDetails, Dict[str, float]]:
+    """A stored analysis when analysis_id is given, else the property with its (cached) AI estimates"""
+    if analysis_id:
+        return await stored_analysis_inputs(analysis_id, property_input.purchase_details if property_input else None)
+    if property_input is None:
+        raise HTTPException(status_code=400, detail="Provide either property or analysis_id")
+    purchase_details = property_input.purchase_details or PurchaseDetails()
+    property_data = await server.resolve_property_data(property_input)
+    financing = server.compute_financing(property_data.price, purchase_details)
+    estimates = await server.estimate_rent_with_ai(property_data, purchase_details, financing, refresh=property_input.refresh_ai)
+    return property_data, purchase_details, estimates
+
+@router.post("/projection")
+async def projection_endpoint(request: ProjectionRequest):
+    """
+    Month-by-month amortization schedule and yearly projection (equity build-up,
+    cash flow with rent/cost growth, optional refinance, IRR, NPV, break-even year)
+    """
+    property_data, purchase_details, estimates = await resolve_projection_inputs(request.property, request.analysis_id)
+    monthly_rent = request.monthly_rent if request.monthly_rent is not None else \
+        (estimates['monthly_rent_conservative'] + estimates['monthly_rent_optimistic']) / 2
+    yoy_appreciation = request.yoy_appreciation if request.yoy_appreciation is not None else estimates['yoy_appreciation']
+    
+    started = time.perf_counter()
+    financing = server.compute_financing(property_data.price, purchase_details)
+    refinance = request.refinance
+    projection = finance.cashflow_projection(
+        property_data.price,
+        financing['total_upfront'],
+        financing['mortgage_amount'],
+        purchase_details.mortgage_rate,
+        purchase_details.mortgage_years,
+        financing['annual_costs'] - financing['monthly_mortgage'] * 12,
+        monthly_rent,
+        yoy_appreciation,
+        request.horizon_years,
+        rent_growth=request.rent_growth,
+        cost_growth=request.cost_growth,
+        discount_rate=request.discount_rate,
+        selling_costs_percentage=request.selling_costs_percentage,
+        refinance_year=refinance.year if refinance else None,
+        refinance_rate=refinance.rate if refinance else None,
+        refinance_years=refinance.years if refinance else None,
+        refinance_costs=refinance.costs if refinance else 0.0
+    )
+    yearly = {name: np.round(values[0], 2).tolist() for name, values in projection['yearly'].items()}
+    summary = projection['summary']
+    irr = float(summary['irr'][0])
+    break_even_year = int(summary['break_even_year'][0])
+    
+    return {
+        'property_data': property_data.model_dump(mode='json'),
+        'purchase_details': purchase_details.model_dump(),
+        'monthly_rent': round(monthly_rent, 2),
+        'yoy_appreciation': yoy_appreciation,
+        'base_estimates': estimates,
+        'summary': {
+            'monthly_payment': round(financing['monthly_mortgage'], 2),
+            'total_upfront': round(financing['total_upfront'], 2),
+            'total_interest': round(float(summary['total_interest'][0]), 2),
+            'irr': round(irr, 2) if not np.isnan(irr) else None,
+            'npv': round(float(summary['npv'][0]), 2),
+            'break_even_year': break_even_year or None,
+            'equity': yearly['equity'][-1],
+            'total_return': yearly['total_return'][-1]
+        },
+        'yearly': [{'year': year + 1, **{name: values[year] for name, values in yearly.items()}} for year in range(request.horizon_years)],
+        'schedule': {
+            'month': list(range(1, request.horizon_years * 12 + 1)),
+            **{name: np.round(values[0], 2).tolist() for name, values in projection['schedule'].items()}
+        } if request.include_schedule else None,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+@router.post("/analyses/{analysis_id}/solve")
+async def solve_analysis(analysis_id: str, request: SolverRequest):
+    """
+    Break-even values (max price and rate for non-negative cash flow, min rent,
+    ROE-maximizing mortgage percentage) and tornado sensitivities for a stored
+    analysis, from the deterministic model only (no scraping or LLM call)
+    """
+    property_data, purchase_details, estimates = await stored_analysis_inputs(analysis_id, request.purchase_details)
+    
+    started = time.perf_counter()
+    base = {
+        'price': property_data.price,
+        **purchase_details.model_dump(exclude={'is_first_home'}),
+        'monthly_rent': request.monthly_rent if request.monthly_rent is not None else
+            (estimates['monthly_rent_conservative'] + estimates['monthly_rent_optimistic']) / 2,
+        'yoy_appreciation': request.yoy_appreciation if request.yoy_appreciation is not None else estimates['yoy_appreciation']
+    }
+    current = finance.evaluate(base, request.horizon_years)
+    break_even = finance.break_even(base, request.horizon_years, request.max_mortgage_percentage)
+    
+    return {
+        'analysis_id': analysis_id,
+        'estimates_source': estimates['source'],
+        'base': {
+            **base,
+            'annual_net_cashflow': round(float(current['annual_net_cashflow'])),
+            'roi': round(float(current['roi']), 2),
+            'roe': round(float(current['roe']), 2)
+        },
+        # None: no value in range makes the cash flow non-negative (or it never turns negative)
+        'break_even': {name: round(value, 2) if not np.isnan(value) else None for name, value in break_even.items()},
+        'sensitivities': [
+            {name: round(value, 2) if isinstance(value, float) else value for name, value in bar.items()}
+            for bar in finance.tornado(base, request.horizon_years, request.change_pct)
+        ],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
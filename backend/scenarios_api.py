@@ -0,0 +1,93 @@
+"""
+What-if grids over financing, rent and appreciation for one property (/api/scenarios).
+
+The rent estimate is fetched once through server.estimate_rent_with_ai (and
+cached there); the sweep itself is finance.scenario_grid over NumPy arrays.
+"""
+import os
+import time
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+import finance
+import server
+from server import PropertyInput, PurchaseDetails
+
+# Upper bound on the size of a /api/scenarios grid
+MAX_SCENARIOS = int(os.environ.get('MAX_SCENARIOS', '250000'))
+
+router = APIRouter()
+
+class SweepRange(BaseModel):
+    min: float
+    max: float
+    steps: int = Field(default=10, ge=1, le=1000)
+
+class ScenarioRequest(BaseModel):
+    property: PropertyInput
+    # Each axis is either an explicit list of values or an evenly spaced range;
+    # omitted axes stay at the PurchaseDetails / AI estimate value
+    mortgage_rate: Optional[Union[List[float], SweepRange]] = None
+    mortgage_percentage: Optional[Union[List[float], SweepRange]] = None
+    mortgage_years: Optional[Union[List[float], SweepRange]] = None
+    monthly_rent: Optional[Union[List[float], SweepRange]] = None
+    yoy_appreciation: Optional[Union[List[float], SweepRange]] = None
+    horizon_years: int = Field(default=5, ge=1, le=40)
+
+class ScenarioGrid(BaseModel):
+    axes: Dict[str, List[float]]
+    shape: List[int]
+    count: int
+    base_estimates: Dict[str, Union[float, str]]  # estimates plus their source
+    metrics: Dict[str, List[float]]  # flat, C-ordered over `axes`
+    elapsed_ms: float
+
+@router.post("/scenarios", response_model=ScenarioGrid)
+async def scenarios_endpoint(request: ScenarioRequest):
+    """
+    Evaluate a grid of financing/rent/appreciation scenarios for one property.
+    The AI rent estimate is fetched once (and cached); the sweep itself is pure NumPy.
+    """
+    purchase_details = request.property.purchase_details or PurchaseDetails()
+    property_data = await server.resolve_property_data(request.property)
+    financing = server.compute_financing(property_data.price, purchase_details)
+    estimates = await server.estimate_rent_with_ai(
+        property_data, purchase_details, financing, refresh=request.property.refresh_ai
+    )
+    
+    started = time.perf_counter()
+    base = {
+        'price': property_data.price,
+        **purchase_details.model_dump(exclude={'is_first_home'}),
+        'monthly_rent': (estimates['monthly_rent_conservative'] + estimates['monthly_rent_optimistic']) / 2,
+        'yoy_appreciation': estimates['yoy_appreciation']
+    }
+    axes: Dict[str, List[float]] = {}
+    for name in finance.SCENARIO_AXES:
+        axis = getattr(request, name)
+        if isinstance(axis, SweepRange):
+            axes[name] = np.linspace(axis.min, axis.max, axis.steps).tolist()
+        elif axis:
+            axes[name] = [float(value) for value in axis]
+        elif name == 'monthly_rent':
+            axes[name] = [estimates['monthly_rent_conservative'], estimates['monthly_rent_optimistic']]
+        else:
+            axes[name] = [float(base[name])]
+    
+    count = int(np.prod([len(values) for values in axes.values()]))
+    if count > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Too many scenarios: {count} (max {MAX_SCENARIOS})")
+    
+    shape, metrics = finance.scenario_grid(base, axes, request.horizon_years)
+    
+    return server.model_response(ScenarioGrid(
+        axes=axes,
+        shape=list(shape),
+        count=count,
+        base_estimates=estimates,
+        metrics={name: np.round(values, 2).tolist() for name, values in metrics.items()},
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    ))
@@ -1,29 +1,190 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict
+from pydantic import BaseModel, Field, ConfigDict, computed_field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, List, Literal, Optional, Dict, Tuple
 import uuid
-from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-import requests
-from bs4 import BeautifulSoup
+import time
+import json
+import hashlib
+import base64
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qsl, urlencode
+from cachetools import TTLCache
+import asyncio
 import re
+import numpy as np
+
+import comparables
+import finance
+import jobs
+import parsers
+import portals
+import simulation
+import telemetry
+from llm_gateway import CircuitOpenError, LlmGateway, load_client as load_llm_client
+from ratelimit import TokenBucket
+from storage import STORAGE_VERSION, as_utc, compress_text, decompress_text
+
+if TYPE_CHECKING:
+    import httpx
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, opened by the lifespan handler (create_clients) rather than at import,
+# so tooling can import this module without MONGO_URL or the driver's startup cost
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+client = None
+db = None
+
+# Startup warm-up (index creation, cache priming, pool pre-fill) runs concurrently within this budget
+STARTUP_WARMUP_TIMEOUT = float(os.environ.get('STARTUP_WARMUP_TIMEOUT', '30'))
+WARMUP_CACHE_ENTRIES = int(os.environ.get('WARMUP_CACHE_ENTRIES', '512'))
+
+# Shared HTTP connection pool for listing scraping (created at startup)
+SCRAPER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+SCRAPER_TIMEOUT = float(os.environ.get('SCRAPER_TIMEOUT', '10'))
+SCRAPER_MAX_CONNECTIONS = int(os.environ.get('SCRAPER_MAX_CONNECTIONS', '100'))
+SCRAPER_MAX_PER_HOST = int(os.environ.get('SCRAPER_MAX_PER_HOST', '8'))
+http_client: Optional['httpx.AsyncClient'] = None
+
+# Upstream rate limits (requests per second, 0 disables)
+SCRAPER_RATE_PER_HOST = float(os.environ.get('SCRAPER_RATE_PER_HOST', '2'))
+# Per-portal overrides, e.g. {"idealista.it": {"rate": 0.5, "concurrency": 2}}
+SCRAPER_PORTAL_LIMITS = json.loads(os.environ.get('SCRAPER_PORTAL_LIMITS', '{}'))
+LLM_RATE = float(os.environ.get('LLM_RATE', '10'))
+LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', '16'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+# Per-model circuit breaker: opens on error or slow-call share, fails fast for LLM_BREAKER_OPEN_SECONDS
+LLM_BREAKER_OPTIONS = {
+    'window': int(os.environ.get('LLM_BREAKER_WINDOW', '20')),
+    'min_calls': int(os.environ.get('LLM_BREAKER_MIN_CALLS', '10')),
+    'error_rate': float(os.environ.get('LLM_BREAKER_ERROR_RATE', '0.5')),
+    'slow_call_seconds': float(os.environ.get('LLM_BREAKER_SLOW_SECONDS', '20')),
+    'slow_rate': float(os.environ.get('LLM_BREAKER_SLOW_RATE', '0.5')),
+    'open_seconds': float(os.environ.get('LLM_BREAKER_OPEN_SECONDS', '30'))
+}
+# Hedged LLM requests: duplicate a call still running after the call site's p95 latency
+LLM_HEDGE = os.environ.get('LLM_HEDGE', '0').lower() in ('1', 'true', 'yes')
+LLM_HEDGE_QUANTILE = float(os.environ.get('LLM_HEDGE_QUANTILE', '0.95'))
+
+# LLM model and AI estimate cache (in-process LRU in front of a Mongo collection with a TTL index)
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-5.2')
+ESTIMATES_SYSTEM_MESSAGE = "You are a real estate investment analyst specializing in Italian properties. Provide realistic, data-driven estimates."
+INSIGHTS_SYSTEM_MESSAGE = "You are a real estate investment advisor with expertise in Italian property markets."
+AI_CACHE_TTL_SECONDS = int(os.environ.get('AI_CACHE_TTL_SECONDS', '2592000'))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '4096'))
+ai_estimate_memory_cache: TTLCache = TTLCache(maxsize=AI_CACHE_MAX_ENTRIES, ttl=AI_CACHE_TTL_SECONDS)
+ai_estimate_cache_stats: Dict[str, int] = {
+    'memory_hits': 0,
+    'store_hits': 0,
+    'misses': 0,
+    'bypassed': 0
+}
+
+# Comparables index over stored analyses: a prompt prior from COMPARABLES_MIN_COUNT
+# similar properties, a full substitute for the LLM estimate from COMPARABLES_SUBSTITUTE_COUNT (0 disables)
+COMPARABLES_MIN_COUNT = int(os.environ.get('COMPARABLES_MIN_COUNT', '5'))
+COMPARABLES_SUBSTITUTE_COUNT = int(os.environ.get('COMPARABLES_SUBSTITUTE_COUNT', '20'))
+COMPARABLES_REFRESH_SECONDS = float(os.environ.get('COMPARABLES_REFRESH_SECONDS', '60'))
+comparables_index: Optional[comparables.ComparablesIndex] = None  # bound to db.analyses in create_clients
+
+# Reuse of stored analyses: bump ANALYSIS_VERSION whenever the metrics math changes
+ANALYSIS_VERSION = 3
+ANALYSIS_REUSE_SECONDS = int(os.environ.get('ANALYSIS_REUSE_SECONDS', '86400'))
+# Stored insights at least this long are zlib-compressed (see storage.py)
+COMPRESS_INSIGHTS = os.environ.get('COMPRESS_INSIGHTS', '1').lower() in ('1', 'true', 'yes')
+INSIGHTS_COMPRESS_MIN_BYTES = int(os.environ.get('INSIGHTS_COMPRESS_MIN_BYTES', '512'))
+
+# Background analysis jobs
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get('JOB_VISIBILITY_TIMEOUT', '180'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+
+# Background LLM enrichment of imported listings
+IMPORT_ENRICH_WORKERS = int(os.environ.get('IMPORT_ENRICH_WORKERS', '2'))
+IMPORT_ENRICH_RATE = float(os.environ.get('IMPORT_ENRICH_RATE', '1'))  # enrichments per second
+enrichment_rate_limiter = TokenBucket(IMPORT_ENRICH_RATE)
+
+# Per-stage deadlines (seconds) for the analysis pipeline
+ESTIMATES_DEADLINE = float(os.environ.get('ESTIMATES_DEADLINE', '30'))
+INSIGHTS_DEADLINE = float(os.environ.get('INSIGHTS_DEADLINE', '25'))
+
+# Listing cache: in-process LRU (fresh entries) in front of a Mongo collection with a TTL index
+LISTING_CACHE_FRESH_SECONDS = int(os.environ.get('LISTING_CACHE_FRESH_SECONDS', '21600'))
+LISTING_CACHE_RETENTION_SECONDS = int(os.environ.get('LISTING_CACHE_RETENTION_SECONDS', '604800'))
+LISTING_CACHE_MAX_ENTRIES = int(os.environ.get('LISTING_CACHE_MAX_ENTRIES', '2048'))
+listing_memory_cache: TTLCache = TTLCache(maxsize=LISTING_CACHE_MAX_ENTRIES, ttl=LISTING_CACHE_FRESH_SECONDS)
+listing_cache_stats: Dict[str, int] = {
+    'memory_hits': 0,
+    'store_hits': 0,
+    'revalidated': 0,
+    'misses': 0,
+    'errors': 0
+}
+
+# Metrics served on /metrics (Prometheus text format)
+LOOP_MONITOR_INTERVAL = float(os.environ.get('LOOP_MONITOR_INTERVAL', '0.1'))
+LOOP_BLOCK_THRESHOLD = float(os.environ.get('LOOP_BLOCK_THRESHOLD', '0.25'))  # seconds, 0 disables the watchdog
+metrics_registry = telemetry.Registry()
+http_requests_total = metrics_registry.counter(
+    'http_requests_total', 'HTTP requests by method, route and status', ('method', 'route', 'status')
+)
+http_request_duration = metrics_registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route (streams: until the last chunk)', ('route',)
+)
+http_requests_in_flight = metrics_registry.gauge('http_requests_in_flight', 'HTTP requests being handled')
+stage_duration = metrics_registry.histogram(
+    'analysis_stage_duration_seconds', 'Latency of each analysis stage', ('stage',)
+)
+stage_in_flight = metrics_registry.gauge('analysis_stage_in_flight', 'Analysis stages currently running', ('stage',))
+stage_fallbacks_total = metrics_registry.counter(
+    'analysis_stage_fallbacks_total', 'Stages replaced by their fallback after missing the deadline', ('stage',)
+)
+llm_fallbacks_total = metrics_registry.counter(
+    'llm_fallbacks_total', 'LLM calls that failed and fell back to deterministic output', ('call_site', 'reason')
+)
+event_loop_lag = metrics_registry.histogram(
+    'event_loop_lag_seconds', 'Delay of a periodic event-loop wakeup', buckets=telemetry.LAG_BUCKETS
+)
+event_loop_blocked_total = metrics_registry.counter(
+    'event_loop_blocked_total', 'Times the event loop was blocked for longer than LOOP_BLOCK_THRESHOLD'
+)
+loop_monitor = telemetry.LoopMonitor(
+    event_loop_lag, event_loop_blocked_total, interval=LOOP_MONITOR_INTERVAL, block_threshold=LOOP_BLOCK_THRESHOLD
+)
+
+def stage_timer(stage: str) -> telemetry.StageTimer:
+    """Record duration and in-flight count of one analysis stage"""
+    return telemetry.StageTimer(stage_duration.labels(stage), stage_in_flight.labels(stage))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create clients and warm up before serving, close them on shutdown"""
+    await start_services()
+    yield
+    await stop_services()
+
+try:
+    import orjson  # noqa: F401 - ORJSONResponse needs it
+    DefaultResponse = ORJSONResponse
+except ImportError:  # pragma: no cover - orjson is in requirements
+    DefaultResponse = JSONResponse
+
+def model_response(model: BaseModel) -> Response:
+    """Serialize a response model in pydantic-core, skipping FastAPI's re-validation and jsonable_encoder pass"""
+    return Response(content=model.model_dump_json(), media_type='application/json')
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -55,6 +216,8 @@ class PropertyInput(BaseModel):
     year_built: Optional[int] = None
     renovation_needed: Optional[bool] = None
     purchase_details: Optional[PurchaseDetails] = None
+    refresh_ai: bool = False  # bypass the AI estimate cache
+    llm_mode: Literal['two_call', 'single_shot'] = 'two_call'  # single_shot: one combined LLM call
 
 class PropertyData(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -74,6 +237,7 @@ class PropertyData(BaseModel):
     renovation_needed: Optional[bool] = False
     source_url: Optional[str] = None
     image_url: Optional[str] = None
+    scrape_fallback: bool = False  # default_property_data stands in for a listing that could not be fetched
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class InvestmentMetrics(BaseModel):
@@ -100,6 +264,10 @@ class InvestmentMetrics(BaseModel):
     cash_on_cash_return: Optional[float] = None
     cap_rate: Optional[float] = None
     monthly_cash_flow: Optional[float] = None
+    
+    # The rent estimates behind the figures above (None on analyses stored before they were recorded)
+    monthly_rent_conservative: Optional[float] = None
+    monthly_rent_optimistic: Optional[float] = None
 
 class InvestmentStrategy(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -123,121 +291,342 @@ class AnalysisResult(BaseModel):
     metrics: InvestmentMetrics
     strategies: List[InvestmentStrategy]
     ai_insights: str
+    stage_timings: Dict[str, float] = Field(default_factory=dict)  # milliseconds per pipeline stage
+    llm_mode: str = 'two_call'  # two_call, single_shot, single_shot_fallback, or deferred/none for imports
+    estimates_source: Optional[str] = None  # ai, comparables or fallback
+    insights_source: Optional[str] = None  # ai or fallback
+    purchase_details: Optional[PurchaseDetails] = None  # None on analyses stored before it was recorded
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    @computed_field
+    @property
+    def fallback_used(self) -> bool:
+        """True when deterministic defaults stand in for the AI estimates or insights"""
+        return self.estimates_source == 'fallback' or self.insights_source == 'fallback'
+
+portal_registry = portals.default_registry(SCRAPER_RATE_PER_HOST, SCRAPER_MAX_PER_HOST, SCRAPER_PORTAL_LIMITS)
+llm_gateway = LlmGateway(
+    api_key=os.environ.get('EMERGENT_LLM_KEY'),
+    max_in_flight=LLM_MAX_IN_FLIGHT,
+    requests_per_second=LLM_RATE,
+    max_retries=LLM_MAX_RETRIES,
+    breaker_options=LLM_BREAKER_OPTIONS,
+    hedge=LLM_HEDGE,
+    hedge_quantile=LLM_HEDGE_QUANTILE
+)
+
+class CombinedAiResponse(BaseModel):
+    """Schema the single-shot LLM response must satisfy"""
+    monthly_rent_conservative: float = Field(gt=0)
+    monthly_rent_optimistic: float = Field(gt=0)
+    investment_score: int = Field(ge=1, le=10)
+    yoy_appreciation: float = Field(ge=-20, le=30)
+    estimated_current_value: float = Field(gt=0)
+    insights: str = Field(min_length=20)
 
 # Helper Functions
+DEFAULT_IMAGE_URL = parsers.DEFAULT_IMAGE_URL
+
+def default_property_data(url: str) -> Dict:
+    """Fallback property data used when a listing cannot be fetched or parsed"""
+    return {
+        'title': 'Property from URL',
+        'location': 'Italy',
+        'price': 250000.0,
+        'property_type': 'Apartment',
+        'size_sqm': 85.0,
+        'rooms': 3,
+        'bathrooms': 2,
+        'source_url': url,
+        'image_url': DEFAULT_IMAGE_URL,
+        'monthly_expenses': 500.0,
+        'scrape_fallback': True
+    }
+
+def parse_property_html(html: str, url: str) -> Dict:
+    """Parse listing HTML with the parser registered for its portal (CPU-bound, run off the event loop)"""
+    return portal_registry.parse(html, url)
+
 def extract_property_from_url(url: str) -> Dict:
-    """Extract property data from immobiliare.it URL"""
+    """Extract property data from a listing URL (blocking, for scripts and tooling)"""
+    import requests
+    
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=SCRAPER_HEADERS, timeout=SCRAPER_TIMEOUT)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract title
-        title = soup.find('h1')
-        title_text = title.get_text(strip=True) if title else "Property from immobiliare.it"
-        
-        # Extract price
-        price = 250000.0
-        price_elem = soup.find(string=re.compile(r'€|EUR', re.I))
-        if price_elem:
-            price_match = re.search(r'[\d.,]+', price_elem)
-            if price_match:
-                price_str = price_match.group().replace('.', '').replace(',', '.')
-                try:
-                    price = float(price_str)
-                except ValueError:
-                    pass
-        
-        # Extract image
-        image_url = None
-        img_tag = soup.find('img', {'class': re.compile(r'property|listing|image', re.I)})
-        if not img_tag:
-            img_tag = soup.find('img', {'src': re.compile(r'immobiliare|property', re.I)})
-        if img_tag and img_tag.get('src'):
-            image_url = img_tag['src']
-            if not image_url.startswith('http'):
-                image_url = 'https://www.immobiliare.it' + image_url
-        
-        # Default fallback image
-        if not image_url:
-            image_url = 'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=800&q=80'
-        
-        return {
-            'title': title_text,
-            'location': 'Italy',
-            'price': price,
-            'property_type': 'Apartment',
-            'size_sqm': 85.0,
-            'rooms': 3,
-            'bathrooms': 2,
-            'source_url': url,
-            'image_url': image_url,
-            'monthly_expenses': price * 0.002
-        }
+        return parse_property_html(response.text, url)
+    except Exception as e:
+        logging.error(f"Error extracting property data: {e}")
+        return default_property_data(url)
+
+def create_http_client() -> 'httpx.AsyncClient':
+    """Build the long-lived scraping client (keep-alive pool, HTTP/2 when h2 is installed)"""
+    import httpx
+    
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    
+    return httpx.AsyncClient(
+        headers=SCRAPER_HEADERS,
+        timeout=httpx.Timeout(SCRAPER_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=SCRAPER_MAX_CONNECTIONS,
+            max_keepalive_connections=SCRAPER_MAX_CONNECTIONS // 2,
+            keepalive_expiry=30.0
+        ),
+        http2=http2,
+        follow_redirects=True
+    )
+
+WORD_CHUNK_RE = re.compile(r'\S+\s*')
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'ref', 'source', 'from', 'mc_cid', 'mc_eid'}
+
+def normalize_listing_url(url: str) -> str:
+    """Canonical form of a listing URL: https, bare host, no fragment or tracking params"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parsed.path.rstrip('/') or '/'
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    )
+    normalized = f"https://{host}{path}"
+    if query:
+        normalized += '?' + urlencode(query)
+    return normalized
+
+def listing_cache_key(url: str) -> str:
+    """Cache key for a listing: portal host + listing ID when one can be found in the URL"""
+    normalized = normalize_listing_url(url)
+    parsed = urlparse(normalized)
+    listing_id = portal_registry.for_url(normalized).listing_id(parsed.path)
+    return f"{parsed.netloc}:{listing_id}" if listing_id else normalized
+
+async def _scrape_listing(url: str, cached: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Download and parse a listing. When a cached document is given the request is
+    conditional (If-None-Match / If-Modified-Since) and None is returned on 304.
+    """
+    global http_client
+    if http_client is None:
+        http_client = create_http_client()
+    
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    
+    rate_limiter, semaphore = portal_registry.limiters(url)
+    await rate_limiter.acquire()
+    async with semaphore:
+        response = await http_client.get(url, headers=headers)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    
+    data = await asyncio.to_thread(parse_property_html, response.text, url)
+    return {
+        'data': data,
+        'etag': response.headers.get('etag'),
+        'last_modified': response.headers.get('last-modified')
+    }
+
+async def extract_property_from_url_async(url: str) -> Dict:
+    """Extract property data without blocking the event loop, served from the listing cache when possible"""
+    key = listing_cache_key(url)
+    
+    cached_data = listing_memory_cache.get(key)
+    if cached_data is not None:
+        listing_cache_stats['memory_hits'] += 1
+        return {**cached_data, 'source_url': url}
+    
+    now = datetime.now(timezone.utc)
+    cached = None
+    try:
+        cached = await db.listing_cache.find_one({'_id': key})
+    except Exception as e:
+        logging.error(f"Listing cache lookup failed: {e}")
+    
+    if cached:
+        fetched_at = cached['fetched_at']
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        if (now - fetched_at).total_seconds() < LISTING_CACHE_FRESH_SECONDS:
+            listing_cache_stats['store_hits'] += 1
+            listing_memory_cache[key] = cached['data']
+            return {**cached['data'], 'source_url': url}
+    
+    try:
+        with stage_timer('scrape'):
+            scraped = await _scrape_listing(url, cached)
     except Exception as e:
         logging.error(f"Error extracting property data: {e}")
-        return {
-            'title': 'Property from URL',
-            'location': 'Italy',
-            'price': 250000.0,
-            'property_type': 'Apartment',
-            'size_sqm': 85.0,
-            'rooms': 3,
-            'bathrooms': 2,
-            'source_url': url,
-            'image_url': 'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=800&q=80',
-            'monthly_expenses': 500.0
+        listing_cache_stats['errors'] += 1
+        if cached:
+            # Serve the stale copy rather than made-up defaults
+            return {**cached['data'], 'source_url': url}
+        return default_property_data(url)
+    
+    if scraped is None:
+        listing_cache_stats['revalidated'] += 1
+        data = cached['data']
+        update = {'fetched_at': now}
+    else:
+        listing_cache_stats['misses'] += 1
+        data = scraped['data']
+        update = {
+            'fetched_at': now,
+            'data': data,
+            'etag': scraped['etag'],
+            'last_modified': scraped['last_modified'],
+            'normalized_url': normalize_listing_url(url)
         }
+    
+    listing_memory_cache[key] = data
+    try:
+        await db.listing_cache.update_one({'_id': key}, {'$set': update}, upsert=True)
+    except Exception as e:
+        logging.error(f"Listing cache write failed: {e}")
+    
+    return {**data, 'source_url': url}
 
-async def calculate_metrics_with_ai(property_data: PropertyData, purchase_details: PurchaseDetails) -> InvestmentMetrics:
-    """Calculate investment metrics using AI for personalized analysis"""
+def get_listing_cache_stats() -> Dict:
+    """Hit/miss counters for the listing cache"""
+    hits = listing_cache_stats['memory_hits'] + listing_cache_stats['store_hits'] + listing_cache_stats['revalidated']
+    lookups = hits + listing_cache_stats['misses']
+    return {
+        **listing_cache_stats,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+        'memory_entries': len(listing_memory_cache)
+    }
+
+def compute_financing(price: float, purchase_details: PurchaseDetails) -> Dict[str, float]:
+    """Deterministic purchase and financing numbers (no AI involved)"""
+    return {key: float(value) for key, value in financing_arrays(price, purchase_details).items()}
+
+def financing_arrays(price, purchase_details: PurchaseDetails) -> Dict[str, np.ndarray]:
+    """finance.financing for one price or an array of prices"""
+    return finance.financing(
+        price,
+        purchase_details.mortgage_percentage,
+        purchase_details.mortgage_rate,
+        purchase_details.mortgage_years,
+        purchase_details.purchase_tax_rate,
+        purchase_details.notary_fees,
+        purchase_details.agency_fees_percentage,
+        purchase_details.annual_property_tax,
+        purchase_details.maintenance_percentage
+    )
+
+def fallback_ai_estimates(price: float) -> Dict[str, float]:
+    """Reasonable defaults used when the AI estimate is unavailable"""
+    return {
+        'monthly_rent_conservative': price * finance.FALLBACK_RENT_RATIOS[0],
+        'monthly_rent_optimistic': price * finance.FALLBACK_RENT_RATIOS[1],
+        'investment_score': finance.FALLBACK_SCORE,
+        'yoy_appreciation': finance.FALLBACK_APPRECIATION,
+        'estimated_current_value': price * finance.FALLBACK_VALUE_RATIO,
+        'source': 'fallback'
+    }
+
+def estimates_from_comparables(property_data: PropertyData, comps: Dict) -> Dict[str, float]:
+    """Rent range from the p25/p75 rent per sqm of similar stored properties; score from price vs the local median"""
+    size_sqm = property_data.size_sqm
+    median_price_sqm = comps['price_per_sqm']['median']
+    discount = 1 - (property_data.price / size_sqm) / median_price_sqm if median_price_sqm else 0.0
+    return {
+        'monthly_rent_conservative': comps['rent_per_sqm']['p25'] * size_sqm,
+        'monthly_rent_optimistic': comps['rent_per_sqm']['p75'] * size_sqm,
+        'investment_score': int(np.clip(round(6 + discount * 10), 1, 10)),
+        'yoy_appreciation': comps['yoy_appreciation'] if comps['yoy_appreciation'] is not None else 3.5,
+        'estimated_current_value': median_price_sqm * size_sqm,
+        'source': 'comparables'
+    }
+
+def lookup_comparables(property_data: PropertyData) -> Optional[Dict]:
+    return comparables_index.lookup(property_data.location, property_data.property_type, property_data.size_sqm)
+
+def fallback_estimates(property_data: PropertyData) -> Dict[str, float]:
+    """Comparables when the index has enough of them, fixed ratios otherwise"""
+    comps = lookup_comparables(property_data)
+    if comps is not None:
+        return estimates_from_comparables(property_data, comps)
+    return fallback_ai_estimates(property_data.price)
+
+def ai_estimate_cache_key(property_data: PropertyData, purchase_details: PurchaseDetails) -> str:
+    """Canonical hash of everything that goes into the estimates prompt"""
+    payload = {
+        'model': LLM_MODEL,
+        'location': property_data.location.strip().lower(),
+        'property_type': property_data.property_type.strip().lower(),
+        'price': round(property_data.price, 2),
+        'size_sqm': round(property_data.size_sqm, 2),
+        'purchase_details': purchase_details.model_dump()
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+async def get_cached_ai_estimate(cache_key: str) -> Optional[Dict]:
+    """Look up parsed ai_data in memory, then in Mongo"""
+    ai_data = ai_estimate_memory_cache.get(cache_key)
+    if ai_data is not None:
+        ai_estimate_cache_stats['memory_hits'] += 1
+        return ai_data
+    
+    try:
+        doc = await db.ai_estimates_cache.find_one({'_id': cache_key}, {'ai_data': 1})
+    except Exception as e:
+        logging.error(f"AI estimate cache lookup failed: {e}")
+        doc = None
+    if doc:
+        ai_estimate_cache_stats['store_hits'] += 1
+        ai_estimate_memory_cache[cache_key] = doc['ai_data']
+        return doc['ai_data']
+    
+    ai_estimate_cache_stats['misses'] += 1
+    return None
+
+async def store_ai_estimate(cache_key: str, ai_data: Dict):
+    ai_estimate_memory_cache[cache_key] = ai_data
+    try:
+        await db.ai_estimates_cache.update_one(
+            {'_id': cache_key},
+            {'$set': {'ai_data': ai_data, 'model': LLM_MODEL, 'created_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    except Exception as e:
+        logging.error(f"AI estimate cache write failed: {e}")
+
+def build_comparables_context(comps: Optional[Dict]) -> str:
+    if comps is None:
+        return ""
+    return f"""
+Comparable analyzed properties ({comps['rent_count']} in {comps['location']}, {comps['property_type']}, {comps['size_band']} sqm):
+- Price per sqm: €{comps['price_per_sqm']['p25']:.0f}-€{comps['price_per_sqm']['p75']:.0f} (median €{comps['price_per_sqm']['median']:.0f})
+- Monthly rent per sqm: €{comps['rent_per_sqm']['p25']:.1f}-€{comps['rent_per_sqm']['p75']:.1f} (median €{comps['rent_per_sqm']['median']:.1f})
+"""
+
+def build_estimates_prompt(
+    property_data: PropertyData,
+    purchase_details: PurchaseDetails,
+    financing: Dict[str, float],
+    comps: Optional[Dict] = None
+) -> str:
     price = property_data.price
     size_sqm = property_data.size_sqm
     location = property_data.location
     property_type = property_data.property_type
+    total_upfront = financing['total_upfront']
+    annual_costs = financing['annual_costs']
     
-    # Purchase costs calculations
-    mortgage_amount = price * (purchase_details.mortgage_percentage / 100)
-    down_payment = price - mortgage_amount
-    purchase_tax = price * (purchase_details.purchase_tax_rate / 100)
-    agency_fees = price * (purchase_details.agency_fees_percentage / 100)
-    total_upfront = down_payment + purchase_tax + purchase_details.notary_fees + agency_fees
-    
-    # Monthly mortgage payment (0 if cash purchase)
-    if purchase_details.mortgage_percentage > 0:
-        monthly_rate = (purchase_details.mortgage_rate / 100) / 12
-        num_payments = purchase_details.mortgage_years * 12
-        if monthly_rate > 0:
-            monthly_mortgage = mortgage_amount * (monthly_rate * (1 + monthly_rate) ** num_payments) / ((1 + monthly_rate) ** num_payments - 1)
-        else:
-            monthly_mortgage = mortgage_amount / num_payments
-    else:
-        # Cash purchase - no mortgage
-        monthly_mortgage = 0
-        monthly_rate = 0
-        num_payments = 0
-    
-    # Annual costs
-    annual_maintenance = price * (purchase_details.maintenance_percentage / 100)
-    annual_costs = (monthly_mortgage * 12) + purchase_details.annual_property_tax + annual_maintenance
-    
-    # Use AI to estimate realistic rental income and returns
-    try:
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        session_id = f"metrics_{property_data.id}"
-        
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=session_id,
-            system_message="You are a real estate investment analyst specializing in Italian properties. Provide realistic, data-driven estimates."
-        ).with_model("openai", "gpt-5.2")
-        
-        prompt = f"""
+    return f"""
 Analyze this Italian property investment and provide realistic estimates:
 
 Property Details:
@@ -252,7 +641,7 @@ Financing:
 - Annual costs (mortgage+tax+maintenance): €{annual_costs:,.0f}
 - Mortgage: {purchase_details.mortgage_percentage}% at {purchase_details.mortgage_rate}%
 - First home: {purchase_details.is_first_home}
-
+{build_comparables_context(comps)}
 Provide ONLY numbers in this exact JSON format:
 {{
   "monthly_rent_conservative": <number>,
@@ -269,213 +658,300 @@ Consider:
 - Location desirability and demand
 - Price competitiveness vs market
 """
-        
-        message = UserMessage(text=prompt)
-        response = await chat.send_message(message)
+
+def build_combined_prompt(
+    property_data: PropertyData,
+    purchase_details: PurchaseDetails,
+    financing: Dict[str, float],
+    comps: Optional[Dict] = None
+) -> str:
+    """Estimates prompt extended with the insight text, answered in a single JSON object"""
+    estimates_prompt = build_estimates_prompt(property_data, purchase_details, financing, comps)
+    numbers_request = estimates_prompt.index("Provide ONLY numbers")
+    return estimates_prompt[:numbers_request] + f"""Property title: {property_data.title}
+
+Respond with ONLY this JSON object:
+{{
+  "monthly_rent_conservative": <number>,
+  "monthly_rent_optimistic": <number>,
+  "investment_score": <1-10>,
+  "yoy_appreciation": <percentage>,
+  "estimated_current_value": <number>,
+  "insights": "<concise analysis, 3-4 sentences>"
+}}
+
+For the numbers consider:
+- Actual market rental rates for {property_data.location}
+- Property type and size
+- Current Italian real estate market conditions
+- Location desirability and demand
+- Price competitiveness vs market
+
+The insights text should cover:
+1. Market positioning and value assessment
+2. Investment viability and strongest opportunities
+3. Key considerations for this property
+"""
+
+def parse_combined_response(response: str) -> Optional[CombinedAiResponse]:
+    """Validate the single-shot response; None means fall back to the two-call path"""
+    text = response.strip()
+    if text.startswith('```'):
+        text = text.strip('`')
+        text = text[text.index('{'):] if '{' in text else text
+    try:
+        return CombinedAiResponse.model_validate_json(text)
+    except Exception as e:
+        logging.warning(f"Single-shot response failed validation: {e}")
+        return None
+
+def record_llm_fallback(call_site: str, error: Optional[Exception], message: str):
+    """Count an LLM call replaced by deterministic output; log it unless the circuit is open"""
+    if isinstance(error, CircuitOpenError):
+        reason = 'circuit_open'
+    else:
+        reason = 'invalid_response' if isinstance(error, ValueError) else 'error'
+        logging.error(f"{message}: {error}")
+    llm_fallbacks_total.labels(call_site, reason).inc()
+
+async def combined_analysis_with_ai(
+    property_data: PropertyData,
+    purchase_details: PurchaseDetails,
+    financing: Dict[str, float]
+) -> Optional[CombinedAiResponse]:
+    """One LLM round trip for both the estimates JSON and the insight text"""
+    try:
+        response = await llm_gateway.complete(
+            'combined',
+            system_message=ESTIMATES_SYSTEM_MESSAGE,
+            prompt=build_combined_prompt(property_data, purchase_details, financing, lookup_comparables(property_data)),
+            provider="openai",
+            model=LLM_MODEL
+        )
+    except Exception as e:
+        record_llm_fallback('combined', e, "Single-shot AI analysis failed")
+        return None
+    
+    combined = parse_combined_response(response)
+    if combined is None:
+        llm_fallbacks_total.labels('combined', 'invalid_response').inc()
+    else:
+        ai_data = combined.model_dump(exclude={'insights'})
+        await store_ai_estimate(ai_estimate_cache_key(property_data, purchase_details), ai_data)
+    return combined
+
+def estimates_from_ai_data(ai_data: Dict, price: float) -> Dict[str, float]:
+    """Fill in missing keys of the parsed AI response"""
+    return {
+        'monthly_rent_conservative': ai_data.get('monthly_rent_conservative', price * finance.FALLBACK_RENT_RATIOS[0]),
+        'monthly_rent_optimistic': ai_data.get('monthly_rent_optimistic', price * finance.FALLBACK_RENT_RATIOS[1]),
+        'investment_score': ai_data.get('investment_score', finance.FALLBACK_SCORE),
+        'yoy_appreciation': ai_data.get('yoy_appreciation', finance.FALLBACK_APPRECIATION),
+        'estimated_current_value': ai_data.get('estimated_current_value', price * finance.FALLBACK_VALUE_RATIO),
+        'source': 'ai'
+    }
+
+async def estimate_rent_with_ai(
+    property_data: PropertyData,
+    purchase_details: PurchaseDetails,
+    financing: Dict[str, float],
+    refresh: bool = False
+) -> Dict[str, float]:
+    """
+    Ask the LLM for rent, score and appreciation estimates (memoized on the prompt inputs).
+    Enough stored comparables replace the LLM call; fewer are passed to it as a prior.
+    """
+    price = property_data.price
+    cache_key = ai_estimate_cache_key(property_data, purchase_details)
+    
+    if refresh:
+        ai_estimate_cache_stats['bypassed'] += 1
+    else:
+        ai_data = await get_cached_ai_estimate(cache_key)
+        if ai_data is not None:
+            return estimates_from_ai_data(ai_data, price)
+    
+    comps = lookup_comparables(property_data)
+    if comps is not None and not refresh and 0 < COMPARABLES_SUBSTITUTE_COUNT <= comps['rent_count']:
+        return estimates_from_comparables(property_data, comps)
+    
+    # Use AI to estimate realistic rental income and returns
+    try:
+        response = await llm_gateway.complete(
+            'estimates',
+            system_message=ESTIMATES_SYSTEM_MESSAGE,
+            prompt=build_estimates_prompt(property_data, purchase_details, financing, comps),
+            provider="openai",
+            model=LLM_MODEL
+        )
         
         # Parse AI response
-        import json
         ai_data = json.loads(response)
         
-        monthly_rent_conservative = ai_data.get('monthly_rent_conservative', price * 0.003)
-        monthly_rent_optimistic = ai_data.get('monthly_rent_optimistic', price * 0.004)
-        investment_score = ai_data.get('investment_score', 5)
-        yoy_appreciation = ai_data.get('yoy_appreciation', 3.5)
-        estimated_value = ai_data.get('estimated_current_value', price * 1.02)
-        
     except Exception as e:
-        logging.error(f"AI metrics calculation failed: {e}, using defaults")
-        # Fallback to reasonable defaults
-        monthly_rent_conservative = price * 0.003  # 0.3%
-        monthly_rent_optimistic = price * 0.004    # 0.4%
-        investment_score = 6
-        yoy_appreciation = 3.5
-        estimated_value = price * 1.02
-    
-    # Calculate returns based on AI rental estimates
-    annual_rent_conservative = monthly_rent_conservative * 12
-    annual_rent_optimistic = monthly_rent_optimistic * 12
-    
-    # Cash flow calculation (rental income - all expenses)
-    annual_net_cashflow_conservative = annual_rent_conservative - annual_costs
-    annual_net_cashflow_optimistic = annual_rent_optimistic - annual_costs
-    annual_net_cashflow = (annual_net_cashflow_conservative + annual_net_cashflow_optimistic) / 2
-    
-    # Calculate total profit over 5 years including appreciation
-    capital_appreciation_5yr = price * ((1 + yoy_appreciation/100) ** 5) - price
-    
-    cumulative_cashflow_conservative_5yr = annual_net_cashflow_conservative * 5
-    cumulative_cashflow_optimistic_5yr = annual_net_cashflow_optimistic * 5
-    
-    # ROI = (Total Gains - Initial Investment) / Initial Investment * 100
-    # Total Gains = Cumulative cash flow + Capital appreciation
-    total_gain_conservative = cumulative_cashflow_conservative_5yr + capital_appreciation_5yr
-    total_gain_optimistic = cumulative_cashflow_optimistic_5yr + capital_appreciation_5yr
-    
-    roi_conservative = (total_gain_conservative / total_upfront) * 100
-    roi_optimistic = (total_gain_optimistic / total_upfront) * 100
-    
-    # ROE = Annual Net Income / Equity * 100
-    # For cash purchase: equity = total price
-    # For mortgage: equity = down payment
-    equity = down_payment if down_payment > 0 else price
-    roe_conservative = (annual_net_cashflow_conservative / equity) * 100
-    roe_optimistic = (annual_net_cashflow_optimistic / equity) * 100
-    
-    # 5-year projection
-    projected_5yr_value = price * ((1 + yoy_appreciation/100) ** 5)
-    
-    # Adjust investment score based on negative metrics
-    # If cash flow, ROI or ROE are negative, score should be low
-    adjusted_score = investment_score
-    
-    # Penalize for negative annual cash flow
-    if annual_net_cashflow < 0:
-        adjusted_score = min(adjusted_score, 3)  # Cap at 3 if cash flow is negative
-        if annual_net_cashflow < -5000:
-            adjusted_score = min(adjusted_score, 2)  # Very negative cash flow
-    
-    # Penalize for negative ROI
-    avg_roi = (roi_conservative + roi_optimistic) / 2
-    if avg_roi < 0:
-        adjusted_score = min(adjusted_score, 3)
-        if avg_roi < -10:
-            adjusted_score = min(adjusted_score, 2)
-    
-    # Penalize for negative ROE
-    avg_roe = (roe_conservative + roe_optimistic) / 2
-    if avg_roe < 0:
-        adjusted_score = min(adjusted_score, 3)
-        if avg_roe < -5:
-            adjusted_score = min(adjusted_score, 2)
-    
-    # Multiple negative metrics = very low score
-    negative_count = sum([
-        1 if annual_net_cashflow < 0 else 0,
-        1 if avg_roi < 0 else 0,
-        1 if avg_roe < 0 else 0
-    ])
-    if negative_count >= 2:
-        adjusted_score = min(adjusted_score, 2)
-    if negative_count == 3:
-        adjusted_score = 1
+        record_llm_fallback('estimates', e, "AI metrics calculation failed, using defaults")
+        return estimates_from_comparables(property_data, comps) if comps is not None else fallback_ai_estimates(price)
     
+    await store_ai_estimate(cache_key, ai_data)
+    return estimates_from_ai_data(ai_data, price)
+
+def get_ai_estimate_cache_stats() -> Dict:
+    """Hit/miss counters for the AI estimate cache"""
+    hits = ai_estimate_cache_stats['memory_hits'] + ai_estimate_cache_stats['store_hits']
+    lookups = hits + ai_estimate_cache_stats['misses']
+    return {
+        **ai_estimate_cache_stats,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+        'memory_entries': len(ai_estimate_memory_cache)
+    }
+
+def build_investment_metrics(property_data: PropertyData, financing: Dict[str, float], estimates: Dict[str, float]) -> InvestmentMetrics:
+    """Turn financing numbers and rent/appreciation estimates into InvestmentMetrics"""
+    values = finance.investment_metrics(
+        property_data.price,
+        financing['down_payment'],
+        financing['total_upfront'],
+        financing['annual_costs'],
+        estimates['monthly_rent_conservative'],
+        estimates['monthly_rent_optimistic'],
+        estimates['investment_score'],
+        estimates['yoy_appreciation'],
+        estimates['estimated_current_value']
+    )
     return InvestmentMetrics(
-        investment_score=int(adjusted_score),
-        roi_range_min=round(roi_conservative, 1),
-        roi_range_max=round(roi_optimistic, 1),
-        roe_range_min=round(roe_conservative, 1),
-        roe_range_max=round(roe_optimistic, 1),
-        annual_net_cashflow=round(annual_net_cashflow, 0),
-        estimated_value=round(estimated_value, 2),
-        yoy_appreciation=round(yoy_appreciation, 2),
-        projected_5yr_value=round(projected_5yr_value, 2),
-        # Backward compatibility
-        roi=round((roi_conservative + roi_optimistic) / 2, 2),
-        roe=round((roe_conservative + roe_optimistic) / 2, 2),
-        cash_on_cash_return=round(roe_conservative, 2),
-        monthly_cash_flow=round(annual_net_cashflow / 12, 2)
+        investment_score=int(values['investment_score']),
+        **{name: round(float(values[name]), decimals) for name, decimals in finance.METRIC_DECIMALS.items()}
     )
 
+async def calculate_metrics_with_ai(property_data: PropertyData, purchase_details: PurchaseDetails, refresh: bool = False) -> InvestmentMetrics:
+    """Calculate investment metrics using AI for personalized analysis"""
+    financing = compute_financing(property_data.price, purchase_details)
+    estimates = await estimate_rent_with_ai(property_data, purchase_details, financing, refresh=refresh)
+    return build_investment_metrics(property_data, financing, estimates)
+
 # Keep old function for backward compatibility
 async def calculate_metrics(property_data: PropertyData, purchase_details: PurchaseDetails) -> InvestmentMetrics:
     return await calculate_metrics_with_ai(property_data, purchase_details)
 
 async def generate_strategies(property_data: PropertyData, metrics: InvestmentMetrics) -> List[InvestmentStrategy]:
     """Generate 4 risk-based investment strategies"""
-    
+    return build_strategies(property_data, metrics)
+
+# Stored analyses reference these by ID and keep only the amounts (see compact_strategies).
+# Never edit a template's text in place: add a new ID so older documents still render as written.
+STRATEGY_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    'long_term_hold': {
+        'risk_level': "low",
+        'strategy_name': "Conservative Long-Term Hold",
+        'description': "Traditional buy-and-hold strategy with stable long-term rental income.",
+        'expected_return': "4-6% annual return",
+        'time_horizon': "10+ years",
+        'operational_complexity': "Low - minimal management",
+        'initial_investment': "€{initial_investment:,.0f} (20% down payment)",
+        'monthly_income': "€{monthly_income:,.0f} estimated rental income",
+        'key_points': [
+            "Long-term tenant contracts (3+ years)",
+            "Minimal property modifications",
+            "Focus on stable neighborhoods",
+            "Conservative leverage (max 60% LTV)",
+            "Monthly cash flow: €{monthly_cash_flow:,.0f}"
+        ],
+        'is_premium': False
+    },
+    'value_add': {
+        'risk_level': "medium",
+        'strategy_name': "Value-Add Renovation",
+        'description': "Purchase undervalued property, renovate, and increase rental income or resale value.",
+        'expected_return': "12-18% total return",
+        'time_horizon': "3-5 years",
+        'operational_complexity': "Medium - requires renovation management",
+        'initial_investment': "€{initial_investment:,.0f}",
+        'monthly_income': "€{monthly_income:,.0f} post-renovation",
+        'key_points': [
+            "Initial renovation budget: 15-20% of purchase price",
+            "Focus on kitchen and bathroom upgrades",
+            "Target 30% value increase post-renovation",
+            "Increased rental yield after improvements"
+        ],
+        'is_premium': True
+    },
+    'short_term_rental': {
+        'risk_level': "medium-high",
+        'strategy_name': "Short-Term Rental Optimization",
+        'description': "Maximize returns through Airbnb/vacation rentals with professional management.",
+        'expected_return': "15-25% annual return",
+        'time_horizon': "2-5 years",
+        'operational_complexity': "High - active management required",
+        'initial_investment': "€{initial_investment:,.0f}",
+        'monthly_income': "€{monthly_income:,.0f} average (seasonal variation)",
+        'key_points': [
+            "Professional property management recommended",
+            "Higher occupancy rates in tourist areas",
+            "Seasonal pricing optimization",
+            "Furnishing and amenities investment required"
+        ],
+        'is_premium': True
+    },
+    'fix_and_flip': {
+        'risk_level': "high",
+        'strategy_name': "Fix and Flip",
+        'description': "Aggressive renovation and quick resale strategy for maximum short-term gains.",
+        'expected_return': "25-40% total return",
+        'time_horizon': "6-12 months",
+        'operational_complexity': "Very High - intensive project management",
+        'initial_investment': "€{initial_investment:,.0f}",
+        'monthly_income': "€{monthly_income:,.0f} profit potential",
+        'key_points': [
+            "Target distressed or undervalued properties",
+            "Complete renovation in 3-4 months",
+            "Strategic pricing for quick sale",
+            "Requires construction expertise"
+        ],
+        'is_premium': True
+    }
+}
+
+def strategy_params(property_data: PropertyData, metrics: InvestmentMetrics) -> List[Tuple[str, Dict[str, float]]]:
+    """(template ID, amounts) for each strategy offered on one property"""
     down_payment = property_data.price * 0.2
     monthly_rent_long = property_data.price * 0.003
     monthly_rent_short = property_data.price * 0.004
     renovation_cost = property_data.price * 0.15 if property_data.renovation_needed else 0
-    
-    strategies = [
-        InvestmentStrategy(
-            risk_level="low",
-            strategy_name="Conservative Long-Term Hold",
-            description="Traditional buy-and-hold strategy with stable long-term rental income.",
-            expected_return="4-6% annual return",
-            time_horizon="10+ years",
-            operational_complexity="Low - minimal management",
-            initial_investment=f"€{down_payment:,.0f} (20% down payment)",
-            monthly_income=f"€{monthly_rent_long:,.0f} estimated rental income",
-            key_points=[
-                "Long-term tenant contracts (3+ years)",
-                "Minimal property modifications",
-                "Focus on stable neighborhoods",
-                "Conservative leverage (max 60% LTV)",
-                f"Monthly cash flow: €{metrics.monthly_cash_flow:,.0f}"
-            ],
-            is_premium=False
-        ),
-        InvestmentStrategy(
-            risk_level="medium",
-            strategy_name="Value-Add Renovation",
-            description="Purchase undervalued property, renovate, and increase rental income or resale value.",
-            expected_return="12-18% total return",
-            time_horizon="3-5 years",
-            operational_complexity="Medium - requires renovation management",
-            initial_investment=f"€{down_payment + renovation_cost:,.0f}",
-            monthly_income=f"€{monthly_rent_long * 1.3:,.0f} post-renovation",
-            key_points=[
-                "Initial renovation budget: 15-20% of purchase price",
-                "Focus on kitchen and bathroom upgrades",
-                "Target 30% value increase post-renovation",
-                "Increased rental yield after improvements"
-            ],
-            is_premium=True
-        ),
-        InvestmentStrategy(
-            risk_level="medium-high",
-            strategy_name="Short-Term Rental Optimization",
-            description="Maximize returns through Airbnb/vacation rentals with professional management.",
-            expected_return="15-25% annual return",
-            time_horizon="2-5 years",
-            operational_complexity="High - active management required",
-            initial_investment=f"€{down_payment + (property_data.price * 0.05):,.0f}",
-            monthly_income=f"€{monthly_rent_short:,.0f} average (seasonal variation)",
-            key_points=[
-                "Professional property management recommended",
-                "Higher occupancy rates in tourist areas",
-                "Seasonal pricing optimization",
-                "Furnishing and amenities investment required"
-            ],
-            is_premium=True
-        ),
-        InvestmentStrategy(
-            risk_level="high",
-            strategy_name="Fix and Flip",
-            description="Aggressive renovation and quick resale strategy for maximum short-term gains.",
-            expected_return="25-40% total return",
-            time_horizon="6-12 months",
-            operational_complexity="Very High - intensive project management",
-            initial_investment=f"€{property_data.price * 0.25:,.0f}",
-            monthly_income=f"€{(property_data.price * 0.3):,.0f} profit potential",
-            key_points=[
-                "Target distressed or undervalued properties",
-                "Complete renovation in 3-4 months",
-                "Strategic pricing for quick sale",
-                "Requires construction expertise"
-            ],
-            is_premium=True
-        )
+    return [
+        ('long_term_hold', {
+            'initial_investment': down_payment,
+            'monthly_income': monthly_rent_long,
+            'monthly_cash_flow': metrics.monthly_cash_flow
+        }),
+        ('value_add', {'initial_investment': down_payment + renovation_cost, 'monthly_income': monthly_rent_long * 1.3}),
+        ('short_term_rental', {
+            'initial_investment': down_payment + (property_data.price * 0.05),
+            'monthly_income': monthly_rent_short
+        }),
+        ('fix_and_flip', {'initial_investment': property_data.price * 0.25, 'monthly_income': property_data.price * 0.3})
     ]
-    
-    return strategies
 
-async def get_ai_insights(property_data: PropertyData, metrics: InvestmentMetrics) -> str:
-    """Get AI-powered insights using Emergent LLM"""
-    try:
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        session_id = f"analysis_{property_data.id}"
-        
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=session_id,
-            system_message="You are a real estate investment advisor with expertise in Italian property markets."
-        ).with_model("openai", "gpt-5.2")
-        
-        prompt = f"""
+# Template fields with placeholders; the others are copied as they are
+_STRATEGY_FORMATTED_FIELDS = {
+    template_id: [field for field, value in template.items() if '{' in str(value)]
+    for template_id, template in STRATEGY_TEMPLATES.items()
+}
+
+def render_strategy(template_id: str, params: Dict[str, float]) -> Dict[str, Any]:
+    """Strategy fields with the amounts filled in"""
+    strategy = {**STRATEGY_TEMPLATES[template_id]}
+    for field in _STRATEGY_FORMATTED_FIELDS[template_id]:
+        value = strategy[field]
+        strategy[field] = value.format(**params) if isinstance(value, str) else [point.format(**params) for point in value]
+    strategy['key_points'] = list(strategy['key_points'])
+    return strategy
+
+def build_strategies(property_data: PropertyData, metrics: InvestmentMetrics) -> List[InvestmentStrategy]:
+    """The strategy templates filled in for one property (pure CPU, safe to run in a worker thread)"""
+    return [InvestmentStrategy(**render_strategy(template_id, params)) for template_id, params in strategy_params(property_data, metrics)]
+
+def build_insights_prompt(property_data: PropertyData, metrics: InvestmentMetrics) -> str:
+    return f"""
 Analyze this investment property and provide key insights:
 
 Property: {property_data.title}
@@ -498,15 +974,377 @@ Provide a concise analysis (3-4 sentences) covering:
 2. Investment viability and strongest opportunities
 3. Key considerations for this property
         """
+
+async def get_ai_insights(property_data: PropertyData, metrics: InvestmentMetrics) -> Tuple[str, str]:
+    """Get AI-powered insights using Emergent LLM, as (text, source)"""
+    try:
+        text = await llm_gateway.complete(
+            'insights',
+            system_message=INSIGHTS_SYSTEM_MESSAGE,
+            prompt=build_insights_prompt(property_data, metrics),
+            provider="openai",
+            model=LLM_MODEL
+        )
+        return text, 'ai'
         
-        message = UserMessage(text=prompt)
-        response = await chat.send_message(message)
-        
-        return response
-        
     except Exception as e:
-        logging.error(f"Error getting AI insights: {e}")
-        return f"This property at €{property_data.price:,.0f} offers solid investment potential with a {metrics.cap_rate}% cap rate and {metrics.long_term_rental_yield}% rental yield. The location in {property_data.location} provides good fundamentals for long-term appreciation. Consider your risk tolerance and investment timeline when selecting a strategy."
+        record_llm_fallback('insights', e, "Error getting AI insights")
+        return fallback_ai_insights(property_data, metrics), 'fallback'
+
+async def stream_ai_insights(property_data: PropertyData, metrics: InvestmentMetrics) -> AsyncIterator[Tuple[str, str]]:
+    """Insight text as (chunk, source) pairs split from the finished completion, falling back to the static text on failure"""
+    produced = False
+    error = None
+    try:
+        async for chunk in llm_gateway.complete_chunked(
+            'insights',
+            system_message=INSIGHTS_SYSTEM_MESSAGE,
+            prompt=build_insights_prompt(property_data, metrics),
+            provider="openai",
+            model=LLM_MODEL,
+            timeout=INSIGHTS_DEADLINE
+        ):
+            produced = True
+            yield chunk, 'ai'
+    except Exception as e:
+        error = e
+    if not produced:
+        record_llm_fallback('insights', error, "Error streaming AI insights")
+        yield fallback_ai_insights(property_data, metrics), 'fallback'
+
+def fallback_ai_insights(property_data: PropertyData, metrics: InvestmentMetrics) -> str:
+    """Static insight text used when the LLM is unavailable"""
+    return f"This property at €{property_data.price:,.0f} offers solid investment potential with a {metrics.cap_rate}% cap rate and {metrics.long_term_rental_yield}% rental yield. The location in {property_data.location} provides good fundamentals for long-term appreciation. Consider your risk tolerance and investment timeline when selecting a strategy."
+
+# Analysis pipeline
+class PipelineStage:
+    """One node of the analysis dependency graph"""
+    
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Awaitable[Any]],
+        deps: Tuple[str, ...] = (),
+        deadline: Optional[float] = None,
+        fallback: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ):
+        self.name = name
+        self.run = run
+        self.deps = deps
+        self.deadline = deadline
+        self.fallback = fallback
+
+async def run_stage_graph(stages: List[PipelineStage]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run stages as soon as their dependencies are done; independent stages run concurrently.
+    A stage that misses its deadline is cancelled and replaced by its fallback value.
+    """
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    
+    async def execute(stage: PipelineStage):
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+        started = time.perf_counter()
+        try:
+            with stage_timer(stage.name):
+                if stage.deadline:
+                    result = await asyncio.wait_for(stage.run(results), timeout=stage.deadline)
+                else:
+                    result = await stage.run(results)
+        except asyncio.TimeoutError:
+            if stage.fallback is None:
+                raise
+            logging.warning(f"Stage '{stage.name}' exceeded {stage.deadline}s deadline, using fallback")
+            stage_fallbacks_total.labels(stage.name).inc()
+            result = stage.fallback(results)
+        results[stage.name] = result
+        timings[stage.name] = round((time.perf_counter() - started) * 1000, 1)
+    
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(execute(stage))
+    try:
+        await asyncio.gather(*tasks.values())
+    except Exception:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    
+    return results, timings
+
+def build_analysis_stages(
+    property_data: PropertyData,
+    purchase_details: PurchaseDetails,
+    refresh_ai: bool = False,
+    llm_mode: str = 'two_call'
+) -> List[PipelineStage]:
+    """
+    Dependency graph: financing -> estimates -> metrics -> (strategies | insights).
+    The insights stage yields (text, source).
+    In single_shot mode a 'combined' stage feeds both estimates and insights;
+    either falls back to its own LLM call if the combined response is unusable.
+    """
+    
+    async def financing_stage(results):
+        return compute_financing(property_data.price, purchase_details)
+    
+    async def combined_stage(results):
+        return await combined_analysis_with_ai(property_data, purchase_details, results['financing'])
+    
+    async def estimates_stage(results):
+        combined = results.get('combined')
+        if combined is not None:
+            return estimates_from_ai_data(combined.model_dump(), property_data.price)
+        return await estimate_rent_with_ai(property_data, purchase_details, results['financing'], refresh=refresh_ai)
+    
+    async def metrics_stage(results):
+        return build_investment_metrics(property_data, results['financing'], results['estimates'])
+    
+    async def strategies_stage(results):
+        return await generate_strategies(property_data, results['metrics'])
+    
+    async def insights_stage(results):
+        combined = results.get('combined')
+        if combined is not None:
+            return combined.insights, 'ai'
+        return await get_ai_insights(property_data, results['metrics'])
+    
+    single_shot = llm_mode == 'single_shot'
+    ai_deps = ('financing', 'combined') if single_shot else ('financing',)
+    stages = [PipelineStage('financing', financing_stage)]
+    if single_shot:
+        stages.append(PipelineStage(
+            'combined', combined_stage, deps=('financing',), deadline=ESTIMATES_DEADLINE,
+            fallback=lambda results: None
+        ))
+    stages += [
+        PipelineStage(
+            'estimates', estimates_stage, deps=ai_deps, deadline=ESTIMATES_DEADLINE,
+            fallback=lambda results: fallback_estimates(property_data)
+        ),
+        PipelineStage('metrics', metrics_stage, deps=('financing', 'estimates')),
+        PipelineStage('strategies', strategies_stage, deps=('metrics',)),
+        PipelineStage(
+            'insights', insights_stage, deps=('metrics',), deadline=INSIGHTS_DEADLINE,
+            fallback=lambda results: (fallback_ai_insights(property_data, results['metrics']), 'fallback')
+        )
+    ]
+    return stages
+
+async def resolve_property_data(property_input: PropertyInput) -> PropertyData:
+    """Scrape the listing URL or build PropertyData from manual input"""
+    if property_input.url:
+        with stage_timer('property'):
+            extracted_data = await extract_property_from_url_async(property_input.url)
+        return PropertyData(**extracted_data)
+    
+    # Use manual input
+    if not all([property_input.title, property_input.location, property_input.price]):
+        raise HTTPException(status_code=400, detail="Missing required fields: title, location, and price")
+    
+    return PropertyData(
+        title=property_input.title,
+        location=property_input.location,
+        price=property_input.price,
+        property_type=property_input.property_type or "Apartment",
+        size_sqm=property_input.size_sqm or 80.0,
+        rooms=property_input.rooms,
+        bathrooms=property_input.bathrooms,
+        floor=property_input.floor,
+        condition=property_input.condition,
+        year_built=property_input.year_built,
+        renovation_needed=property_input.renovation_needed or False,
+        image_url=DEFAULT_IMAGE_URL
+    )
+
+def compact_strategies(
+    strategies: List[InvestmentStrategy], property_data: PropertyData, metrics: InvestmentMetrics
+) -> List[Dict]:
+    """Template reference for each strategy that re-renders identically from its amounts, the full text otherwise"""
+    templates = strategy_params(property_data, metrics)
+    compact = []
+    for index, strategy in enumerate(strategies):
+        stored = strategy.model_dump()
+        if index < len(templates) and render_strategy(*templates[index]) == stored:
+            template_id, params = templates[index]
+            stored = {'template': template_id, 'params': params}
+        compact.append(stored)
+    return compact
+
+def analysis_to_document(analysis: AnalysisResult) -> Dict:
+    """
+    Serialize an AnalysisResult for db.analyses in the compact format:
+    BSON datetimes, strategies as template references and long insights
+    compressed. expand_analysis_document reverses it.
+    """
+    document = analysis.model_dump(exclude={'strategies', 'fallback_used'})
+    document['strategies'] = compact_strategies(analysis.strategies, analysis.property_data, analysis.metrics)
+    compressed = compress_text(analysis.ai_insights, INSIGHTS_COMPRESS_MIN_BYTES) if COMPRESS_INSIGHTS else None
+    if compressed is not None:
+        del document['ai_insights']
+        document['ai_insights_zlib'] = compressed
+    document['storage_version'] = STORAGE_VERSION
+    return document
+
+def superseded_fields(document: Dict) -> Dict[str, str]:
+    """$unset for fields an update with `document` replaces under another name"""
+    stale = {'fallback_used': ''}
+    stale['ai_insights' if 'ai_insights_zlib' in document else 'ai_insights_zlib'] = ''
+    return stale
+
+def expand_strategy(stored: Dict) -> Dict:
+    return render_strategy(stored['template'], stored['params']) if 'template' in stored else stored
+
+# Reuse and import bookkeeping kept on stored analyses, never returned by the API
+ANALYSIS_INTERNAL_FIELDS = ('analysis_key', 'import_id', 'enrichment')
+ANALYSIS_PUBLIC_PROJECTION = {'_id': 0, **{field: 0 for field in ANALYSIS_INTERNAL_FIELDS}}
+
+def expand_analysis_document(document: Dict) -> Dict:
+    """A stored analysis (compact or legacy) in the API shape"""
+    document.pop('storage_version', None)
+    if 'ai_insights_zlib' in document:
+        document['ai_insights'] = decompress_text(document.pop('ai_insights_zlib'))
+    if 'strategies' in document:
+        document['strategies'] = [expand_strategy(strategy) for strategy in document['strategies']]
+    if 'created_at' in document:
+        document['created_at'] = as_utc(document['created_at'])
+    if 'created_at' in document.get('property_data', {}):
+        document['property_data']['created_at'] = as_utc(document['property_data']['created_at'])
+    if 'estimates_source' in document or 'insights_source' in document:
+        document['fallback_used'] = document.get('estimates_source') == 'fallback' or document.get('insights_source') == 'fallback'
+    return document
+
+def migrate_analysis_document(document: Dict) -> Dict:
+    """
+    A legacy analysis document in the compact format. Strategies become
+    template references only where re-rendering reproduces the stored text;
+    anything else (including fields the models don't know) is kept as is.
+    """
+    migrated = expand_analysis_document(document)
+    migrated.pop('fallback_used', None)
+    try:
+        migrated['strategies'] = compact_strategies(
+            [InvestmentStrategy(**strategy) for strategy in migrated.get('strategies') or []],
+            PropertyData(**migrated['property_data']),
+            InvestmentMetrics(**migrated['metrics'])
+        )
+    except Exception as e:
+        logging.error(f"Keeping full strategies of analysis {migrated.get('id')}: {str(e)}")
+    compressed = compress_text(migrated.get('ai_insights'), INSIGHTS_COMPRESS_MIN_BYTES) if COMPRESS_INSIGHTS else None
+    if compressed is not None:
+        del migrated['ai_insights']
+        migrated['ai_insights_zlib'] = compressed
+    return migrated
+
+MANUAL_FINGERPRINT_FIELDS = (
+    'title', 'location', 'price', 'property_type', 'size_sqm', 'rooms', 'bathrooms',
+    'floor', 'condition', 'year_built', 'renovation_needed'
+)
+
+def analysis_reuse_key(property_input: PropertyInput) -> str:
+    """Hash of (listing or manual-input fingerprint, purchase details, model/math version)"""
+    if property_input.url:
+        subject = {'listing': listing_cache_key(property_input.url)}
+    else:
+        subject = {'manual': {field: getattr(property_input, field) for field in MANUAL_FINGERPRINT_FIELDS}}
+    payload = {
+        **subject,
+        'purchase_details': (property_input.purchase_details or PurchaseDetails()).model_dump(),
+        'model': LLM_MODEL,
+        'llm_mode': property_input.llm_mode,
+        'version': ANALYSIS_VERSION
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _is_fresh(created_at: Any, max_age_seconds: int) -> bool:
+    return (datetime.now(timezone.utc) - as_utc(created_at)).total_seconds() < max_age_seconds
+
+def used_fallbacks(document: Dict) -> bool:
+    """Whether a stored analysis rests on default listing data or fallback estimates/insights"""
+    return bool(
+        document.get('fallback_used')
+        or document.get('estimates_source') == 'fallback'
+        or document.get('insights_source') == 'fallback'
+        or (document.get('property_data') or {}).get('scrape_fallback')
+    )
+
+def can_reuse(existing: Dict, property_input: PropertyInput) -> bool:
+    """
+    Fresh, not bypassed by refresh_ai, not an import still waiting for LLM
+    enrichment, and not built on fallbacks that a new run may improve on
+    """
+    return (
+        not property_input.refresh_ai
+        and existing.get('enrichment') != 'pending'
+        and not used_fallbacks(existing)
+        and _is_fresh(existing['created_at'], ANALYSIS_REUSE_SECONDS)
+    )
+
+async def analyze_with_reuse(property_input: PropertyInput) -> Tuple[AnalysisResult, str, bool]:
+    """
+    Return a fresh-enough stored analysis for the same input without scraping or
+    calling the LLM; otherwise run a new one that takes over the stored document's id.
+    """
+    key = analysis_reuse_key(property_input)
+    existing = None
+    try:
+        existing = await db.analyses.find_one({'analysis_key': key}, {'_id': 0})
+        if existing and can_reuse(existing, property_input):
+            return AnalysisResult(**expand_analysis_document(dict(existing))), key, True
+    except Exception as e:
+        logging.error(f"Analysis reuse lookup failed: {e}")
+    
+    analysis = await run_analysis(property_input)
+    if existing:
+        analysis.id = existing['id']
+    return analysis, key, False
+
+def analysis_upsert(analysis: AnalysisResult, key: str) -> Tuple[Dict, Dict]:
+    """Dedupe-on-write: filter and update that keep one document per reuse key"""
+    document = analysis_to_document(analysis)
+    document['analysis_key'] = key
+    # A full analysis supersedes any pending enrichment of an imported listing
+    return {'analysis_key': key}, {'$set': document, '$unset': {'enrichment': '', **superseded_fields(document)}}
+
+async def save_analysis(analysis: AnalysisResult, key: str):
+    with stage_timer('store'):
+        await db.analyses.update_one(*analysis_upsert(analysis, key), upsert=True)
+
+async def run_analysis(property_input: PropertyInput) -> AnalysisResult:
+    """Resolve the property, then run the metrics/strategies/insights graph"""
+    started = time.perf_counter()
+    
+    # Get purchase details or use defaults
+    purchase_details = property_input.purchase_details or PurchaseDetails()
+    
+    property_data = await resolve_property_data(property_input)
+    property_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    results, timings = await run_stage_graph(build_analysis_stages(
+        property_data, purchase_details, refresh_ai=property_input.refresh_ai, llm_mode=property_input.llm_mode
+    ))
+    
+    llm_mode = property_input.llm_mode
+    if llm_mode == 'single_shot' and results.get('combined') is None:
+        llm_mode = 'single_shot_fallback'
+    
+    return AnalysisResult(
+        property_data=property_data,
+        metrics=results['metrics'],
+        strategies=results['strategies'],
+        ai_insights=results['insights'][0],
+        llm_mode=llm_mode,
+        estimates_source=results['estimates'].get('source'),
+        insights_source=results['insights'][1],
+        purchase_details=purchase_details,
+        stage_timings={
+            'property': property_ms,
+            **timings,
+            'total': round((time.perf_counter() - started) * 1000, 1)
+        }
+    )
 
 # API Endpoints
 @api_router.get("/")
@@ -522,71 +1360,61 @@ async def extract_property_endpoint(property_input: PropertyInput):
         if not property_input.url:
             raise HTTPException(status_code=400, detail="URL is required")
         
-        extracted_data = extract_property_from_url(property_input.url)
+        extracted_data = await extract_property_from_url_async(property_input.url)
         return extracted_data
         
     except Exception as e:
         logging.error(f"Error extracting property: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/llm/stats")
+async def llm_stats_endpoint():
+    """
+    Per-call-site LLM latency, retry and token counters
+    """
+    return llm_gateway.stats()
+
+@api_router.get("/cache/listings/stats")
+async def listing_cache_stats_endpoint():
+    """
+    Listing cache hit/miss counters
+    """
+    return get_listing_cache_stats()
+
+@api_router.get("/cache/estimates/stats")
+async def ai_estimate_cache_stats_endpoint():
+    """
+    AI estimate cache hit/miss counters
+    """
+    return get_ai_estimate_cache_stats()
+
+@api_router.get("/comparables")
+async def comparables_endpoint(
+    location: str,
+    property_type: str = 'Apartment',
+    size_sqm: float = Query(default=0, ge=0)
+):
+    """
+    Median price and rent per sqm of similar stored properties, from the in-memory index
+    """
+    return {
+        'comparables': comparables_index.lookup(location, property_type, size_sqm),
+        'index': comparables_index.stats()
+    }
+
 @api_router.post("/analyze", response_model=AnalysisResult)
 async def analyze_property(property_input: PropertyInput):
     """
     Analyze a property from URL or manual input
     """
     try:
-        # Get purchase details or use defaults
-        purchase_details = property_input.purchase_details or PurchaseDetails()
-        
-        # Extract or use provided data
-        if property_input.url:
-            extracted_data = extract_property_from_url(property_input.url)
-            property_data = PropertyData(**extracted_data)
-        else:
-            # Use manual input
-            if not all([property_input.title, property_input.location, property_input.price]):
-                raise HTTPException(status_code=400, detail="Missing required fields: title, location, and price")
-            
-            property_data = PropertyData(
-                title=property_input.title,
-                location=property_input.location,
-                price=property_input.price,
-                property_type=property_input.property_type or "Apartment",
-                size_sqm=property_input.size_sqm or 80.0,
-                rooms=property_input.rooms,
-                bathrooms=property_input.bathrooms,
-                floor=property_input.floor,
-                condition=property_input.condition,
-                year_built=property_input.year_built,
-                renovation_needed=property_input.renovation_needed or False,
-                image_url='https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=800&q=80'
-            )
-        
-        # Calculate metrics with purchase details
-        metrics = await calculate_metrics(property_data, purchase_details)
-        
-        # Generate strategies
-        strategies = await generate_strategies(property_data, metrics)
-        
-        # Get AI insights
-        ai_insights = await get_ai_insights(property_data, metrics)
-        
-        # Create analysis result
-        analysis = AnalysisResult(
-            property_data=property_data,
-            metrics=metrics,
-            strategies=strategies,
-            ai_insights=ai_insights
-        )
+        analysis, key, reused = await analyze_with_reuse(property_input)
         
         # Save to database
-        analysis_dict = analysis.model_dump()
-        analysis_dict['created_at'] = analysis_dict['created_at'].isoformat()
-        analysis_dict['property_data']['created_at'] = analysis_dict['property_data']['created_at'].isoformat()
+        if not reused:
+            await save_analysis(analysis, key)
         
-        await db.analyses.insert_one(analysis_dict)
-        
-        return analysis
+        return model_response(analysis)
         
     except HTTPException:
         raise
@@ -594,6 +1422,230 @@ async def analyze_property(property_input: PropertyInput):
         logging.error(f"Error analyzing property: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def traced_job(handler: Callable[[Dict], Awaitable[Dict]]) -> Callable[[Dict], Awaitable[Dict]]:
+    """Run a job handler in the trace of the request that queued the job"""
+    async def run(payload: Dict) -> Dict:
+        with telemetry.trace(payload.get('traceparent')):
+            return await handler(payload)
+    return run
+
+async def process_analysis_job(payload: Dict) -> Dict:
+    """Job handler: run and store one analysis"""
+    try:
+        analysis, key, reused = await analyze_with_reuse(PropertyInput(**payload))
+    except HTTPException as e:
+        raise jobs.PermanentJobError(e.detail)
+    if not reused:
+        await save_analysis(analysis, key)
+    return {'analysis_id': analysis.id, 'reused': reused}
+
+job_queue: Optional[jobs.JobQueue] = None  # bound to db.analysis_jobs in create_clients
+
+async def process_enrichment_job(payload: Dict) -> Dict:
+    """Job handler: replace an imported analysis' deterministic estimates with the full LLM pipeline"""
+    document = await db.analyses.find_one({'id': payload['analysis_id'], 'enrichment': 'pending'}, {'_id': 0})
+    if document is None:
+        # Already enriched, re-analyzed through /analyze, or deleted
+        return {'analysis_id': payload['analysis_id'], 'skipped': True}
+    
+    await enrichment_rate_limiter.acquire()
+    property_data = PropertyData(**document['property_data'])
+    purchase_details = PurchaseDetails(**payload['purchase_details'])
+    results, timings = await run_stage_graph(build_analysis_stages(property_data, purchase_details))
+    analysis = AnalysisResult(
+        id=document['id'],
+        property_data=property_data,
+        metrics=results['metrics'],
+        strategies=results['strategies'],
+        ai_insights=results['insights'][0],
+        estimates_source=results['estimates'].get('source'),
+        insights_source=results['insights'][1],
+        purchase_details=purchase_details,
+        stage_timings=timings
+    )
+    stored = analysis_to_document(analysis)
+    await db.analyses.update_one(
+        {'id': document['id'], 'enrichment': 'pending'},
+        {'$set': stored, '$unset': {'enrichment': '', **superseded_fields(stored)}}
+    )
+    return {'analysis_id': document['id'], 'skipped': False}
+
+enrichment_queue: Optional[jobs.JobQueue] = None  # bound to db.enrichment_jobs in create_clients
+
+ANALYSIS_LIST_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'created_at': 1,
+    'property_data.title': 1,
+    'property_data.location': 1,
+    'property_data.price': 1,
+    'property_data.property_type': 1,
+    'property_data.size_sqm': 1,
+    'property_data.source_url': 1,
+    'property_data.image_url': 1,
+    'metrics.investment_score': 1,
+    'metrics.roi_range_min': 1,
+    'metrics.roi_range_max': 1,
+    'metrics.roe_range_min': 1,
+    'metrics.roe_range_max': 1,
+    'metrics.annual_net_cashflow': 1
+}
+
+def encode_cursor(created_at: Any, analysis_id: str) -> str:
+    # Legacy documents store created_at as an ISO string, newer ones as a BSON date
+    if isinstance(created_at, datetime):
+        return base64.urlsafe_b64encode(json.dumps([as_utc(created_at).isoformat(), analysis_id, 'date']).encode()).decode()
+    return base64.urlsafe_b64encode(json.dumps([created_at, analysis_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        created_at, analysis_id, *kind = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if kind == ['date']:
+            created_at = datetime.fromisoformat(created_at)
+        return created_at, analysis_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/analyses")
+async def list_analyses(
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    source_url: Optional[str] = None,
+    location: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_score: Optional[int] = None
+):
+    """
+    List stored analyses, newest first, with keyset pagination on (created_at, id)
+    """
+    query: Dict[str, Any] = {}
+    if source_url:
+        query['property_data.source_url'] = source_url
+    if location:
+        query['property_data.location'] = location
+    if property_type:
+        query['property_data.property_type'] = property_type
+    if min_price is not None or max_price is not None:
+        query['property_data.price'] = {}
+        if min_price is not None:
+            query['property_data.price']['$gte'] = min_price
+        if max_price is not None:
+            query['property_data.price']['$lte'] = max_price
+    if min_score is not None:
+        query['metrics.investment_score'] = {'$gte': min_score}
+    if cursor:
+        created_at, analysis_id = decode_cursor(cursor)
+        query['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, 'id': {'$lt': analysis_id}}
+        ]
+        if isinstance(created_at, datetime):
+            # Strings sort below dates, so every legacy document comes after a date cursor
+            query['$or'].append({'created_at': {'$type': 'string'}})
+    
+    items = await db.analyses.find(query, ANALYSIS_LIST_PROJECTION) \
+        .sort([('created_at', -1), ('id', -1)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+    
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1]['created_at'], items[-1]['id'])
+    
+    for item in items:
+        item['created_at'] = as_utc(item['created_at'])
+    return {'items': items, 'next_cursor': next_cursor}
+
+@api_router.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    """
+    Full stored analysis by ID
+    """
+    analysis = await db.analyses.find_one({'id': analysis_id}, ANALYSIS_PUBLIC_PROJECTION)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return expand_analysis_document(analysis)
+
+def format_stream_event(payload: Dict, stream_format: str, event: str = 'result') -> str:
+    """Encode one streamed payload as an NDJSON line or an SSE event"""
+    data = json.dumps(payload, default=str)
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
+
+@metrics_registry.collector
+def collect_cache_metrics():
+    caches = {'listing': get_listing_cache_stats(), 'ai_estimate': get_ai_estimate_cache_stats()}
+    yield 'cache_lookups_total', 'counter', 'Cache lookups by cache and outcome', [
+        ({'cache': cache, 'result': result}, value)
+        for cache, stats in caches.items()
+        for result, value in stats.items()
+        if result not in ('hit_ratio', 'memory_entries')
+    ]
+    yield 'cache_hit_ratio', 'gauge', 'Share of cache lookups served without fetching or asking the LLM', [
+        ({'cache': cache}, stats['hit_ratio']) for cache, stats in caches.items()
+    ]
+    yield 'listing_cache_memory_entries', 'gauge', 'Listings held in the in-process cache', [
+        ({}, caches['listing']['memory_entries'])
+    ]
+
+@metrics_registry.collector
+def collect_llm_metrics():
+    gateway_stats = llm_gateway.stats()
+    call_sites = gateway_stats['call_sites']
+    for field, kind, help in (
+        ('calls', 'counter', 'LLM calls by call site'),
+        ('errors', 'counter', 'LLM calls that failed after retries'),
+        ('retries', 'counter', 'LLM call retries'),
+        ('short_circuited', 'counter', 'LLM calls rejected by an open circuit'),
+        ('hedges', 'counter', 'Hedged duplicate LLM requests sent'),
+        ('hedge_wins', 'counter', 'Hedged requests that answered first'),
+        ('prompt_tokens_est', 'counter', 'Estimated prompt tokens sent'),
+        ('completion_tokens_est', 'counter', 'Estimated completion tokens received'),
+        ('latency_ms_avg', 'gauge', 'Average latency of successful LLM calls (ms)'),
+        ('latency_ms_max', 'gauge', 'Slowest LLM call (ms)')
+    ):
+        name = f"llm_{field}_total" if kind == 'counter' else f"llm_{field}"
+        yield name, kind, help, [({'call_site': site}, stats[field]) for site, stats in call_sites.items()]
+    circuits = gateway_stats['circuits']
+    yield 'llm_circuit_state', 'gauge', 'Circuit breaker state per model (1 for the current state)', [
+        ({'model': model, 'state': state}, 1 if circuit['state'] == state else 0)
+        for model, circuit in circuits.items()
+        for state in ('closed', 'open', 'half_open')
+    ]
+    yield 'llm_circuit_trips_total', 'counter', 'Times the circuit opened', [
+        ({'model': model}, circuit['trips']) for model, circuit in circuits.items()
+    ]
+
+@metrics_registry.collector
+def collect_index_metrics():
+    yield 'comparables_index_properties', 'gauge', 'Stored analyses in the comparables index', [
+        ({}, comparables_index.stats()['properties'])
+    ]
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Prometheus scrape endpoint
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Feature routers; they import this module, so they load once everything above is defined
+import batch_api  # noqa: E402
+import imports_api  # noqa: E402
+import jobs_api  # noqa: E402
+import portfolio_api  # noqa: E402
+import projection_api  # noqa: E402
+import scenarios_api  # noqa: E402
+import simulation_api  # noqa: E402
+import stream_api  # noqa: E402
+
+for feature in (scenarios_api, simulation_api, batch_api, jobs_api, stream_api, imports_api, portfolio_api, projection_api):
+    api_router.include_router(feature.router)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -603,15 +1655,136 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
+)
+app.add_middleware(
+    telemetry.MetricsMiddleware,
+    requests_total=http_requests_total,
+    request_duration=http_request_duration,
+    in_flight=http_requests_in_flight
 )
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s'
 )
+for handler in logging.getLogger().handlers:
+    handler.addFilter(telemetry.TraceIdFilter())
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+def create_clients():
+    """Open the Mongo and HTTP clients and bind the collection-backed services (idempotent)"""
+    global client, db, http_client, comparables_index, job_queue, enrichment_queue
+    if client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], minPoolSize=MONGO_MIN_POOL_SIZE)
+        db = client[os.environ['DB_NAME']]
+        comparables_index = comparables.ComparablesIndex(
+            db.analyses, min_count=COMPARABLES_MIN_COUNT, refresh_interval=COMPARABLES_REFRESH_SECONDS
+        )
+        job_queue = jobs.JobQueue(
+            db.analysis_jobs,
+            traced_job(process_analysis_job),
+            workers=JOB_WORKERS,
+            visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+            max_attempts=JOB_MAX_ATTEMPTS
+        )
+        enrichment_queue = jobs.JobQueue(
+            db.enrichment_jobs,
+            traced_job(process_enrichment_job),
+            workers=IMPORT_ENRICH_WORKERS,
+            visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+            max_attempts=JOB_MAX_ATTEMPTS
+        )
+    if http_client is None:
+        http_client = create_http_client()
+
+async def ensure_indexes():
+    """Create the indexes every collection relies on (idempotent, all at once)"""
+    index_specs = [
+        (db.listing_cache, 'fetched_at', {'expireAfterSeconds': LISTING_CACHE_RETENTION_SECONDS}),
+        (db.ai_estimates_cache, 'created_at', {'expireAfterSeconds': AI_CACHE_TTL_SECONDS}),
+        (db.analyses, 'id', {'unique': True}),
+        (db.analyses, 'analysis_key', {'unique': True, 'sparse': True}),
+        (db.analyses, [('created_at', -1), ('id', -1)], {}),
+        (db.analyses, [('property_data.source_url', 1), ('created_at', -1)], {}),
+        (db.analyses, [('property_data.location', 1), ('created_at', -1)], {}),
+        (db.imports, 'created_at', {})
+    ]
+    results = await asyncio.gather(
+        *(collection.create_index(keys, **options) for collection, keys, options in index_specs),
+        *(queue.ensure_indexes() for queue in (job_queue, enrichment_queue)),
+        return_exceptions=True
+    )
+    for spec, result in zip(index_specs + [None, None], results):
+        if isinstance(result, Exception):
+            target = f"{spec[1]} on {spec[0].name}" if spec else 'job queue'
+            logger.error(f"Could not create index {target}: {result}")
+
+async def prime_listing_cache():
+    """Load the most recently fetched, still fresh listings into the in-process cache"""
+    fresh_since = datetime.now(timezone.utc) - timedelta(seconds=LISTING_CACHE_FRESH_SECONDS)
+    cursor = db.listing_cache.find({'fetched_at': {'$gte': fresh_since}}, {'data': 1})
+    documents = await cursor.sort('fetched_at', -1).limit(min(WARMUP_CACHE_ENTRIES, LISTING_CACHE_MAX_ENTRIES)).to_list(None)
+    # Oldest first, so the newest entries are the last to be evicted
+    for document in reversed(documents):
+        listing_memory_cache[document['_id']] = document['data']
+    return len(documents)
+
+async def prime_ai_estimate_cache():
+    """Load the most recent AI estimates into the in-process cache"""
+    cursor = db.ai_estimates_cache.find({}, {'ai_data': 1})
+    documents = await cursor.sort('created_at', -1).limit(min(WARMUP_CACHE_ENTRIES, AI_CACHE_MAX_ENTRIES)).to_list(None)
+    for document in reversed(documents):
+        ai_estimate_memory_cache[document['_id']] = document['ai_data']
+    return len(documents)
+
+async def warm_up():
+    """
+    Run the startup work concurrently: indexes, Mongo pool pre-fill, comparables
+    and cache priming, and the LLM client import (in a thread). Failures are
+    logged; the app still starts and fills caches on demand.
+    """
+    started = time.perf_counter()
+    steps = {
+        'indexes': ensure_indexes(),
+        'mongo_ping': db.command('ping'),
+        'comparables_index': comparables_index.refresh(),
+        'listing_cache': prime_listing_cache(),
+        'ai_estimate_cache': prime_ai_estimate_cache(),
+        'llm_client': asyncio.to_thread(load_llm_client)
+    }
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*steps.values(), return_exceptions=True), timeout=STARTUP_WARMUP_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Warm-up did not finish within {STARTUP_WARMUP_TIMEOUT}s, starting anyway")
+        return
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.error(f"Warm-up step '{name}' failed: {result}")
+    logger.info(f"Warm-up done in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+async def start_services():
+    create_clients()
+    await warm_up()
+    job_queue.start()
+    enrichment_queue.start()
+    comparables_index.start()
+    loop_monitor.start()
+
+async def stop_services():
+    global client, http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+    await job_queue.stop()
+    await enrichment_queue.stop()
+    await comparables_index.stop()
+    await loop_monitor.stop()
+    simulation.shutdown_process_pool()
+    client.close()
+    client = None
@@ -0,0 +1,183 @@
+"""
+Monte Carlo risk simulation over the financing model in finance.py.
+
+Paths are simulated year by year as (paths, years) arrays. Large runs can be
+split into chunks with independent seeds and spread across a process pool.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import finance
+
+PERCENTILES = [5, 25, 50, 75, 95]
+CHUNK_PATHS = 50_000
+
+# One pool per effective worker count, so a request's `workers` setting is honoured
+_process_pools: Dict[int, ProcessPoolExecutor] = {}
+
+def sample(rng: np.random.Generator, spec: Dict, size) -> np.ndarray:
+    """Draw samples from a distribution spec (kind + mean/sd/low/mode/high)"""
+    kind = spec.get('kind', 'normal')
+    low, high = spec.get('low'), spec.get('high')
+
+    # Specs come from model_dump(), so omitted parameters are present as None
+    sd = spec.get('sd') if spec.get('sd') is not None else 0.0
+    if kind in ('fixed', 'normal', 'lognormal') and spec.get('mean') is None:
+        raise ValueError(f"A {kind} distribution needs a mean")
+    if kind in ('uniform', 'triangular') and (low is None or high is None):
+        raise ValueError(f"A {kind} distribution needs low and high")
+
+    if kind == 'fixed':
+        return np.full(size, spec['mean'], dtype=float)
+    if kind == 'uniform':
+        return rng.uniform(low, high, size)
+    if kind == 'triangular':
+        mode = spec.get('mode') if spec.get('mode') is not None else (low + high) / 2
+        return rng.triangular(low, mode, high, size)
+    if kind == 'lognormal':
+        mean = spec['mean']
+        sigma = np.sqrt(np.log1p((sd / mean) ** 2)) if mean else 0.0
+        values = rng.lognormal(np.log(mean) - sigma ** 2 / 2, sigma, size) if mean > 0 else np.zeros(size)
+    elif kind == 'normal':
+        values = rng.normal(spec['mean'], sd, size)
+    else:
+        raise ValueError(f"Unknown distribution kind: {kind}")
+
+    # Optional clipping bounds for the unbounded distributions
+    if low is not None or high is not None:
+        values = np.clip(values, low, high)
+    return values
+
+def simulate_paths(params: Dict, paths: int, seed) -> Dict[str, np.ndarray]:
+    """
+    Simulate `paths` investment outcomes. `params` holds price, the PurchaseDetails
+    fields, horizon_years and the distribution specs (rent, vacancy, appreciation,
+    rate_reset, maintenance_shock). Returns per-path summary arrays.
+    """
+    rng = np.random.default_rng(seed)
+    years = params['horizon_years']
+    shape = (paths, years)
+    price = params['price']
+
+    costs = finance.financing(
+        price,
+        params['mortgage_percentage'],
+        params['mortgage_rate'],
+        params['mortgage_years'],
+        params['purchase_tax_rate'],
+        params['notary_fees'],
+        params['agency_fees_percentage'],
+        params['annual_property_tax'],
+        params['maintenance_percentage']
+    )
+
+    # Income: a rent level per path, a vacancy fraction per path-year
+    monthly_rent = np.maximum(sample(rng, params['rent'], (paths, 1)), 0.0)
+    vacancy = np.clip(sample(rng, params['vacancy'], shape), 0.0, 1.0)
+    annual_rent = monthly_rent * 12 * (1 - vacancy)
+
+    # Debt service, with an optional rate reset from reset_year onwards
+    payment = np.broadcast_to(costs['monthly_mortgage'], shape).copy()
+    reset = params.get('rate_reset')
+    if reset and reset.get('probability', 0) > 0 and costs['mortgage_amount'] > 0:
+        reset_year = int(reset.get('reset_year', 2))
+        if reset_year < years and reset_year < params['mortgage_years']:
+            resets = rng.random(paths) < reset['probability']
+            new_rate = np.maximum(sample(rng, reset['new_rate'], paths), 0.0)
+            balance = finance.remaining_balance(
+                costs['mortgage_amount'], params['mortgage_rate'], params['mortgage_years'], reset_year * 12
+            )
+            new_payment = finance.mortgage_payment(balance, new_rate, params['mortgage_years'] - reset_year)
+            payment[:, reset_year:] = np.where(resets[:, None], new_payment[:, None], payment[:, reset_year:])
+
+    # Debt service stops once the mortgage is repaid, as in finance.yearly_projection
+    months_paid = np.clip(params['mortgage_years'] * 12 - np.arange(years) * 12, 0, 12)
+
+    # Running costs plus random maintenance shocks
+    shock = params.get('maintenance_shock')
+    shocks = np.zeros(shape)
+    if shock and shock.get('probability', 0) > 0:
+        hits = rng.random(shape) < shock['probability']
+        shocks = np.where(hits, np.maximum(sample(rng, shock['cost'], shape), 0.0), 0.0)
+    annual_costs = payment * months_paid + params['annual_property_tax'] + costs['annual_maintenance'] + shocks
+
+    cashflow = annual_rent - annual_costs
+    appreciation = sample(rng, params['appreciation'], shape)
+    final_value = price * np.prod(1 + appreciation / 100, axis=1)
+
+    mean_cashflow = cashflow.mean(axis=1)
+    total_gain = cashflow.sum(axis=1) + (final_value - price)
+    equity = costs['down_payment'] if costs['down_payment'] > 0 else price
+
+    return {
+        'annual_net_cashflow': mean_cashflow,
+        'worst_year_cashflow': cashflow.min(axis=1),
+        'roi': total_gain / costs['total_upfront'] * 100,
+        'roe': mean_cashflow / equity * 100,
+        'final_value': final_value
+    }
+
+def _chunk_seeds(paths: int, seed: Optional[int]) -> List:
+    chunks = max(1, -(-paths // CHUNK_PATHS))
+    sizes = [paths // chunks + (1 if i < paths % chunks else 0) for i in range(chunks)]
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(chunks)))
+
+def _simulate_chunk(args) -> Dict[str, np.ndarray]:
+    params, size, seed = args
+    return simulate_paths(params, size, seed)
+
+def summarize(outcomes: Dict[str, np.ndarray], bins: int) -> Dict:
+    """Percentiles, loss probabilities and a ROI histogram"""
+    summary = {
+        name: {
+            'mean': round(float(values.mean()), 2),
+            'percentiles': {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+        }
+        for name, values in outcomes.items()
+    }
+    counts, edges = np.histogram(outcomes['roi'], bins=bins)
+    return {
+        'paths': int(outcomes['roi'].size),
+        'metrics': summary,
+        'probability_negative_cashflow': round(float((outcomes['annual_net_cashflow'] < 0).mean()), 4),
+        'probability_any_negative_year': round(float((outcomes['worst_year_cashflow'] < 0).mean()), 4),
+        'probability_loss': round(float((outcomes['roi'] < 0).mean()), 4),
+        'roi_histogram': {
+            'edges': np.round(edges, 2).tolist(),
+            'counts': counts.tolist()
+        }
+    }
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    workers = max(1, min(workers, os.cpu_count() or 1))
+    if workers not in _process_pools:
+        _process_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _process_pools[workers]
+
+def shutdown_process_pool():
+    for pool in _process_pools.values():
+        pool.shutdown(cancel_futures=True)
+    _process_pools.clear()
+
+async def run_simulation(params: Dict, paths: int, seed: Optional[int] = None, workers: int = 1, bins: int = 40) -> Dict:
+    """Run the simulation off the event loop, in a process pool when workers > 1"""
+    chunks = _chunk_seeds(paths, seed)
+
+    if workers > 1 and len(chunks) > 1:
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool(workers)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _simulate_chunk, (params, size, chunk_seed))
+            for size, chunk_seed in chunks
+        ))
+    else:
+        results = await asyncio.to_thread(
+            lambda: [simulate_paths(params, size, chunk_seed) for size, chunk_seed in chunks]
+        )
+
+    outcomes = {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+    return await asyncio.to_thread(summarize, outcomes, bins)
@@ -0,0 +1,112 @@
+"""
+Monte Carlo risk simulation for one property (/api/simulate).
+
+Distributions left out of the request are derived from the AI estimates; the
+paths themselves run in simulation.py, optionally across worker processes.
+"""
+import time
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, model_validator
+
+import server
+import simulation
+from server import PropertyInput, PurchaseDetails
+
+router = APIRouter()
+
+class DistributionSpec(BaseModel):
+    kind: Literal['fixed', 'normal', 'lognormal', 'uniform', 'triangular'] = 'normal'
+    mean: Optional[float] = None
+    sd: float = 0.0
+    low: Optional[float] = None   # lower bound (uniform/triangular) or clip (normal/lognormal)
+    mode: Optional[float] = None
+    high: Optional[float] = None  # upper bound (uniform/triangular) or clip (normal/lognormal)
+    
+    @model_validator(mode='after')
+    def check_parameters(self) -> 'DistributionSpec':
+        if self.kind in ('fixed', 'normal', 'lognormal') and self.mean is None:
+            raise ValueError(f"a {self.kind} distribution needs a mean")
+        if self.kind in ('uniform', 'triangular') and (self.low is None or self.high is None):
+            raise ValueError(f"a {self.kind} distribution needs low and high")
+        if self.low is not None and self.high is not None and self.low > self.high:
+            raise ValueError("low must not exceed high")
+        if self.mode is not None and not (
+            (self.low is None or self.low <= self.mode) and (self.high is None or self.mode <= self.high)
+        ):
+            raise ValueError("mode must lie between low and high")
+        if self.sd < 0:
+            raise ValueError("sd must not be negative")
+        return self
+
+class RateResetSpec(BaseModel):
+    probability: float = Field(default=0.0, ge=0, le=1)
+    reset_year: int = Field(default=2, ge=1, le=40)
+    new_rate: Optional[DistributionSpec] = None  # defaults to current rate +1pt, sd 1pt
+
+class MaintenanceShockSpec(BaseModel):
+    probability: float = Field(default=0.1, ge=0, le=1)  # per year
+    cost: DistributionSpec = DistributionSpec(kind='triangular', low=1000, mode=4000, high=15000)
+
+class SimulationRequest(BaseModel):
+    property: PropertyInput
+    paths: int = Field(default=100_000, ge=100, le=5_000_000)
+    horizon_years: int = Field(default=5, ge=1, le=40)
+    # Omitted distributions are derived from the AI estimates
+    rent: Optional[DistributionSpec] = None
+    vacancy: DistributionSpec = DistributionSpec(kind='triangular', low=0.0, mode=0.05, high=0.25)
+    appreciation: Optional[DistributionSpec] = None
+    rate_reset: RateResetSpec = RateResetSpec()
+    maintenance_shock: MaintenanceShockSpec = MaintenanceShockSpec()
+    seed: Optional[int] = None
+    workers: int = Field(default=1, ge=1, le=64)
+    histogram_bins: int = Field(default=40, ge=5, le=500)
+
+@router.post("/simulate")
+async def simulate_endpoint(request: SimulationRequest):
+    """
+    Monte Carlo risk simulation: percentiles, loss probabilities and a ROI histogram
+    """
+    purchase_details = request.property.purchase_details or PurchaseDetails()
+    property_data = await server.resolve_property_data(request.property)
+    financing = server.compute_financing(property_data.price, purchase_details)
+    estimates = await server.estimate_rent_with_ai(
+        property_data, purchase_details, financing, refresh=request.property.refresh_ai
+    )
+    
+    rent_low = estimates['monthly_rent_conservative']
+    rent_high = estimates['monthly_rent_optimistic']
+    rent = request.rent or DistributionSpec(
+        kind='normal', mean=(rent_low + rent_high) / 2, sd=max(abs(rent_high - rent_low) / 2, rent_low * 0.05), low=0
+    )
+    appreciation = request.appreciation or DistributionSpec(kind='normal', mean=estimates['yoy_appreciation'], sd=2.0)
+    rate_reset = request.rate_reset.model_dump()
+    rate_reset['new_rate'] = (request.rate_reset.new_rate or DistributionSpec(
+        kind='normal', mean=purchase_details.mortgage_rate + 1, sd=1.0, low=0
+    )).model_dump()
+    
+    params = {
+        'price': property_data.price,
+        **purchase_details.model_dump(exclude={'is_first_home'}),
+        'horizon_years': request.horizon_years,
+        'rent': rent.model_dump(),
+        'vacancy': request.vacancy.model_dump(),
+        'appreciation': appreciation.model_dump(),
+        'rate_reset': rate_reset,
+        'maintenance_shock': request.maintenance_shock.model_dump()
+    }
+    
+    started = time.perf_counter()
+    try:
+        result = await simulation.run_simulation(
+            params, request.paths, seed=request.seed, workers=request.workers, bins=request.histogram_bins
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        **result,
+        'base_estimates': estimates,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,89 @@
+"""
+Compact persistence helpers for stored analyses.
+
+Documents written with STORAGE_VERSION keep datetimes as BSON dates, large
+text as zlib-compressed binary and repeated texts as template references (see
+server.py for the strategy templates). Older documents are still readable as
+they are; `migrate` rewrites them in resumable batches.
+"""
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ReplaceOne
+
+STORAGE_VERSION = 2
+COMPRESSION_LEVEL = 6
+
+def compress_text(text: Optional[str], min_bytes: int) -> Optional[bytes]:
+    """zlib-compressed UTF-8 text, or None when it is too short (or doesn't shrink) to be worth it"""
+    if not text:
+        return None
+    raw = text.encode()
+    if len(raw) < min_bytes:
+        return None
+    compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+    return compressed if len(compressed) < len(raw) else None
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(bytes(data)).decode()
+
+def as_utc(value: Any) -> Any:
+    """UTC-aware datetime from a stored timestamp (legacy ISO string, naive or aware BSON date)"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+async def migrate(
+    collection,
+    convert: Callable[[Dict], Dict],
+    batch_size: int = 500,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    size_of: Optional[Callable[[Dict], int]] = None
+) -> Dict[str, int]:
+    """
+    Rewrite documents without a storage_version through `convert`, batch by
+    batch. Each replace is conditional on the document still being
+    unversioned, so concurrent writers win and the run can be interrupted
+    and resumed at any point.
+    """
+    query = {'storage_version': {'$exists': False}}
+    report = {'scanned': 0, 'migrated': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0}
+    last_id = None
+    while limit is None or report['scanned'] < limit:
+        page_query = {**query, '_id': {'$gt': last_id}} if last_id is not None else query
+        size = batch_size if limit is None else min(batch_size, limit - report['scanned'])
+        documents = await collection.find(page_query).sort('_id', 1).limit(size).to_list(size)
+        if not documents:
+            break
+        last_id = documents[-1]['_id']
+
+        operations = []
+        for document in documents:
+            report['scanned'] += 1
+            try:
+                converted = convert(dict(document))
+            except Exception as e:
+                report['failed'] += 1
+                logging.error(f"Storage migration: could not convert {document.get('id', document['_id'])}: {str(e)}")
+                continue
+            converted['_id'] = document['_id']
+            converted['storage_version'] = STORAGE_VERSION
+            if size_of is not None:
+                report['bytes_before'] += size_of(document)
+                report['bytes_after'] += size_of(converted)
+            operations.append(ReplaceOne({'_id': document['_id'], **query}, converted))
+
+        if operations and not dry_run:
+            result = await collection.bulk_write(operations, ordered=False)
+            report['migrated'] += result.modified_count
+        elif dry_run:
+            report['migrated'] += len(operations)
+    return report
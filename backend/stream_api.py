@@ -0,0 +1,157 @@
+"""
+Server-sent events variant of /api/analyze (/api/analyze/stream).
+
+Property, financing, metrics and strategies are sent as soon as they exist
+and the insight text follows in chunks. A fresh stored analysis is replayed as is.
+"""
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+import server
+from server import AnalysisResult, ESTIMATES_DEADLINE, PropertyInput, PurchaseDetails, WORD_CHUNK_RE
+
+router = APIRouter()
+
+async def with_error_event(events: AsyncIterator[str]) -> AsyncIterator[str]:
+    """End an analysis stream with an `error` event, rather than cutting it off, when a stage fails"""
+    try:
+        async for event in events:
+            yield event
+    except Exception as e:
+        logging.error(f"Analysis stream failed: {e}")
+        yield server.format_stream_event({'detail': str(e)}, 'sse', event='error')
+
+@router.post("/analyze/stream")
+async def analyze_property_stream(property_input: PropertyInput):
+    """
+    Server-sent events variant of /analyze: property, financing, metrics and strategies
+    are sent as soon as they exist, the insight text follows in chunks, then the stored
+    result id with per-stage timings in milliseconds
+    """
+    started = time.perf_counter()
+    key = server.analysis_reuse_key(property_input)
+    existing = None
+    reusable = None
+    try:
+        existing = await server.db.analyses.find_one({'analysis_key': key}, {'_id': 0})
+        if existing and server.can_reuse(existing, property_input):
+            reusable = AnalysisResult(**server.expand_analysis_document(dict(existing)))
+    except Exception as e:
+        # As in /analyze: an unreadable stored analysis is replaced by a fresh one
+        logging.error(f"Analysis reuse lookup failed: {e}")
+    
+    purchase_details = property_input.purchase_details or PurchaseDetails()
+    if reusable is not None:
+        analysis = reusable
+        
+        async def replay():
+            yield server.format_stream_event(analysis.property_data.model_dump(mode='json'), 'sse', event='property')
+            financing = server.compute_financing(analysis.property_data.price, purchase_details)
+            yield server.format_stream_event(financing, 'sse', event='financing')
+            yield server.format_stream_event(analysis.metrics.model_dump(mode='json'), 'sse', event='metrics')
+            yield server.format_stream_event([s.model_dump() for s in analysis.strategies], 'sse', event='strategies')
+            yield server.format_stream_event({'delta': analysis.ai_insights}, 'sse', event='insight')
+            yield server.format_stream_event({'id': analysis.id, 'reused': True}, 'sse', event='done')
+        
+        return StreamingResponse(with_error_event(replay()), media_type='text/event-stream')
+    
+    # Resolve before streaming so input errors still surface as HTTP errors
+    property_data = await server.resolve_property_data(property_input)
+    timings = {'property': round((time.perf_counter() - started) * 1000, 1)}
+    
+    def mark(stage: str, stage_started: float):
+        """Record one stage's duration, as run_stage_graph does for /analyze"""
+        timings[stage] = round((time.perf_counter() - stage_started) * 1000, 1)
+    
+    async def stream():
+        yield server.format_stream_event(property_data.model_dump(mode='json'), 'sse', event='property')
+        
+        stage_started = time.perf_counter()
+        financing = server.compute_financing(property_data.price, purchase_details)
+        mark('financing', stage_started)
+        yield server.format_stream_event(financing, 'sse', event='financing')
+        
+        combined = None
+        if property_input.llm_mode == 'single_shot':
+            stage_started = time.perf_counter()
+            try:
+                with server.stage_timer('combined'):
+                    combined = await asyncio.wait_for(
+                        server.combined_analysis_with_ai(property_data, purchase_details, financing), timeout=ESTIMATES_DEADLINE
+                    )
+            except asyncio.TimeoutError:
+                logging.warning("Single-shot stage exceeded its deadline, falling back")
+                server.stage_fallbacks_total.labels('combined').inc()
+            mark('combined', stage_started)
+        
+        stage_started = time.perf_counter()
+        if combined is not None:
+            estimates = server.estimates_from_ai_data(combined.model_dump(), property_data.price)
+        else:
+            try:
+                with server.stage_timer('estimates'):
+                    estimates = await asyncio.wait_for(
+                        server.estimate_rent_with_ai(property_data, purchase_details, financing, refresh=property_input.refresh_ai),
+                        timeout=ESTIMATES_DEADLINE
+                    )
+            except asyncio.TimeoutError:
+                logging.warning("Estimates stage exceeded its deadline, using fallback")
+                server.stage_fallbacks_total.labels('estimates').inc()
+                estimates = server.fallback_estimates(property_data)
+        
+        mark('estimates', stage_started)
+        
+        stage_started = time.perf_counter()
+        metrics = server.build_investment_metrics(property_data, financing, estimates)
+        mark('metrics', stage_started)
+        yield server.format_stream_event(metrics.model_dump(mode='json'), 'sse', event='metrics')
+        
+        stage_started = time.perf_counter()
+        with server.stage_timer('strategies'):
+            strategies = await server.generate_strategies(property_data, metrics)
+        mark('strategies', stage_started)
+        yield server.format_stream_event([strategy.model_dump() for strategy in strategies], 'sse', event='strategies')
+        
+        chunks: List[str] = []
+        insights_source = 'ai'
+        stage_started = time.perf_counter()
+        if combined is not None:
+            insight_chunks = (chunk.group() for chunk in WORD_CHUNK_RE.finditer(combined.insights))
+            for chunk in insight_chunks:
+                chunks.append(chunk)
+                yield server.format_stream_event({'delta': chunk}, 'sse', event='insight')
+        else:
+            with server.stage_timer('insights'):
+                async for chunk, insights_source in server.stream_ai_insights(property_data, metrics):
+                    chunks.append(chunk)
+                    yield server.format_stream_event({'delta': chunk}, 'sse', event='insight')
+        mark('insights', stage_started)
+        
+        llm_mode = property_input.llm_mode
+        if llm_mode == 'single_shot' and combined is None:
+            llm_mode = 'single_shot_fallback'
+        analysis = AnalysisResult(
+            property_data=property_data,
+            metrics=metrics,
+            strategies=strategies,
+            ai_insights=''.join(chunks),
+            llm_mode=llm_mode,
+            estimates_source=estimates.get('source'),
+            insights_source=insights_source,
+            purchase_details=purchase_details,
+            stage_timings={**timings, 'total': round((time.perf_counter() - started) * 1000, 1)}
+        )
+        if existing:
+            analysis.id = existing['id']
+        try:
+            await server.save_analysis(analysis, key)
+        except Exception as e:
+            logging.error(f"Error saving streamed analysis: {e}")
+        yield server.format_stream_event({'id': analysis.id, 'reused': False, 'stage_timings': analysis.stage_timings}, 'sse', event='done')
+    
+    return StreamingResponse(with_error_event(stream()), media_type='text/event-stream')
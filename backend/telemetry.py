@@ -0,0 +1,368 @@
+"""
+In-process metrics in the Prometheus text format, event-loop blocking
+detection and W3C trace context.
+
+Counters, gauges and histograms are plain Python numbers updated in place.
+The event loop is single-threaded, so the hot path takes no locks, and once a
+label combination has been seen an update allocates nothing. Values that other
+components already count (cache stats, LLM gateway counters) are read by
+collector callbacks only when /metrics is scraped.
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+TRACEPARENT_RE = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+# (name, type, help, [(labels, value), ...]) as produced by a collector
+Family = Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + '}'
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+class HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metric:
+    """A metric family; `labels(...)` returns the child for one label combination"""
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labelnames, values)} {format_value(child.value)}"
+            for values, child in list(self._children.items())
+        ]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = self.labelnames + ('le',)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), child.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(names, values + (format_value(bound),))} {cumulative}")
+            label_text = format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{label_text} {format_value(child.sum)}")
+            lines.append(f"{self.name}_count{label_text} {child.count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, func: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Register a callback producing metric families at scrape time (usable as a decorator)"""
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                logging.error(f"Metrics collector {collect.__name__} failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {format_value(value)}")
+        lines.append('')
+        return '\n'.join(lines)
+
+class StageTimer:
+    """`with StageTimer(histogram_child, gauge_child):` tracks in-flight count and duration of a block"""
+    __slots__ = ('histogram', 'in_flight', 'started')
+
+    def __init__(self, histogram: HistogramChild, in_flight: GaugeChild):
+        self.histogram = histogram
+        self.in_flight = in_flight
+        self.started = 0.0
+
+    def __enter__(self) -> 'StageTimer':
+        self.in_flight.value += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.in_flight.value -= 1
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+class LoopMonitor:
+    """
+    Measures event-loop lag with a periodic sleep and, from a watchdog thread,
+    reports the stack of whatever keeps the loop busy longer than block_threshold
+    """
+
+    def __init__(self, lag: Histogram, blocked: Counter, interval: float = 0.1, block_threshold: float = 0.25):
+        self.lag = lag.labels()
+        self.blocked = blocked.labels()
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._probe())
+        if self.block_threshold > 0:
+            self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    async def _probe(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag.observe(max(0.0, time.perf_counter() - expected))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+        reported = False
+        while not self._stopped.wait(self.interval):
+            stalled = time.monotonic() - self._heartbeat
+            if stalled <= self.block_threshold + self.interval:
+                reported = False
+                continue
+            if reported:
+                continue
+            # Only this thread writes the blocked counter, so the increment needs no lock
+            reported = True
+            self.blocked.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)[-8:]) if frame is not None else '(no frame)\n'
+            logging.warning(f"Event loop blocked for over {stalled:.2f}s, currently in:\n{stack.rstrip()}")
+
+# Trace context (https://www.w3.org/TR/trace-context/): the trace ID of the
+# request or job being handled, picked up by log records and job payloads
+current_trace_id: ContextVar[Optional[str]] = ContextVar('current_trace_id', default=None)
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+def parse_traceparent(value: Optional[str]) -> Optional[str]:
+    """Trace ID of a traceparent header, or None if it is missing or malformed"""
+    match = TRACEPARENT_RE.match(value.strip().lower()) if value else None
+    if match is None or match.group(1) == '0' * 32:
+        return None
+    return match.group(1)
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header value continuing the current trace with a new span"""
+    trace_id = current_trace_id.get()
+    return f"00-{trace_id}-{os.urandom(8).hex()}-01" if trace_id else None
+
+class trace:
+    """`with trace(traceparent):` continues that trace (or starts a new one) for the block"""
+    __slots__ = ('trace_id', '_token')
+
+    def __init__(self, traceparent: Optional[str] = None):
+        self.trace_id = parse_traceparent(traceparent) or new_trace_id()
+        self._token = None
+
+    def __enter__(self) -> str:
+        self._token = current_trace_id.set(self.trace_id)
+        return self.trace_id
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        current_trace_id.reset(self._token)
+        return False
+
+class TraceIdFilter(logging.Filter):
+    """Adds `trace_id` to every log record ('-' outside a trace)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id.get() or '-'
+        return True
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request count and latency per route template, in-flight
+    requests, and a trace context per request (from the incoming traceparent
+    header, echoed back as X-Trace-Id)
+    """
+
+    def __init__(self, app, requests_total: Counter, request_duration: Histogram, in_flight: Gauge):
+        self.app = app
+        self.requests_total = requests_total
+        self.request_duration = request_duration
+        self.in_flight = in_flight.labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope['headers']:
+            if name == b'traceparent':
+                traceparent = value.decode('latin-1')
+                break
+        trace_id = parse_traceparent(traceparent) or new_trace_id()
+        token = current_trace_id.set(trace_id)
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message['headers'] = [*message.get('headers', ()), (b'x-trace-id', trace_id.encode())]
+            await send(message)
+
+        self.in_flight.value += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            self.in_flight.value -= 1
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            self.request_duration.labels(route).observe(time.perf_counter() - started)
+            self.requests_total.labels(scope['method'], route, str(status)).inc()
+            current_trace_id.reset(token)
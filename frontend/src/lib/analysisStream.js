@@ -0,0 +1,51 @@
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+// POST /api/analyze/stream and dispatch each server-sent event to onEvent(event, data).
+// Resolves once the `done` event arrives; rejects on HTTP errors, on an `error` event,
+// and when the stream ends without `done` (e.g. the connection dropped).
+export async function streamAnalysis(payload, onEvent, signal) {
+  const response = await fetch(`${API}/analyze/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(payload),
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Analysis stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let completed = false;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      const dataLines = [];
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      });
+      if (dataLines.length) {
+        const data = JSON.parse(dataLines.join('\n'));
+        if (event === 'error') throw new Error(data.detail || 'Analysis stream failed');
+        if (event === 'done') completed = true;
+        onEvent(event, data);
+      }
+    }
+  }
+
+  if (!completed) throw new Error('Analysis stream ended before it completed');
+}
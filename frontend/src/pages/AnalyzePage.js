@@ -98,9 +98,8 @@ const AnalyzePage = () => {
         };
       }
 
-      const response = await axios.post(`${API}/analyze`, payload);
-      toast.success('Analysis complete!');
-      navigate('/results/new', { state: { analysis: response.data } });
+      // Results page streams the analysis from /api/analyze/stream
+      navigate('/results/new', { state: { request: payload } });
     } catch (error) {
       console.error('Analysis error:', error);
       toast.error('Failed to analyze property.');
@@ -214,7 +213,7 @@ const AnalyzePage = () => {
                             className="h-12 border-slate-300"
                           />
                           <p className="text-sm text-slate-500">
-                            Incolla un link da immobiliare.it
+                            Incolla un link da immobiliare.it, idealista.it, casa.it o subito.it
                           </p>
                         </div>
 
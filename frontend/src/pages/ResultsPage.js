@@ -1,20 +1,70 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
-import { ArrowLeft, Building2, MapPin, Home, TrendingUp, Euro, Calendar } from 'lucide-react';
+import { ArrowLeft, Building2, MapPin, Home, TrendingUp, Euro, Calendar, Loader2 } from 'lucide-react';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../components/ui/card';
 import { Badge } from '../components/ui/badge';
+import { toast } from 'sonner';
+import { streamAnalysis } from '../lib/analysisStream';
 
 const ResultsPage = () => {
   const location = useLocation();
   const navigate = useNavigate();
   
-  const analysis = location.state?.analysis;
+  const request = location.state?.request;
+  const [analysis, setAnalysis] = useState(location.state?.analysis || null);
+  const [insightsStreaming, setInsightsStreaming] = useState(false);
+
+  // Stream the analysis: metrics and strategies render as soon as they arrive,
+  // the AI insights text fills in while it is generated
+  useEffect(() => {
+    if (!request || location.state?.analysis) return undefined;
+
+    const controller = new AbortController();
+    const partial = { ai_insights: '' };
+    setInsightsStreaming(true);
+
+    streamAnalysis(request, (event, data) => {
+      if (event === 'property') partial.property_data = data;
+      else if (event === 'metrics') partial.metrics = data;
+      else if (event === 'strategies') partial.strategies = data;
+      else if (event === 'insight') partial.ai_insights += data.delta;
+      else if (event === 'done') {
+        partial.id = data.id;
+        setInsightsStreaming(false);
+      }
+      if (partial.property_data && partial.metrics && partial.strategies) {
+        setAnalysis({ ...partial });
+      }
+    }, controller.signal).catch((error) => {
+      if (controller.signal.aborted) return;
+      console.error('Analysis error:', error);
+      setInsightsStreaming(false);
+      toast.error('Failed to analyze property.');
+      // Keep whatever already rendered; only leave when nothing did
+      if (!(partial.property_data && partial.metrics && partial.strategies)) navigate('/analyze');
+    });
+
+    return () => controller.abort();
+  }, [request, location.state, navigate]);
+
+  useEffect(() => {
+    if (!request && !location.state?.analysis) {
+      navigate('/analyze');
+    }
+  }, [request, location.state, navigate]);
 
   if (!analysis) {
-    navigate('/analyze');
-    return null;
+    if (!request) return null;
+    return (
+      <div className="min-h-screen bg-gray-50 flex items-center justify-center" data-testid="results-loading">
+        <div className="flex items-center gap-3 text-slate-700">
+          <Loader2 className="w-6 h-6 animate-spin text-blue-900" />
+          <span className="text-lg">Analisi in corso...</span>
+        </div>
+      </div>
+    );
   }
 
   const { property_data, metrics, strategies, ai_insights } = analysis;
@@ -315,7 +365,15 @@ const ResultsPage = () => {
               </CardTitle>
             </CardHeader>
             <CardContent>
-              <p className="text-lg leading-relaxed text-slate-700">{ai_insights}</p>
+              <p className="text-lg leading-relaxed text-slate-700">
+                {ai_insights}
+                {insightsStreaming && (
+                  <span className="inline-flex items-center gap-2 text-slate-500">
+                    <Loader2 className="w-4 h-4 animate-spin" />
+                    {!ai_insights && 'Generazione analisi AI...'}
+                  </span>
+                )}
+              </p>
             </CardContent>
           </Card>
         </motion.div>
@@ -0,0 +1,30 @@
+"""
+Offline test setup: backend modules are imported from backend/, Mongo is
+mongomock-motor and the LLM client is the FakeLlmChat from the benchmarks.
+"""
+import os
+import sys
+from pathlib import Path
+
+import mongomock_motor
+import motor.motor_asyncio
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / 'benchmarks'))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test_database')
+
+# server creates its Mongo client from this class, so it gets the in-memory one
+motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+
+# The feature routers (simulation_api, ...) import server, so it has to be loaded before them
+import server  # noqa: E402
+
+@pytest.fixture
+def server_db(monkeypatch):
+    """server with a fresh in-memory database"""
+    monkeypatch.setattr(server, 'db', mongomock_motor.AsyncMongoMockClient()['test_database'])
+    return server
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+import finance
+import imports_api
+import server
+
+def test_missing_ai_estimates_default_to_the_fallback_figures():
+    estimates = server.estimates_from_ai_data({}, 250000)
+    assert estimates == {**server.fallback_ai_estimates(250000), 'source': 'ai'}
+    assert estimates['investment_score'] == finance.FALLBACK_SCORE
+
+def test_unknown_import_is_reported_as_not_found(server_db):
+    result = asyncio.run(imports_api.run_import('missing'))
+    assert result['status'] == 'failed'
+    assert result['error'] == 'Import not found'
+    assert imports_api.import_to_response(result)['import_id'] == 'missing'
+
+@pytest.mark.parametrize('field', ['monthly_rent_conservative', 'yoy_appreciation'])
+def test_ai_estimates_are_kept_when_present(field):
+    assert server.estimates_from_ai_data({field: 1.5}, 250000)[field] == 1.5
@@ -0,0 +1,100 @@
+import asyncio
+
+import mongomock_motor
+
+import jobs
+
+def make_queue(handler, **options) -> jobs.JobQueue:
+    collection = mongomock_motor.AsyncMongoMockClient()['test_database']['jobs']
+    return jobs.JobQueue(collection, handler, **{'retry_backoff': 0.0, **options})
+
+async def echo(payload):
+    return {'echo': payload['value']}
+
+def test_claim_takes_a_job_once_and_completes_it():
+    async def scenario():
+        queue = make_queue(echo)
+        submitted = await queue.submit({'value': 1})
+        job = await queue.claim('worker-a')
+        second = await queue.claim('worker-b')
+        await queue._process(job)
+        return submitted, job, second, await queue.get(submitted['_id'])
+
+    submitted, job, second, stored = asyncio.run(scenario())
+    assert job['_id'] == submitted['_id']
+    assert (job['status'], job['attempts'], job['locked_by']) == ('running', 1, 'worker-a')
+    assert second is None
+    assert stored['status'] == 'done'
+    assert stored['result'] == {'echo': 1}
+
+def test_failed_attempt_is_retried_until_it_succeeds():
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError('upstream timeout')
+        return {'ok': True}
+
+    async def scenario():
+        queue = make_queue(flaky, max_attempts=3)
+        submitted = await queue.submit({'value': 1})
+        await queue._process(await queue.claim('worker'))
+        requeued = await queue.get(submitted['_id'])
+        await queue._process(await queue.claim('worker'))
+        return requeued, await queue.get(submitted['_id'])
+
+    requeued, stored = asyncio.run(scenario())
+    assert (requeued['status'], requeued['error']) == ('queued', 'upstream timeout')
+    assert (stored['status'], stored['attempts'], stored['result']) == ('done', 2, {'ok': True})
+
+def test_permanent_error_and_last_attempt_fail_the_job():
+    async def invalid(payload):
+        raise jobs.PermanentJobError('Missing required fields')
+
+    async def broken(payload):
+        raise RuntimeError('still down')
+
+    async def scenario(handler):
+        queue = make_queue(handler, max_attempts=1)
+        submitted = await queue.submit({'value': 1})
+        await queue._process(await queue.claim('worker'))
+        return await queue.get(submitted['_id']), await queue.claim('worker')
+
+    for handler, error in ((invalid, 'Missing required fields'), (broken, 'still down')):
+        stored, next_job = asyncio.run(scenario(handler))
+        assert (stored['status'], stored['error'], stored['attempts']) == ('failed', error, 1)
+        assert next_job is None
+
+def test_expired_lease_is_claimed_again():
+    async def scenario():
+        queue = make_queue(echo, visibility_timeout=0.0)
+        await queue.submit({'value': 1})
+        first = await queue.claim('crashed-worker')
+        second = await queue.claim('worker')
+        await queue._update(first, {'status': 'done'})
+        return first, second, await queue.get(first['_id'])
+
+    first, second, stored = asyncio.run(scenario())
+    assert second['_id'] == first['_id']
+    assert (second['locked_by'], second['attempts']) == ('worker', 2)
+    # The first worker lost its lease, so its late update is ignored
+    assert stored['status'] == 'running'
+
+def test_idle_workers_wake_up_on_submit():
+    async def scenario():
+        queue = make_queue(echo, workers=2, poll_interval=30.0)
+        queue.start()
+        try:
+            await asyncio.sleep(0.05)  # let the workers find the queue empty
+            submitted = await queue.submit({'value': 2})
+            statuses = []
+            async for job in queue.events(submitted['_id'], poll_interval=30.0):
+                statuses.append(job['status'])
+            return statuses, job
+        finally:
+            await queue.stop()
+
+    statuses, job = asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert statuses[-1] == 'done'
+    assert job['result'] == {'echo': 2}
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+import llm_gateway
+from fakes import FakeLlmChat, FakeLlmConfig, FakeUserMessage
+
+def make_gateway(monkeypatch, chat_class=FakeLlmChat) -> llm_gateway.LlmGateway:
+    monkeypatch.setattr(llm_gateway, 'LlmChat', chat_class)
+    monkeypatch.setattr(llm_gateway, 'UserMessage', FakeUserMessage)
+    monkeypatch.setattr(FakeLlmConfig, 'latency', 0.0)
+    monkeypatch.setattr(FakeLlmConfig, 'jitter', 0.0)
+    return llm_gateway.LlmGateway(api_key='test', requests_per_second=0)
+
+def test_new_clients_get_distinct_session_ids(monkeypatch):
+    gateway = make_gateway(monkeypatch)
+    first = gateway._checkout('openai', 'model', 'system')
+    second = gateway._checkout('openai', 'model', 'system')
+    assert first.session_id != second.session_id
+
+def test_checkin_clears_conversation_and_pools_client(monkeypatch):
+    gateway = make_gateway(monkeypatch)
+    chat = gateway._checkout('openai', 'model', 'system')
+    chat.messages.append({'role': 'user', 'content': 'hello'})
+    gateway._checkin('openai', 'model', 'system', chat)
+
+    assert chat.messages == [{'role': 'system', 'content': 'system'}]
+    assert gateway._checkout('openai', 'model', 'system') is chat
+
+def test_client_without_history_is_not_pooled(monkeypatch, caplog):
+    class NoHistoryChat(FakeLlmChat):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            del self.messages
+
+    gateway = make_gateway(monkeypatch, NoHistoryChat)
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(gateway.complete('insights', 'system', 'prompt', 'openai', 'model'))
+        asyncio.run(gateway.complete('insights', 'system', 'prompt', 'openai', 'model'))
+
+    stats = gateway.stats()
+    assert stats['pooled_clients'] == 0
+    assert stats['unpooled_models'] == ['model']
+    assert sum('will not be pooled' in record.message for record in caplog.records) == 1
+
+def test_complete_chunked_splits_the_whole_completion(monkeypatch):
+    gateway = make_gateway(monkeypatch)
+
+    async def collect():
+        full = await gateway.complete('insights', 'system', 'prompt', 'openai', 'model')
+        chunks = [chunk async for chunk in gateway.complete_chunked('insights', 'system', 'prompt', 'openai', 'model')]
+        return full, chunks
+
+    full, chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert ''.join(chunks) == full
@@ -0,0 +1,34 @@
+import pytest
+
+import portals
+from parser_throughput import load_fixtures
+
+FIXTURES = load_fixtures()
+
+@pytest.fixture(scope='module')
+def registry() -> portals.PortalRegistry:
+    return portals.default_registry(0, 4)
+
+@pytest.mark.parametrize('name, html, url, expected', FIXTURES, ids=[fixture[0] for fixture in FIXTURES])
+def test_fixture_parses_to_expected_fields(registry, name, html, url, expected):
+    result = registry.parse(html, url)
+    assert {key: result.get(key) for key in expected} == expected
+
+@pytest.mark.parametrize('url, portal', [
+    ('https://www.immobiliare.it/annunci/123456/', 'immobiliare.it'),
+    ('https://www.idealista.it/immobile/123456/', 'idealista.it'),
+    ('https://m.casa.it/immobili/123456/', 'casa.it'),
+    ('https://www.subito.it/appartamenti/bilocale-123456.htm', 'subito.it'),
+    ('https://www.example-portal.it/annunci/1/', 'generic')
+])
+def test_registry_dispatches_by_domain(registry, url, portal):
+    assert registry.for_url(url).name == portal
+
+def test_portal_limits_override_parser_defaults():
+    registry = portals.default_registry(2, 8, {'idealista.it': {'concurrency': 1}})
+    idealista_bucket, idealista_semaphore = registry.limiters('https://www.idealista.it/immobile/1/')
+    _, generic_semaphore = registry.limiters('https://www.example-portal.it/annunci/1/')
+
+    assert idealista_semaphore._value == 1
+    assert generic_semaphore._value == 8
+    assert registry.limiters('https://idealista.it/immobile/2/')[0] is idealista_bucket
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import server
+
+PROPERTY_INPUT = server.PropertyInput(url='https://www.immobiliare.it/annunci/1/')
+METRICS = {
+    'investment_score': 6, 'roi_range_min': 3.0, 'roi_range_max': 5.0, 'roe_range_min': 4.0, 'roe_range_max': 7.0,
+    'annual_net_cashflow': 1200.0, 'estimated_value': 255000.0, 'yoy_appreciation': 3.0, 'projected_5yr_value': 295000.0
+}
+
+def analysis(property_data: dict = None, **fields) -> server.AnalysisResult:
+    return server.AnalysisResult(
+        property_data=property_data or {'title': 'Bilocale', 'location': 'Milano', 'price': 250000, 'property_type': 'Appartamento', 'size_sqm': 60},
+        metrics=METRICS,
+        strategies=[],
+        ai_insights='Stored insights',
+        **{'estimates_source': 'ai', 'insights_source': 'ai', **fields}
+    )
+
+def stored(result: server.AnalysisResult) -> dict:
+    document = server.analysis_to_document(result)
+    document['analysis_key'] = server.analysis_reuse_key(PROPERTY_INPUT)
+    return document
+
+def test_fresh_analysis_is_reused():
+    assert server.can_reuse(stored(analysis()), PROPERTY_INPUT)
+
+@pytest.mark.parametrize('result', [
+    analysis(estimates_source='fallback'),
+    analysis(insights_source='fallback'),
+    analysis(property_data=server.default_property_data(PROPERTY_INPUT.url))
+])
+def test_analysis_built_on_fallbacks_is_not_reused(result):
+    assert not server.can_reuse(stored(result), PROPERTY_INPUT)
+
+def test_legacy_document_with_fallback_flag_is_not_reused():
+    assert not server.can_reuse({**stored(analysis()), 'fallback_used': True}, PROPERTY_INPUT)
+
+def test_fallback_analysis_is_rerun_under_the_same_id(server_db, monkeypatch):
+    existing = stored(analysis(estimates_source='fallback'))
+    fresh = analysis()
+
+    async def run_analysis(property_input):
+        return fresh
+
+    async def scenario():
+        await server_db.db.analyses.insert_one(existing)
+        return await server_db.analyze_with_reuse(PROPERTY_INPUT)
+
+    monkeypatch.setattr(server_db, 'run_analysis', run_analysis)
+    result, _, reused = asyncio.run(scenario())
+    assert not reused
+    assert result is fresh
+    assert result.id == existing['id']
@@ -0,0 +1,91 @@
+import asyncio
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+import server
+import simulation
+from simulation_api import DistributionSpec, MaintenanceShockSpec, RateResetSpec
+
+def simulation_params(**overrides) -> dict:
+    """Request-shaped params, with the distribution specs dumped as the endpoint does"""
+    rate_reset = RateResetSpec(probability=0.2).model_dump()
+    rate_reset['new_rate'] = DistributionSpec(kind='normal', mean=4.5, sd=1.0, low=0).model_dump()
+    params = {
+        'price': 250000,
+        **server.PurchaseDetails().model_dump(exclude={'is_first_home'}),
+        'horizon_years': 5,
+        'rent': DistributionSpec(kind='normal', mean=1000, sd=100, low=0).model_dump(),
+        'vacancy': DistributionSpec(kind='triangular', low=0.0, mode=0.05, high=0.25).model_dump(),
+        'appreciation': DistributionSpec(kind='normal', mean=2.0, sd=2.0).model_dump(),
+        'rate_reset': rate_reset,
+        'maintenance_shock': MaintenanceShockSpec().model_dump()
+    }
+    params.update(overrides)
+    return params
+
+@pytest.mark.parametrize('spec', [
+    {'kind': 'normal'},
+    {'kind': 'fixed'},
+    {'kind': 'uniform', 'low': 5},
+    {'kind': 'triangular', 'low': 900, 'high': 800},
+    {'kind': 'triangular', 'low': 0, 'mode': 2, 'high': 1},
+    {'kind': 'normal', 'mean': 1, 'sd': -1}
+])
+def test_invalid_distribution_is_rejected(spec):
+    with pytest.raises(ValidationError):
+        DistributionSpec(**spec)
+
+@pytest.mark.parametrize('spec', [
+    DistributionSpec(kind='uniform', low=0.0, high=0.1),
+    DistributionSpec(kind='triangular', low=0.0, high=0.1),
+    DistributionSpec(kind='fixed', mean=3.0),
+    DistributionSpec(kind='lognormal', mean=1000, sd=150)
+])
+def test_dumped_specs_sample_with_defaults_for_omitted_parameters(spec):
+    values = simulation.sample(np.random.default_rng(1), spec.model_dump(), 1000)
+    assert values.shape == (1000,)
+    assert np.isfinite(values).all()
+
+def test_sample_rejects_specs_missing_required_parameters():
+    with pytest.raises(ValueError):
+        simulation.sample(np.random.default_rng(1), {'kind': 'normal', 'mean': None, 'sd': None}, 10)
+
+def test_seeded_simulation_is_reproducible():
+    params = simulation_params(vacancy=DistributionSpec(kind='uniform', low=0.0, high=0.1).model_dump())
+    first = asyncio.run(simulation.run_simulation(params, 2000, seed=7))
+    second = asyncio.run(simulation.run_simulation(params, 2000, seed=7))
+    assert first['metrics'] == second['metrics']
+    assert 0 <= first['probability_loss'] <= 1
+
+def test_process_pool_per_worker_count(monkeypatch):
+    monkeypatch.setattr(simulation.os, 'cpu_count', lambda: 8)
+    try:
+        assert simulation.get_process_pool(2) is simulation.get_process_pool(2)
+        assert simulation.get_process_pool(3) is not simulation.get_process_pool(2)
+    finally:
+        simulation.shutdown_process_pool()
+
+def test_debt_service_stops_after_the_mortgage_term():
+    params = simulation_params(
+        horizon_years=40,
+        rent=DistributionSpec(kind='fixed', mean=1000).model_dump(),
+        vacancy=DistributionSpec(kind='fixed', mean=0.0).model_dump(),
+        appreciation=DistributionSpec(kind='fixed', mean=0.0).model_dump(),
+        rate_reset=RateResetSpec().model_dump(),
+        maintenance_shock=MaintenanceShockSpec(probability=0).model_dump()
+    )
+    outcomes = simulation.simulate_paths(params, 10, seed=1)
+
+    costs = simulation.finance.financing(250000, 80, 3.5, 25, 2, 2000, 3, 1000, 1)
+    repaying = 12000 - costs['annual_costs']
+    repaid = 12000 - 1000 - costs['annual_maintenance']
+    assert outcomes['worst_year_cashflow'] == pytest.approx(repaying)
+    assert outcomes['annual_net_cashflow'] == pytest.approx((25 * repaying + 15 * repaid) / 40)
+
+def test_rate_reset_year_is_bounded():
+    with pytest.raises(ValidationError):
+        RateResetSpec(reset_year=0)
+    with pytest.raises(ValidationError):
+        RateResetSpec(reset_year=41)
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import projection_api
+
+PROPERTY = {'id': 'p1', 'title': 'Bilocale', 'location': 'Milano', 'price': 250000, 'property_type': 'Appartamento', 'size_sqm': 60}
+METRICS = {'investment_score': 6, 'yoy_appreciation': 3.0, 'estimated_value': 255000, 'long_term_rental_yield': 5.04}
+
+def stored_analysis(analysis_id: str, **metrics) -> dict:
+    return {
+        'id': analysis_id,
+        'property_data': PROPERTY,
+        'metrics': {**METRICS, **metrics},
+        'purchase_details': {'mortgage_rate': 4.0},
+        'estimates_source': 'ai'
+    }
+
+def solve(server, analysis: dict, **request) -> dict:
+    async def scenario():
+        await server.db.analyses.insert_one(analysis)
+        return await projection_api.solve_analysis(analysis['id'], projection_api.SolverRequest(**request))
+
+    return asyncio.run(scenario())
+
+def test_solve_uses_the_stored_rent_estimates(server_db):
+    result = solve(server_db, stored_analysis('a1', monthly_rent_conservative=900.0, monthly_rent_optimistic=1100.0))
+    assert result['estimates_source'] == 'ai'
+    assert result['base']['monthly_rent'] == 1000.0
+    assert result['base']['mortgage_rate'] == 4.0
+
+def test_solve_request_overrides_stored_inputs(server_db):
+    result = solve(
+        server_db,
+        stored_analysis('a2', monthly_rent_conservative=900.0, monthly_rent_optimistic=1100.0),
+        monthly_rent=1500.0,
+        purchase_details={'mortgage_rate': 2.0}
+    )
+    assert result['base']['monthly_rent'] == 1500.0
+    assert result['base']['mortgage_rate'] == 2.0
+
+def test_legacy_analysis_falls_back_to_the_rental_yield(server_db):
+    result = solve(server_db, stored_analysis('a3'))
+    assert result['estimates_source'] == 'rental_yield'
+    assert result['base']['monthly_rent'] == pytest.approx(250000 * 5.04 / 100 / 12)
+
+def test_analysis_without_rent_or_yield_is_a_conflict(server_db):
+    with pytest.raises(HTTPException) as raised:
+        solve(server_db, stored_analysis('a4', long_term_rental_yield=None))
+    assert raised.value.status_code == 409
+
+def test_unknown_analysis_is_not_found(server_db):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(projection_api.solve_analysis('missing', projection_api.SolverRequest()))
+    assert raised.value.status_code == 404
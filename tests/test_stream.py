@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+import stream_api
+
+PROPERTY_INPUT = {'title': 'Bilocale', 'location': 'Milano', 'price': 250000}
+INSIGHTS = 'Stable rental demand near the university, modest appreciation expected.'
+
+# Events of the stream being collected, so the fake LLM stages can see what was already sent
+received = []
+
+def collect(property_input: dict) -> list:
+    """(event, data) pairs of one analysis stream"""
+    async def scenario():
+        response = await stream_api.analyze_property_stream(server.PropertyInput(**property_input))
+        received.clear()
+        async for message in response.body_iterator:
+            event, data = message.strip().split('\n')
+            received.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return received
+
+    return asyncio.run(scenario())
+
+@pytest.fixture
+def slow_ai(server_db, monkeypatch):
+    """LLM stages that take 50 ms and note which events were sent before they started"""
+    seen = {}
+
+    async def estimate_rent_with_ai(property_data, purchase_details, financing, refresh=False):
+        seen['estimates'] = [event for event, _ in received]
+        await asyncio.sleep(0.05)
+        return server.estimates_from_ai_data(server.fallback_ai_estimates(property_data.price), property_data.price)
+
+    async def combined_analysis_with_ai(property_data, purchase_details, financing):
+        seen['combined'] = [event for event, _ in received]
+        await asyncio.sleep(0.05)
+        return server.CombinedAiResponse(
+            **{**server.fallback_ai_estimates(property_data.price), 'investment_score': 6, 'insights': INSIGHTS}
+        )
+
+    async def stream_ai_insights(property_data, metrics):
+        yield INSIGHTS, 'ai'
+
+    monkeypatch.setattr(server_db, 'estimate_rent_with_ai', estimate_rent_with_ai)
+    monkeypatch.setattr(server_db, 'combined_analysis_with_ai', combined_analysis_with_ai)
+    monkeypatch.setattr(server_db, 'stream_ai_insights', stream_ai_insights)
+    return seen
+
+def test_financing_is_sent_before_the_estimates(slow_ai):
+    events = collect(PROPERTY_INPUT)
+    assert [event for event, _ in events] == ['property', 'financing', 'metrics', 'strategies', 'insight', 'done']
+    assert slow_ai['estimates'] == ['property', 'financing']
+    financing = events[1][1]
+    assert financing['mortgage_amount'] == pytest.approx(200000)
+
+def test_stage_timings_are_per_stage_durations(slow_ai):
+    timings = collect(PROPERTY_INPUT)[-1][1]['stage_timings']
+    assert set(timings) == {'property', 'financing', 'estimates', 'metrics', 'strategies', 'insights', 'total'}
+    assert timings['estimates'] >= 50
+    assert timings['strategies'] < 50
+    assert timings['insights'] < 50
+    assert timings['total'] >= timings['estimates']
+
+def test_single_shot_call_is_timed_as_a_stage(slow_ai):
+    events = collect({**PROPERTY_INPUT, 'llm_mode': 'single_shot'})
+    timings = events[-1][1]['stage_timings']
+    assert slow_ai['combined'] == ['property', 'financing']
+    assert timings['combined'] >= 50
+    assert timings['estimates'] < 50
+    assert ''.join(data['delta'] for event, data in events if event == 'insight') == INSIGHTS